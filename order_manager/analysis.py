@@ -1,16 +1,28 @@
 from __future__ import annotations
 import sqlite3
+import threading
+from collections import OrderedDict
+from itertools import combinations
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import networkx as nx
 from typing import Optional
 
+from .cache import ResultCache
+from . import columnar
+from .db import DAY_SQL, bucket_sql, order_buckets_query
 
-def _df(sql: str, conn: sqlite3.Connection) -> pd.DataFrame:
-    return pd.read_sql_query(sql, conn)
+# результаты запросов живут до первого изменения данных в БД; results.stats() — попадания/промахи
+results = ResultCache()
 
 
+def _df(sql: str, conn: sqlite3.Connection, params: tuple = ()) -> pd.DataFrame:
+    return pd.read_sql_query(sql, conn, params=params)
+
+
+@results.memoize
 def top5_clients_by_orders(conn: sqlite3.Connection) -> pd.DataFrame:
     sql = """
     SELECT c.name, COUNT(o.id) AS orders
@@ -23,65 +35,288 @@ def top5_clients_by_orders(conn: sqlite3.Connection) -> pd.DataFrame:
     return _df(sql, conn)
 
 
+@results.memoize
 def orders_per_day(conn: sqlite3.Connection) -> pd.DataFrame:
+    # читается сводка daily_order_stats — время зависит от числа дней, а не заказов
     sql = """
-    SELECT date, COUNT(*) AS cnt
-    FROM orders
-    GROUP BY date
+    SELECT date, orders AS cnt
+    FROM daily_order_stats
     ORDER BY date
     """
     return _df(sql, conn)
 
 
-def client_graph_by_city(conn: sqlite3.Connection):
-    sql = "SELECT id, name, COALESCE(address, '') AS city FROM clients"
-    df = _df(sql, conn)
+@results.memoize
+def orders_timeline(conn: sqlite3.Connection, period: str = "day", date_from: Optional[str] = None,
+                    date_to: Optional[str] = None) -> pd.DataFrame:
+    # заказы за окно [date_from, date_to] по периодам — читается только диапазон индекса orders(day);
+    # колонки как у orders_per_day (date — начало периода, cnt) плюс items, revenue
+    sql, params = order_buckets_query(period, date_from, date_to)
+    return _df(sql, conn, tuple(params)).rename(columns={"period": "date", "orders": "cnt"})
+
+
+@results.memoize
+def order_stats(conn: sqlite3.Connection, period: str = "day") -> pd.DataFrame:
+    # сводка по дням/неделям/месяцам/кварталам: period, orders, items, revenue;
+    # периоды — те же BUCKETS, что и у orders_timeline, по дню из daily_order_stats.date
+    sql = f"""
+    SELECT date(b * 86400, 'unixepoch') AS period, SUM(orders) AS orders, SUM(items) AS items,
+           SUM(revenue) AS revenue
+    FROM (SELECT {bucket_sql(period, "d")} AS b, orders, items, revenue
+          FROM (SELECT {DAY_SQL.format("date")} AS d, orders, items, revenue FROM daily_order_stats))
+    GROUP BY b
+    ORDER BY b
+    """
+    return _df(sql, conn)
+
+
+@results.memoize
+def order_columns(conn: sqlite3.Connection) -> columnar.OrderColumns:
+    # заказы и позиции в массивах NumPy — одна загрузка на все отчёты ниже, пока данные не изменятся
+    return columnar.OrderColumns.load(conn)
+
+
+def _names(conn: sqlite3.Connection, table: str, ids) -> list:
+    names = dict(conn.execute(f"SELECT id, name FROM {table}").fetchall())
+    return [names.get(int(i), "") for i in ids]
+
+
+@results.memoize
+def revenue_by_client(conn: sqlite3.Connection, top: Optional[int] = None) -> pd.DataFrame:
+    g = columnar.revenue_by_client(order_columns(conn))
+    order = np.argsort(-g["revenue"], kind="stable")[:top]
+    return pd.DataFrame({"client_id": g["id"][order], "name": _names(conn, "clients", g["id"][order]),
+                         "orders": g["orders"][order].astype(int), "revenue": g["revenue"][order]})
+
+
+@results.memoize
+def revenue_by_product(conn: sqlite3.Connection, top: Optional[int] = None) -> pd.DataFrame:
+    g = columnar.revenue_by_product(order_columns(conn))
+    order = np.argsort(-g["revenue"], kind="stable")[:top]
+    return pd.DataFrame({"product_id": g["id"][order], "name": _names(conn, "products", g["id"][order]),
+                         "qty": g["qty"][order].astype(int), "revenue": g["revenue"][order]})
+
+
+@results.memoize
+def revenue_by_day(conn: sqlite3.Connection) -> pd.DataFrame:
+    g = columnar.revenue_by_day(order_columns(conn))
+    return pd.DataFrame({"date": columnar.days_to_dates(g["id"]), "orders": g["orders"].astype(int),
+                         "revenue": g["revenue"]})
+
+
+@results.memoize
+def abc_products(conn: sqlite3.Connection, limits: tuple = columnar.ABC_LIMITS) -> pd.DataFrame:
+    # товары по убыванию выручки с долей, накопленной долей и классом A/B/C
+    g = columnar.revenue_by_product(order_columns(conn))
+    abc = columnar.abc_classes(g["revenue"], limits)
+    ids = g["id"][abc["order"]]
+    return pd.DataFrame({"product_id": ids, "name": _names(conn, "products", ids),
+                         "revenue": g["revenue"][abc["order"]], "share": abc["share"],
+                         "cum_share": abc["cum_share"], "abc": abc["abc"]})
+
+
+@results.memoize
+def basket_stats(conn: sqlite3.Connection) -> dict:
+    return columnar.basket_stats(order_columns(conn))
+
+
+@results.memoize
+def rfm_segments(conn: sqlite3.Connection, asof: Optional[str] = None) -> pd.DataFrame:
+    # asof — дата 'YYYY-MM-DD', от которой считается давность; по умолчанию последний день заказов
+    day = None if asof is None else int(np.datetime64(asof, "D").astype(np.int64))
+    g = columnar.rfm(order_columns(conn), day)
+    return pd.DataFrame({"client_id": g["id"], "name": _names(conn, "clients", g["id"]),
+                         "recency": g["recency"], "frequency": g["frequency"], "monetary": g["monetary"],
+                         "r": g["r"], "f": g["f"], "m": g["m"], "segment": g["segment"]})
+
+
+# город без адреса и сводный узел для городов сверх max_cities
+NO_CITY = "без города"
+OTHER_CITIES = "Другие города"
+# раскладки графа по его структуре (узлы + рёбра): не пересчитываются при повторной отрисовке
+LAYOUT_CACHE_SIZE = 8
+_layouts: "OrderedDict[tuple, dict]" = OrderedDict()
+_layouts_lock = threading.Lock()
+
+
+@results.memoize
+def city_graph(conn: sqlite3.Connection, max_per_city: int = 30, max_cities: int = 40, hubs: bool = True):
+    # граф и раскладка без отрисовки — можно считать вне потока GUI.
+    # hubs=True: город — отдельный узел, клиенты связаны с ним (рёбер столько же, сколько клиентов);
+    # hubs=False: клиенты одного города связаны попарно (только для небольших выборок).
+    # Из каждого города берётся не больше max_per_city клиентов, в граф — не больше
+    # max_cities крупнейших городов, остальные сводятся в узел OTHER_CITIES.
+    cities = _df("SELECT COALESCE(address, '') AS city, COUNT(*) AS n FROM clients GROUP BY 1 "
+                 "ORDER BY n DESC, city", conn)
+    top, rest = cities.iloc[:max_cities], cities.iloc[max_cities:]
+    sql = """
+    SELECT id, name, city FROM (
+        SELECT id, name, COALESCE(address, '') AS city,
+               ROW_NUMBER() OVER (PARTITION BY COALESCE(address, '') ORDER BY id) AS rn
+        FROM clients)
+    WHERE rn <= ?
+    ORDER BY city, id
+    """
+    df = _df(sql, conn, (max_per_city,))
+    df = df[df["city"].isin(top["city"])]
 
     G = nx.Graph()
     labels = {}
+    ids = df["id"].astype(int).tolist()
+    names, client_cities = df["name"].tolist(), df["city"].tolist()
+    G.add_nodes_from((cid, {"kind": "client", "city": city}) for cid, city in zip(ids, client_cities))
+    labels.update(zip(ids, names) if hubs else
+                  ((cid, f"{name} ({city})" if city else name) for cid, name, city in zip(ids, names, client_cities)))
+
+    if hubs:
+        hub_counts = list(zip(top["city"], top["n"].astype(int)))
+        if len(rest):
+            hub_counts.append((OTHER_CITIES, int(rest["n"].sum())))
+        for city, n in hub_counts:
+            node = ("city", city)
+            G.add_node(node, kind="city", city=city, clients=n)
+            labels[node] = f"{city or NO_CITY} ({n})"
+        G.add_edges_from((cid, ("city", city)) for cid, city in zip(ids, client_cities))
+    else:
+        for _, g in df.groupby("city"):
+            G.add_edges_from(combinations(g["id"].astype(int).tolist(), 2))
+
+    return G, labels, _layout(G)
+
+
+def _layout(G) -> dict:
+    key = (tuple(G.nodes), tuple(G.edges))
+    with _layouts_lock:
+        pos = _layouts.get(key)
+        if pos is not None:
+            _layouts.move_to_end(key)
+            return pos
+    hubs = [n for n, kind in G.nodes(data="kind") if kind == "city"]
+    pos = _hub_layout(G, hubs) if hubs else nx.spring_layout(G, seed=42)
+    with _layouts_lock:
+        _layouts[key] = pos
+        if len(_layouts) > LAYOUT_CACHE_SIZE:
+            _layouts.popitem(last=False)
+    return pos
+
 
-    for _, r in df.iterrows():
-        cid = int(r["id"])
-        city = r["city"] or ""
-        G.add_node(cid, city=city)
-        labels[cid] = f'{r["name"]} ({city})' if city else r["name"]
+def _hub_layout(G, hubs) -> dict:
+    # O(n): города по кругу, клиенты — кольцом вокруг своего города
+    pos = {}
+    centers = np.array([[0.0, 0.0]]) if len(hubs) == 1 else \
+        np.array(list(nx.circular_layout(hubs).values())) * max(1.0, len(hubs) / 6)
+    for hub, center in zip(hubs, centers):
+        pos[hub] = center
+        members = list(G.neighbors(hub))
+        if not members:
+            continue
+        angles = np.linspace(0, 2 * np.pi, len(members), endpoint=False)
+        ring = 0.35 * np.column_stack((np.cos(angles), np.sin(angles)))
+        pos.update(zip(members, center + ring))
+    return pos
 
-    for city, g in df.groupby("city"):
-        ids = list(map(int, g["id"]))
-        for i in range(len(ids) - 1):
-            for j in range(i + 1, len(ids)):
-                G.add_edge(ids[i], ids[j])
 
-    pos = nx.spring_layout(G, seed=42)
+def draw_city_graph(G, labels, pos, show: bool = True):
     plt.figure(figsize=(8, 6))
-    nx.draw(G, pos, with_labels=False, node_size=1200, alpha=0.9)
-    nx.draw_networkx_labels(G, pos, labels=labels, font_size=10)
+    hubs = [n for n, kind in G.nodes(data="kind") if kind == "city"]
+    hub_set = set(hubs)
+    clients = [n for n in G.nodes if n not in hub_set]
+    nx.draw_networkx_edges(G, pos, alpha=0.3)
+    nx.draw_networkx_nodes(G, pos, nodelist=clients, node_size=1200 if not hubs else 150, alpha=0.9)
+    if hubs:
+        nx.draw_networkx_nodes(G, pos, nodelist=hubs, node_size=1500, node_color="#e07b39", alpha=0.9)
+    # подписи клиентов только на небольших графах, подписи городов — всегда
+    shown = labels if len(clients) <= 150 else {n: labels[n] for n in hubs}
+    nx.draw_networkx_labels(G, pos, labels=shown, font_size=10 if len(clients) <= 150 else 8)
     plt.title("Граф связей клиентов по городам")
+    plt.axis("off")
     plt.tight_layout()
-    plt.show()
+    if show:
+        plt.show()
     return G
 
 
+def client_graph_by_city(conn: sqlite3.Connection):
+    return draw_city_graph(*city_graph(conn))
+
+
 
-def plot_top5_clients(conn: sqlite3.Connection):
-    df = top5_clients_by_orders(conn)
+# show=False — фигура остаётся текущей (plt.gcf()) для сохранения в файл, см. report.py
+def plot_top5_clients(conn: Optional[sqlite3.Connection], df: Optional[pd.DataFrame] = None, show: bool = True):
+    if df is None:
+        df = top5_clients_by_orders(conn)
     plt.figure(figsize=(6, 4))
     sns.barplot(data=df, x="name", y="orders")
     plt.title("Топ-5 клиентов по количеству заказов")
     plt.xlabel("Клиент")
     plt.ylabel("Заказы")
     plt.tight_layout()
-    plt.show()
+    if show:
+        plt.show()
     return df
 
 
-def plot_orders_timeline(conn: sqlite3.Connection):
-    df = orders_per_day(conn)
+def plot_orders_timeline(conn: Optional[sqlite3.Connection], df: Optional[pd.DataFrame] = None, show: bool = True,
+                         *, date_from: Optional[str] = None, date_to: Optional[str] = None, period: str = "day"):
+    # без окна по дням — сводка daily_order_stats; с окном или периодом — orders_timeline
+    if df is None:
+        windowed = date_from is not None or date_to is not None or period != "day"
+        df = orders_timeline(conn, period, date_from, date_to) if windowed else orders_per_day(conn)
     plt.figure(figsize=(7, 4))
     sns.lineplot(data=df, x="date", y="cnt", marker="o")
-    plt.title("Динамика количества заказов по датам")
-    plt.xlabel("Дата")
+    title = "Динамика количества заказов " + ("по датам" if period == "day" else f"по {PERIOD_TITLES[period]}")
+    if date_from or date_to:
+        title += f" ({date_from or '…'} — {date_to or '…'})"
+    plt.title(title)
+    plt.xticks(rotation=45)
+    plt.xlabel("Дата" if period == "day" else "Начало периода")
     plt.ylabel("Количество заказов")
     plt.tight_layout()
-    plt.show()
+    if show:
+        plt.show()
+    return df
+
+
+PERIOD_TITLES = {"day": "дням", "week": "неделям", "month": "месяцам", "quarter": "кварталам"}
+
+
+def plot_order_stats(conn: Optional[sqlite3.Connection], period: str = "week",
+                     df: Optional[pd.DataFrame] = None, show: bool = True):
+    if df is None:
+        df = order_stats(conn, period)
+    fig, ax = plt.subplots(figsize=(7, 4))
+    sns.barplot(data=df, x="period", y="orders", ax=ax, color="#4c72b0")
+    ax2 = ax.twinx()
+    ax2.plot(range(len(df)), df["revenue"], color="#e07b39", marker="o")
+    ax.set_title(f"Заказы и выручка по {PERIOD_TITLES[period]}")
+    ax.set_xlabel("Период")
+    ax.set_ylabel("Заказы")
+    ax2.set_ylabel("Выручка, руб.")
+    ax.tick_params(axis="x", rotation=45)
+    fig.tight_layout()
+    if show:
+        plt.show()
+    return df
+
+
+def plot_abc_products(conn: Optional[sqlite3.Connection], df: Optional[pd.DataFrame] = None,
+                      top: int = 30, show: bool = True):
+    # диаграмма Парето: выручка крупнейших товаров (цвет — класс ABC) и накопленная доля
+    if df is None:
+        df = abc_products(conn)
+    head = df.iloc[:top]
+    colors = {"A": "#4c72b0", "B": "#dd8452", "C": "#8c8c8c"}
+    fig, ax = plt.subplots(figsize=(8, 4))
+    ax.bar(range(len(head)), head["revenue"], color=[colors[c] for c in head["abc"]])
+    ax2 = ax.twinx()
+    ax2.plot(range(len(head)), head["cum_share"] * 100, color="#c44e52", marker="o")
+    ax2.set_ylim(0, 105)
+    ax.set_title(f"ABC-анализ товаров по выручке (топ-{len(head)} из {len(df)})")
+    ax.set_xlabel("Товар")
+    ax.set_ylabel("Выручка, руб.")
+    ax2.set_ylabel("Накопленная доля, %")
+    ax.set_xticks(range(len(head)), head["name"], rotation=60, ha="right", fontsize=8)
+    fig.tight_layout()
+    if show:
+        plt.show()
     return df
@@ -0,0 +1,229 @@
+"""
+Замеры производительности.
+
+Сравнение профилей хранения (PROFILES) на копии текущей БД:
+    python -m order_manager.main --db orders.sqlite bench-profiles
+Набор замеров на синтетических данных (datagen) с результатом в JSON для
+сравнения между версиями:
+    python -m order_manager.main bench --scale 0.1 --json bench.json --baseline old.json
+"""
+from __future__ import annotations
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .db import Database, PROFILES
+
+
+def _timed(fn, n: int) -> Dict[str, float]:
+    t0 = time.perf_counter()
+    fn()
+    dt = time.perf_counter() - t0
+    return {"seconds": dt, "ops_per_sec": n / dt if dt > 0 else float("inf")}
+
+
+def _copy_db(src_path: str, dst_path: str):
+    src = sqlite3.connect(Path(src_path).resolve().as_uri() + "?mode=ro", uri=True)
+    dst = sqlite3.connect(dst_path)
+    try:
+        src.backup(dst)
+    finally:
+        src.close()
+        dst.close()
+
+
+def bench_profile(src_path: Optional[str], profile: str, *, orders: int = 500, queries: int = 50) -> Dict[str, Any]:
+    # Каждый профиль меряется на своей копии БД, исходный файл не меняется
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "bench.sqlite")
+        if src_path and Path(src_path).exists():
+            _copy_db(src_path, path)
+        db = Database(path, profile=profile)
+        try:
+            db.init_schema()
+            db.seed_demo()
+            clients = [r["id"] for r in db.page_clients(limit=100)]
+            products = [r["id"] for r in db.page_products(limit=100)]
+            records = [(clients[i % len(clients)], "2025-01-01", [(products[i % len(products)], 1 + i % 3)])
+                       for i in range(orders)]
+
+            res: Dict[str, Any] = {"profile": profile}
+            res["insert_single"] = _timed(lambda: [db.create_order(*r) for r in records], orders)
+            res["insert_bulk"] = _timed(lambda: db.create_orders_bulk(records, batch_size=1000), orders)
+            res["list_orders"] = _timed(lambda: [db.page_orders(limit=200) for _ in range(queries)], queries)
+            res["find_clients"] = _timed(lambda: [db.find_clients("ив") for _ in range(queries)], queries)
+            res["pragmas"] = {k: db.conn.execute(f"PRAGMA {k}").fetchone()[0] for k in PROFILES[profile]}
+            return res
+        finally:
+            db.close()
+
+
+def bench_profiles(src_path: Optional[str], profiles: Optional[Iterable[str]] = None, **kw) -> List[Dict[str, Any]]:
+    return [bench_profile(src_path, p, **kw) for p in (profiles or PROFILES)]
+
+
+def format_profile_report(results: List[Dict[str, Any]]) -> str:
+    cols = ("insert_single", "insert_bulk", "list_orders", "find_clients")
+    lines = [f'{"профиль":<10}' + "".join(f"{c:>16}" for c in cols) + "   (операций/с)"]
+    for r in results:
+        lines.append(f'{r["profile"]:<10}' + "".join(f'{r[c]["ops_per_sec"]:>16.0f}' for c in cols))
+    return "\n".join(lines)
+
+
+# --- набор замеров (bench suite) ---
+
+def _measure(fn: Callable[[], Any], repeat: int, ops: int = 1) -> Dict[str, Any]:
+    # fn выполняется repeat раз; задержки в секундах на один вызов, пропускная способность — ops/с
+    times, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    times.sort()
+    res: Dict[str, Any] = {
+        "repeat": repeat,
+        "min_s": times[0],
+        "median_s": statistics.median(times),
+        "p95_s": times[min(len(times) - 1, int(round(0.95 * (len(times) - 1))))],
+        "mean_s": statistics.fmean(times),
+        "ops_per_sec": ops / statistics.median(times) if times[0] > 0 else float("inf"),
+    }
+    if hasattr(result, "__len__") and not isinstance(result, tuple):
+        res["rows"] = len(result)
+    return res
+
+
+def _git_version() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=Path(__file__).resolve().parent,
+                             capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def bench_suite(scale: float = 0.1, *, seed: int = 42, repeat: int = 5, profile: Optional[str] = None,
+                only: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    # Генерирует БД во временной папке и меряет основные операции; результат — словарь для JSON
+    from . import analysis as anl, columnar
+    from .datagen import generate
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        db = Database(str(tmp_path / "bench.sqlite"), profile=profile)
+        try:
+            db.init_schema()
+            t0 = time.perf_counter()
+            counts = generate(db, scale, seed=seed)
+            gen_s = time.perf_counter() - t0
+            clients = [r["id"] for r in db.page_clients(limit=100)]
+            products = [r["id"] for r in db.page_products(limit=100)]
+            state = {"i": 0}
+
+            def one_order():
+                i = state["i"] = state["i"] + 1
+                return db.create_order(clients[i % len(clients)], "2025-01-01",
+                                       [(products[i % len(products)], 1 + i % 3)])
+
+            bulk = [(clients[i % len(clients)], "2025-01-02", [(products[i % len(products)], 1)])
+                    for i in range(1000)]
+            ndjson = str(tmp_path / "dump.ndjson")
+            db.export_ndjson(ndjson)
+            conn = db.conn
+            since_90d = _last_days(db, 90)[0]
+            cases: Dict[str, Callable[[], Dict[str, Any]]] = {
+                "create_order": lambda: _measure(one_order, repeat * 20),
+                "create_orders_bulk_1000": lambda: _measure(lambda: db.create_orders_bulk(bulk)[0], repeat, 1000),
+                "list_orders": lambda: _measure(db.list_orders, repeat),
+                "page_orders": lambda: _measure(lambda: db.page_orders(limit=200), repeat * 20),
+                "order_buckets_recent_month": lambda: _measure(
+                    lambda: db.order_buckets("day", *_last_days(db, 30)), repeat * 20),
+                "find_clients": lambda: _measure(lambda: db.find_clients("иван москва"), repeat * 20),
+                "find_clients_like": lambda: _measure(lambda: _like_search(db, "Иван"), repeat),
+                "export_json": lambda: _measure(lambda: db.export_json(str(tmp_path / "dump.json")), repeat),
+                "export_ndjson": lambda: _measure(lambda: db.export_ndjson(str(tmp_path / "dump2.ndjson")), repeat),
+                "export_csv": lambda: _measure(lambda: db.export_csv(str(tmp_path / "csv")), repeat),
+                "export_xlsx": lambda: _measure(lambda: db.export_xlsx(str(tmp_path / "dump.xlsx")), 1),
+                "import_ndjson": lambda: _measure(lambda: db.import_data(ndjson), 1),
+                "analysis.top5_clients_by_orders": lambda: _measure(
+                    lambda: anl.top5_clients_by_orders.uncached(conn), repeat),
+                "analysis.orders_per_day": lambda: _measure(lambda: anl.orders_per_day.uncached(conn), repeat),
+                "analysis.order_stats_week": lambda: _measure(lambda: anl.order_stats.uncached(conn, "week"), repeat),
+                "analysis.order_stats_month": lambda: _measure(lambda: anl.order_stats.uncached(conn, "month"), repeat),
+                "analysis.orders_timeline_90d_week": lambda: _measure(
+                    lambda: anl.orders_timeline.uncached(conn, "week", since_90d), repeat),
+                "analysis.city_graph": lambda: _measure(lambda: anl.city_graph.uncached(conn), repeat),
+                # обёртки над колонками: order_columns берётся из кэша (его загрузка — отдельный замер),
+                # меряются расчёт, имена и сборка DataFrame
+                "analysis.revenue_by_client": lambda: _measure(lambda: anl.revenue_by_client.uncached(conn), repeat),
+                "analysis.revenue_by_product": lambda: _measure(lambda: anl.revenue_by_product.uncached(conn), repeat),
+                "analysis.revenue_by_day": lambda: _measure(lambda: anl.revenue_by_day.uncached(conn), repeat),
+                "analysis.abc_products": lambda: _measure(lambda: anl.abc_products.uncached(conn), repeat),
+                "analysis.basket_stats": lambda: _measure(lambda: anl.basket_stats.uncached(conn), repeat),
+                "analysis.rfm_segments": lambda: _measure(lambda: anl.rfm_segments.uncached(conn), repeat),
+                "analysis.order_columns": lambda: _measure(lambda: anl.order_columns.uncached(conn), repeat),
+                "columnar.reports": lambda: _measure(
+                    lambda: columnar.reports(anl.order_columns(conn)), repeat),
+                "analysis.cached_hit": lambda: _measure(lambda: anl.orders_per_day(conn), repeat * 20),
+            }
+            wanted = set(only) if only else None
+            results = {name: case() for name, case in cases.items() if wanted is None or name in wanted}
+        finally:
+            db.close()
+
+    return {
+        "suite": "order_manager",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "version": _git_version(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "scale": scale,
+        "seed": seed,
+        "profile": profile,
+        "rows": counts,
+        "generate_s": gen_s,
+        "results": results,
+    }
+
+
+def _last_days(db: Database, days: int):
+    # окно из последних days дней данных
+    last = db.order_date_range()[1]
+    return (date.fromisoformat(last) - timedelta(days=days - 1)).isoformat(), last
+
+
+def _like_search(db: Database, q: str):
+    # поиск без полнотекстового индекса — для сравнения с FTS
+    fts, db._fts = db._fts, False
+    try:
+        return db.find_clients(q)
+    finally:
+        db._fts = fts
+
+
+def save_suite(result: Dict[str, Any], path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+def format_suite_report(result: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    # медиана и p95 по каждому замеру; с baseline — во сколько раз быстрее (>1) или медленнее (<1)
+    head = f'{"замер":<34}{"медиана, мс":>13}{"p95, мс":>11}{"оп/с":>12}'
+    lines = [f'scale={result["scale"]} seed={result["seed"]} строк: {result["rows"]} '
+             f'(генерация {result["generate_s"]:.1f} с), версия {result["version"]}',
+             head + ("   к базовой" if baseline else "")]
+    base = (baseline or {}).get("results", {})
+    for name, r in result["results"].items():
+        line = f'{name:<34}{r["median_s"] * 1000:>13.2f}{r["p95_s"] * 1000:>11.2f}{r["ops_per_sec"]:>12.0f}'
+        if name in base and r["median_s"] > 0:
+            line += f'   x{base[name]["median_s"] / r["median_s"]:.2f}'
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,156 @@
+"""
+Кэши поверх Database.
+
+CatalogCache — справочники (товары, клиенты). Поиск по id — O(1) из памяти;
+запись по id сбрасывается, когда Database (или писатель ConnectionPool)
+сообщает об её изменении. Размер ограничен, при переполнении вытесняются
+давно не использованные записи (LRU).
+
+ResultCache — результаты аналитических запросов. Результат отдаётся из памяти,
+пока данные в файле БД не изменились: изменения видны по PRAGMA data_version
+(коммиты других соединений, в том числе других процессов) и total_changes
+(записи через это же соединение).
+"""
+from __future__ import annotations
+import functools
+import itertools
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class CatalogCache:
+    def __init__(self, db, maxsize: int = 10000):
+        self.db = db
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._data: Dict[str, "OrderedDict[int, Any]"] = {"clients": OrderedDict(), "products": OrderedDict()}
+        self._loaders: Dict[str, Callable[[int], Optional[sqlite3.Row]]] = {
+            "clients": db.get_client, "products": db.get_product,
+        }
+        # поколение таблицы растёт при каждом сбросе: строка, прочитанная до сброса, не кэшируется
+        self._gen = {"clients": 0, "products": 0}
+        self.hits = self.misses = self.evictions = 0
+        db.listeners.append(self.invalidate)
+
+    def get_client(self, cid: int) -> Optional[sqlite3.Row]:
+        return self._get("clients", int(cid))
+
+    def get_product(self, pid: int) -> Optional[sqlite3.Row]:
+        return self._get("products", int(pid))
+
+    def _get(self, table: str, ident: int):
+        data = self._data[table]
+        with self._lock:
+            row = data.get(ident, _MISSING)
+            if row is not _MISSING:
+                data.move_to_end(ident)
+                self.hits += 1
+                return row
+            self.misses += 1
+            gen = self._gen[table]
+        row = self._loaders[table](ident)
+        with self._lock:
+            if gen != self._gen[table]:
+                return row
+            data[ident] = row
+            if len(data) > self.maxsize:
+                data.popitem(last=False)
+                self.evictions += 1
+        return row
+
+    def invalidate(self, table: Optional[str] = None, ident: Optional[int] = None):
+        # подходит как слушатель Database.listeners / ConnectionPool.listeners
+        with self._lock:
+            for name, data in self._data.items():
+                if table is not None and table != name:
+                    continue
+                self._gen[name] += 1
+                if ident is None:
+                    data.clear()
+                else:
+                    data.pop(int(ident), None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "clients": len(self._data["clients"]), "products": len(self._data["products"])}
+
+
+class ResultCache:
+    # кэшированные значения общие для всех вызывающих — их нельзя изменять
+    def __init__(self, maxsize: int = 64, max_connections: int = 64):
+        self.maxsize = maxsize
+        self.max_connections = max_connections
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Tuple[str, Hashable], Tuple[int, Any]]" = OrderedDict()
+        # по каждой БД: поколение данных и последнее состояние каждого соединения
+        self._dbs: Dict[str, Dict[str, Any]] = {}
+        self._stamps = itertools.count(1)
+        self.hits = self.misses = 0
+
+    def _conn_key(self, conn: sqlite3.Connection) -> Tuple[str, int]:
+        # метка соединения хранится в temp.user_version: у нового соединения она 0,
+        # поэтому повторно выделенный id(conn) не спутать со старым
+        stamp = conn.execute("PRAGMA temp.user_version").fetchone()[0]
+        if not stamp:
+            with self._lock:
+                stamp = next(self._stamps)
+            conn.execute(f"PRAGMA temp.user_version = {stamp}")
+        path = next((r[2] for r in conn.execute("PRAGMA database_list") if r[1] == "main"), "")
+        return path or f":memory:{stamp}", stamp
+
+    def _generation(self, conn: sqlite3.Connection) -> Tuple[str, int]:
+        db_key, stamp = self._conn_key(conn)
+        state = (conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes)
+        with self._lock:
+            db = self._dbs.setdefault(db_key, {"gen": 0, "seen": OrderedDict()})
+            seen = db["seen"]
+            if seen.get(stamp) != state:
+                # соединение увидело изменения (или встречается впервые) — всё, что
+                # посчитано раньше, устарело для всех соединений этой БД
+                db["gen"] += 1
+                seen[stamp] = state
+                if len(seen) > self.max_connections:
+                    seen.popitem(last=False)
+            seen.move_to_end(stamp)
+            return db_key, db["gen"]
+
+    def get(self, conn: sqlite3.Connection, key: Hashable, compute: Callable[[], Any]) -> Any:
+        db_key, gen = self._generation(conn)
+        full = (db_key, key)
+        with self._lock:
+            hit = self._data.get(full)
+            if hit is not None and hit[0] == gen:
+                self._data.move_to_end(full)
+                self.hits += 1
+                return hit[1]
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            if self._dbs[db_key]["gen"] == gen:
+                self._data[full] = (gen, value)
+                self._data.move_to_end(full)
+                if len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        return value
+
+    def memoize(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        # fn(conn, *args, **kwargs): аргументы входят в ключ и должны быть хешируемыми
+        @functools.wraps(fn)
+        def wrapper(conn: sqlite3.Connection, *args, **kwargs):
+            key = (fn.__qualname__, args, tuple(sorted(kwargs.items())))
+            return self.get(conn, key, lambda: fn(conn, *args, **kwargs))
+        wrapper.uncached = fn
+        return wrapper
+
+    def invalidate(self, table: Optional[str] = None, ident: Optional[int] = None):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._data)}
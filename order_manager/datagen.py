@@ -0,0 +1,105 @@
+"""
+Генератор синтетических данных для замеров.
+
+Масштаб scale=1 — 10 000 клиентов, 1 000 товаров, 100 000 заказов (~180 000 позиций);
+scale=10 — миллион заказов. При одинаковых scale и seed данные совпадают.
+Распределения приближены к реальным: крупные города встречаются чаще, часть
+клиентов заказывает намного больше остальных, заказов больше в будни и со временем,
+цены — логнормальные, в заказе обычно 1–3 позиции по 1–2 штуки.
+    python -m order_manager.main --db big.sqlite generate --scale 1
+"""
+from __future__ import annotations
+import math
+import random
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .db import Database
+
+BASE_CLIENTS = 10_000
+BASE_PRODUCTS = 1_000
+BASE_ORDERS = 100_000
+
+# города с весами (доля клиентов)
+CITIES = [
+    ("Москва", 30), ("Санкт-Петербург", 15), ("Новосибирск", 5), ("Екатеринбург", 5), ("Казань", 4),
+    ("Нижний Новгород", 4), ("Челябинск", 3), ("Самара", 3), ("Омск", 3), ("Ростов-на-Дону", 3),
+    ("Уфа", 3), ("Красноярск", 3), ("Воронеж", 2), ("Пермь", 2), ("Волгоград", 2),
+    ("Краснодар", 2), ("Саратов", 2), ("Тюмень", 2), ("Тольятти", 1), ("Ижевск", 1),
+    ("Барнаул", 1), ("Ульяновск", 1), ("Иркутск", 1), ("Хабаровск", 1), ("", 1),
+]
+FIRST_NAMES = ["Иван", "Пётр", "Артем", "Анна", "Мария", "Ольга", "Сергей", "Дмитрий", "Елена", "Алексей",
+               "Наталья", "Андрей", "Татьяна", "Михаил", "Ирина", "Николай", "Светлана", "Павел"]
+LAST_NAMES = ["Иванов", "Петров", "Смирнов", "Кузнецов", "Попов", "Соколов", "Лебедев", "Козлов",
+              "Новиков", "Морозов", "Волков", "Соловьёв", "Васильев", "Зайцев", "Павлов", "Семёнов"]
+PRODUCT_WORDS = ["Мыло", "Сосиски", "Вода", "Хлеб", "Молоко", "Сыр", "Чай", "Кофе", "Сахар", "Рис",
+                 "Гречка", "Масло", "Яйца", "Сок", "Печенье", "Шампунь", "Паста", "Салфетки"]
+# относительная частота заказов по дням недели (пн..вс)
+WEEKDAY_WEIGHTS = [1.15, 1.1, 1.1, 1.05, 1.2, 0.75, 0.65]
+
+
+def scaled_counts(scale: float) -> Dict[str, int]:
+    return {
+        "clients": max(1, round(BASE_CLIENTS * scale)),
+        "products": max(1, round(BASE_PRODUCTS * scale)),
+        "orders": max(1, round(BASE_ORDERS * scale)),
+    }
+
+
+def generate(db: Database, scale: float = 1.0, *, seed: int = 42, start: date = date(2023, 1, 1),
+             days: int = 730, batch_size: int = 10_000,
+             progress: Optional[Callable[[str, int, int], None]] = None) -> Dict[str, int]:
+    # Добавляет данные к уже существующим; возвращает число добавленных строк по таблицам.
+    rnd = random.Random(seed)
+    n = scaled_counts(scale)
+
+    client_ids = _insert_clients(db, rnd, n["clients"], progress)
+    product_ids = _insert_products(db, rnd, n["products"])
+    # активность клиентов и популярность товаров — с тяжёлым хвостом (Парето)
+    client_w = _cumulative(rnd.paretovariate(1.2) for _ in client_ids)
+    product_w = _cumulative(rnd.paretovariate(1.1) for _ in product_ids)
+    day_w = _cumulative(WEEKDAY_WEIGHTS[(start + timedelta(d)).weekday()] * (1 + d / days) for d in range(days))
+    dates = [(start + timedelta(d)).isoformat() for d in range(days)]
+
+    def records() -> Iterator[Tuple[int, str, List[Tuple[int, int]]]]:
+        for i in range(n["orders"]):
+            lines = min(1 + int(rnd.expovariate(0.7)), 12)
+            picked = {rnd.choices(product_ids, cum_weights=product_w)[0] for _ in range(lines)}
+            items = [(pid, 1 + min(int(rnd.expovariate(1.2)), 9)) for pid in picked]
+            if progress and i % batch_size == 0:
+                progress("orders", i, n["orders"])
+            yield (rnd.choices(client_ids, cum_weights=client_w)[0],
+                   rnd.choices(dates, cum_weights=day_w)[0], items)
+
+    _, report = db.create_orders_bulk(records(), batch_size=batch_size)
+    if progress:
+        progress("orders", n["orders"], n["orders"])
+    return {"clients": n["clients"], "products": n["products"], "orders": n["orders"],
+            "order_items": sum(b["items"] for b in report)}
+
+
+def _cumulative(weights) -> List[float]:
+    out, acc = [], 0.0
+    for w in weights:
+        acc += w
+        out.append(acc)
+    return out
+
+
+def _insert_clients(db: Database, rnd: random.Random, count: int, progress) -> List[int]:
+    # номер в email/телефоне — продолжение уже имеющихся клиентов, чтобы контакты не повторялись
+    base = db.count_clients()
+    cities, weights = zip(*CITIES)
+    rows = [(f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}", f"client{i}@example.com",
+             f"+7{9000000000 + i}", rnd.choices(cities, weights=weights)[0])
+            for i in range(base + 1, base + count + 1)]
+    ids = db.add_clients_bulk(rows)
+    if progress:
+        progress("clients", count, count)
+    return ids
+
+
+def _insert_products(db: Database, rnd: random.Random, count: int) -> List[int]:
+    base = db.count_products()
+    return db.add_products_bulk((f"{rnd.choice(PRODUCT_WORDS)} №{i}", round(math.exp(rnd.gauss(5.0, 0.9)), 2))
+                                for i in range(base + 1, base + count + 1))
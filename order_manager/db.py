@@ -2,11 +2,18 @@ from __future__ import annotations
 import sqlite3
 import json
 import csv
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator, Callable
 
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
+from .models import OrderBatch
+from .utils import EMAIL_RE, PHONE_RE, normalize_email, normalize_phone
+from .metrics import connection_factory, instrument_methods
 
 DB_SCHEMA = """
 PRAGMA foreign_keys = ON;
@@ -35,28 +42,367 @@ CREATE TABLE IF NOT EXISTS order_items(
 );
 """
 
+def _client_contact_indexes(conn: sqlite3.Connection):
+    # частичные индексы: пустые email/телефон дублями не считаются;
+    # если в старой БД уже есть дубли — создаём обычный индекс, чтобы не блокировать обновление
+    for col in ("email", "phone"):
+        try:
+            conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_clients_{col} ON clients({col}) WHERE {col} <> ''")
+        except sqlite3.IntegrityError:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_clients_{col} ON clients({col}) WHERE {col} <> ''")
+
+
+CLIENTS_FTS_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS clients_fts USING fts5(
+    name, email, phone, address, content='clients', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS clients_fts_ai AFTER INSERT ON clients BEGIN
+    INSERT INTO clients_fts(rowid, name, email, phone, address)
+    VALUES (new.id, new.name, new.email, new.phone, new.address);
+END;
+CREATE TRIGGER IF NOT EXISTS clients_fts_ad AFTER DELETE ON clients BEGIN
+    INSERT INTO clients_fts(clients_fts, rowid, name, email, phone, address)
+    VALUES ('delete', old.id, old.name, old.email, old.phone, old.address);
+END;
+CREATE TRIGGER IF NOT EXISTS clients_fts_au AFTER UPDATE ON clients BEGIN
+    INSERT INTO clients_fts(clients_fts, rowid, name, email, phone, address)
+    VALUES ('delete', old.id, old.name, old.email, old.phone, old.address);
+    INSERT INTO clients_fts(rowid, name, email, phone, address)
+    VALUES (new.id, new.name, new.email, new.phone, new.address);
+END;
+INSERT INTO clients_fts(clients_fts) VALUES ('rebuild');
+"""
+
+
+def _clients_fts(conn: sqlite3.Connection):
+    # без FTS5 в сборке SQLite поиск остаётся на LIKE (см. Database.find_clients)
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp.fts5_probe")
+    except sqlite3.OperationalError:
+        return
+    for stmt in _split_sql(CLIENTS_FTS_SQL):
+        conn.execute(stmt)
+
+
+# цена позиции фиксируется при вставке, итоги заказа поддерживаются триггерами
+ORDER_TOTALS_SQL = """
+ALTER TABLE order_items ADD COLUMN price REAL;
+UPDATE order_items SET price = (SELECT price FROM products WHERE id = order_items.product_id);
+CREATE TABLE IF NOT EXISTS order_totals(
+    order_id INTEGER PRIMARY KEY REFERENCES orders(id) ON DELETE CASCADE,
+    total REAL NOT NULL DEFAULT 0,
+    total_qty INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR REPLACE INTO order_totals(order_id, total, total_qty)
+    SELECT order_id, SUM(quantity * price), SUM(quantity) FROM order_items GROUP BY order_id;
+CREATE TRIGGER IF NOT EXISTS order_items_price_ai AFTER INSERT ON order_items
+WHEN NEW.price IS NULL BEGIN
+    UPDATE order_items SET price = (SELECT price FROM products WHERE id = NEW.product_id) WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS order_totals_ai AFTER INSERT ON order_items BEGIN
+    INSERT INTO order_totals(order_id, total, total_qty)
+    VALUES (NEW.order_id,
+            NEW.quantity * COALESCE(NEW.price, (SELECT price FROM products WHERE id = NEW.product_id)),
+            NEW.quantity)
+    ON CONFLICT(order_id) DO UPDATE SET total = total + excluded.total, total_qty = total_qty + excluded.total_qty;
+END;
+CREATE TRIGGER IF NOT EXISTS order_totals_au AFTER UPDATE OF order_id, quantity, price ON order_items
+WHEN OLD.price IS NOT NULL BEGIN
+    UPDATE order_totals SET total = total - OLD.quantity * OLD.price, total_qty = total_qty - OLD.quantity
+    WHERE order_id = OLD.order_id;
+    INSERT INTO order_totals(order_id, total, total_qty)
+    VALUES (NEW.order_id, NEW.quantity * NEW.price, NEW.quantity)
+    ON CONFLICT(order_id) DO UPDATE SET total = total + excluded.total, total_qty = total_qty + excluded.total_qty;
+END;
+CREATE TRIGGER IF NOT EXISTS order_totals_ad AFTER DELETE ON order_items BEGIN
+    UPDATE order_totals SET total = total - OLD.quantity * OLD.price, total_qty = total_qty - OLD.quantity
+    WHERE order_id = OLD.order_id;
+END;
+"""
+
+# сводка по дням: число заказов, штук и выручка на дату. Поддерживается триггерами,
+# поэтому графики и сводки по неделям/месяцам читают строки по дням, а не все заказы.
+# Порядок при удалении заказа: BEFORE DELETE видит order_totals, каскадное удаление
+# позиций идёт уже без строки заказа (триггер позиций ничего не вычитает повторно).
+DAILY_STATS_SQL = """
+CREATE TABLE IF NOT EXISTS daily_order_stats(
+    date TEXT PRIMARY KEY,
+    orders INTEGER NOT NULL DEFAULT 0,
+    items INTEGER NOT NULL DEFAULT 0,
+    revenue REAL NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS daily_stats_orders_ai AFTER INSERT ON orders BEGIN
+    INSERT INTO daily_order_stats(date, orders, items, revenue)
+    SELECT NEW.date, 1, COALESCE(t.total_qty, 0), COALESCE(t.total, 0)
+    FROM (SELECT 1) LEFT JOIN order_totals t ON t.order_id = NEW.id WHERE true
+    ON CONFLICT(date) DO UPDATE SET orders = orders + 1, items = items + excluded.items,
+                                    revenue = revenue + excluded.revenue;
+END;
+CREATE TRIGGER IF NOT EXISTS daily_stats_orders_au AFTER UPDATE OF date ON orders
+WHEN OLD.date IS NOT NEW.date BEGIN
+    UPDATE daily_order_stats SET orders = orders - 1,
+        items = items - COALESCE((SELECT total_qty FROM order_totals WHERE order_id = OLD.id), 0),
+        revenue = revenue - COALESCE((SELECT total FROM order_totals WHERE order_id = OLD.id), 0)
+    WHERE date = OLD.date;
+    DELETE FROM daily_order_stats WHERE date = OLD.date AND orders <= 0;
+    INSERT INTO daily_order_stats(date, orders, items, revenue)
+    SELECT NEW.date, 1, COALESCE(t.total_qty, 0), COALESCE(t.total, 0)
+    FROM (SELECT 1) LEFT JOIN order_totals t ON t.order_id = NEW.id WHERE true
+    ON CONFLICT(date) DO UPDATE SET orders = orders + 1, items = items + excluded.items,
+                                    revenue = revenue + excluded.revenue;
+END;
+CREATE TRIGGER IF NOT EXISTS daily_stats_orders_bd BEFORE DELETE ON orders BEGIN
+    UPDATE daily_order_stats SET orders = orders - 1,
+        items = items - COALESCE((SELECT total_qty FROM order_totals WHERE order_id = OLD.id), 0),
+        revenue = revenue - COALESCE((SELECT total FROM order_totals WHERE order_id = OLD.id), 0)
+    WHERE date = OLD.date;
+END;
+CREATE TRIGGER IF NOT EXISTS daily_stats_orders_ad AFTER DELETE ON orders BEGIN
+    DELETE FROM daily_order_stats WHERE date = OLD.date AND orders <= 0;
+END;
+CREATE TRIGGER IF NOT EXISTS daily_stats_items_ai AFTER INSERT ON order_items BEGIN
+    UPDATE daily_order_stats SET items = items + NEW.quantity,
+        revenue = revenue + NEW.quantity * COALESCE(NEW.price, (SELECT price FROM products WHERE id = NEW.product_id))
+    WHERE date = (SELECT date FROM orders WHERE id = NEW.order_id);
+END;
+CREATE TRIGGER IF NOT EXISTS daily_stats_items_au AFTER UPDATE OF order_id, quantity, price ON order_items
+WHEN OLD.price IS NOT NULL BEGIN
+    UPDATE daily_order_stats SET items = items - OLD.quantity, revenue = revenue - OLD.quantity * OLD.price
+    WHERE date = (SELECT date FROM orders WHERE id = OLD.order_id);
+    UPDATE daily_order_stats SET items = items + NEW.quantity, revenue = revenue + NEW.quantity * NEW.price
+    WHERE date = (SELECT date FROM orders WHERE id = NEW.order_id);
+END;
+CREATE TRIGGER IF NOT EXISTS daily_stats_items_ad AFTER DELETE ON order_items BEGIN
+    UPDATE daily_order_stats SET items = items - OLD.quantity, revenue = revenue - OLD.quantity * OLD.price
+    WHERE date = (SELECT date FROM orders WHERE id = OLD.order_id);
+END;
+"""
+
+# день заказа целым числом — дней от 1970-01-01 (orders.day); NULL для нераспознанной даты
+DAY_SQL = "CAST(julianday({}) - 2440587.5 AS INTEGER)"
+
+ORDER_DAY_SQL = f"""
+ALTER TABLE orders ADD COLUMN day INTEGER;
+UPDATE orders SET day = {DAY_SQL.format("date")};
+CREATE INDEX IF NOT EXISTS idx_orders_day ON orders(day);
+CREATE TRIGGER IF NOT EXISTS orders_day_ai AFTER INSERT ON orders
+WHEN NEW.day IS NULL BEGIN
+    UPDATE orders SET day = {DAY_SQL.format("NEW.date")} WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS orders_day_au AFTER UPDATE OF date ON orders BEGIN
+    UPDATE orders SET day = {DAY_SQL.format("NEW.date")} WHERE id = NEW.id;
+END;
+"""
+
+# начало периода (целый день) по целому дню d; неделя — с понедельника (1970-01-01 — четверг).
+# Единственные формулы периодов: по orders.day и по daily_order_stats (через bucket_sql)
+BUCKETS = {
+    "day": "{d}",
+    "week": "{d} - (({d} + 3) % 7 + 7) % 7",
+    "month": DAY_SQL.format("date({d} * 86400, 'unixepoch', 'start of month')"),
+    "quarter": DAY_SQL.format("date({d} * 86400, 'unixepoch', 'start of month', "
+                              "-((CAST(strftime('%m', {d} * 86400, 'unixepoch') AS INTEGER) - 1) % 3) "
+                              "|| ' months')"),
+}
+
+# расчёт сводки по дням с нуля (заполнение при миграции и проверка)
+DAILY_STATS_SELECT = """
+SELECT o.date AS date, COUNT(*) AS orders,
+       COALESCE(SUM(t.total_qty), 0) AS items, COALESCE(SUM(t.total), 0) AS revenue
+FROM orders o LEFT JOIN order_totals t ON t.order_id = o.id
+GROUP BY o.date
+"""
+
+
+# миграции схемы: (версия, название, SQL-скрипт или функция(conn));
+# номер последней применённой хранится в PRAGMA user_version
+MIGRATIONS = [
+    (1, "индексы заказов и позиций", """
+        CREATE INDEX IF NOT EXISTS idx_orders_client_id ON orders(client_id);
+        CREATE INDEX IF NOT EXISTS idx_orders_date ON orders(date);
+        CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items(order_id);
+        CREATE INDEX IF NOT EXISTS idx_order_items_product_id ON order_items(product_id);
+    """),
+    (2, "уникальные email/телефон клиентов", _client_contact_indexes),
+    (3, "полнотекстовый поиск клиентов (FTS5)", _clients_fts),
+    (4, "цена в позициях и таблица итогов заказов", ORDER_TOTALS_SQL),
+    (5, "индексы для постраничной выборки", """
+        CREATE INDEX IF NOT EXISTS idx_order_totals_total ON order_totals(total, order_id);
+        CREATE INDEX IF NOT EXISTS idx_clients_name ON clients(name);
+        CREATE INDEX IF NOT EXISTS idx_products_name ON products(name);
+        CREATE INDEX IF NOT EXISTS idx_products_price ON products(price);
+    """),
+    (6, "сводка заказов по дням", DAILY_STATS_SQL +
+        "INSERT OR REPLACE INTO daily_order_stats(date, orders, items, revenue) " + DAILY_STATS_SELECT + ";"),
+    (7, "целочисленный день заказа", ORDER_DAY_SQL),
+]
+
+# ключи сортировки для постраничной выборки: имя -> (выражение, столбец id)
+CLIENT_SORTS = {"id": ("id", "id"), "name": ("name", "id")}
+PRODUCT_SORTS = {"id": ("id", "id"), "name": ("name", "id"), "price": ("price", "id")}
+ORDER_SORTS = {"id": ("o.id", "o.id"), "date": ("o.date", "o.id"), "total": ("t.total", "t.order_id")}
+
+ORDERS_SELECT = """
+SELECT o.id, o.date, c.name AS client, t.total, t.total_qty
+FROM orders o
+JOIN order_totals t ON t.order_id = o.id
+JOIN clients c ON c.id = o.client_id
+"""
+
+# профили хранения: PRAGMA, применяемые к каждому открываемому соединению
+#   durable   — журнал отката и fsync на каждую транзакцию (настройки SQLite по умолчанию);
+#   balanced  — WAL, fsync только на контрольных точках, крупный кэш и mmap;
+#   bulk-load — без fsync, журнал в памяти: максимальная скорость загрузки, но сбой питания
+#               во время записи может повредить файл
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "durable": {"journal_mode": "DELETE", "synchronous": "FULL", "cache_size": -2000,
+                "mmap_size": 0, "temp_store": "DEFAULT"},
+    "balanced": {"journal_mode": "WAL", "synchronous": "NORMAL", "cache_size": -64000,
+                 "mmap_size": 256 * 1024 * 1024, "temp_store": "MEMORY"},
+    "bulk-load": {"journal_mode": "MEMORY", "synchronous": "OFF", "cache_size": -256000,
+                  "mmap_size": 1024 * 1024 * 1024, "temp_store": "MEMORY"},
+}
+
+
+def apply_profile(conn: sqlite3.Connection, profile: str, *, journal: bool = True) -> Dict[str, Any]:
+    # journal=False — не трогать режим журнала (пул соединений держит WAL)
+    if profile not in PROFILES:
+        raise ValueError(f"Неизвестный профиль: {profile}")
+    applied = {}
+    for pragma, value in PROFILES[profile].items():
+        if pragma == "journal_mode" and not journal:
+            continue
+        conn.execute(f"PRAGMA {pragma} = {value}")
+        applied[pragma] = conn.execute(f"PRAGMA {pragma}").fetchone()[0]
+    return applied
+
+
+# порядок важен: родительские таблицы раньше дочерних
+TABLES = ("clients", "products", "orders", "order_items")
+
+TABLE_COLUMNS = {
+    "clients": ("id", "name", "email", "phone", "address"),
+    "products": ("id", "name", "price"),
+    "orders": ("id", "client_id", "date"),
+    "order_items": ("id", "order_id", "product_id", "quantity", "price"),
+}
+
+# в CSV для Excel эти столбцы выгружаются как текст (префикс ')
+CSV_TEXT_COLUMNS = ("phone", "date")
+
+# листы XLSX: (таблица, форматы столбцов, ширины столбцов)
+XLSX_SHEETS = (
+    ("clients", {}, {"name": 20, "email": 28, "phone": 16, "address": 22}),
+    ("products", {"price": "0.00"}, {"name": 24, "price": 12}),
+    ("orders", {"date": "yyyy-mm-dd"}, {"date": 14}),
+    ("order_items", {"price": "0.00"}, {}),
+)
+# предел строк на листе Excel
+XLSX_MAX_ROWS = 1_048_576
+
+# начиная с этого размера файла импорт удаляет вторичные индексы и строит их заново в конце
+INDEX_REBUILD_BYTES = 64 * 1024 * 1024
+# колонки файла импорта клиентов и файла отказов
+CLIENT_IMPORT_COLUMNS = ("name", "email", "phone", "address")
+REJECT_COLUMNS = ("line", "reason") + CLIENT_IMPORT_COLUMNS
+
+
 class Database:
-    def __init__(self, path: str = "orders.sqlite"):
+    def __init__(self, path: str = "orders.sqlite", conn: Optional[sqlite3.Connection] = None,
+                 profile: Optional[str] = None):
+        # conn — готовое соединение (например, из ConnectionPool); такое соединение close() не закрывает.
+        # profile — имя из PROFILES; None — настройки SQLite по умолчанию
+        if profile is not None and profile not in PROFILES:
+            raise ValueError(f"Неизвестный профиль: {profile}")
         self.path = path
-        self._conn: Optional[sqlite3.Connection] = None
+        self.profile = profile
+        # listeners: fn(table, id) после каждого изменения (id=None — изменена вся таблица)
+        self.listeners: List[Callable[[str, Optional[int]], None]] = []
+        self._conn: Optional[sqlite3.Connection] = conn
+        self._owns_conn = conn is None
+        self._fts: Optional[bool] = None
 
     def connect(self):
         if self._conn is None:
-            self._conn = sqlite3.connect(self.path)
+            self._conn = sqlite3.connect(self.path, factory=connection_factory())
             self._conn.row_factory = sqlite3.Row
+            self._conn.execute("PRAGMA foreign_keys = ON")
+            if self.profile:
+                apply_profile(self._conn, self.profile)
 
     @property
     def conn(self) -> sqlite3.Connection:
         self.connect()
         return self._conn
 
-    def init_schema(self):
+    def _changed(self, table: str, ident: Optional[int] = None):
+        for fn in list(self.listeners):
+            fn(table, ident)
+
+    def close(self):
+        if self._conn is not None and self._owns_conn:
+            self._conn.close()
+        self._conn = None
+        self._owns_conn = True
+
+    def init_schema(self) -> List[Dict[str, Any]]:
         self.conn.executescript(DB_SCHEMA)
         self.conn.commit()
+        return self.migrate()
+
+    @property
+    def schema_version(self) -> int:
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def migrate(self) -> List[Dict[str, Any]]:
+        # Применяет недостающие миграции, каждую в своей транзакции; возвращает время каждой.
+        report = []
+        for version, name, step in MIGRATIONS:
+            if version <= self.schema_version:
+                continue
+            t0 = time.perf_counter()
+            if callable(step):
+                with self.transaction() as conn:
+                    step(conn)
+                    conn.execute(f"PRAGMA user_version = {version}")
+            else:
+                try:
+                    self.conn.executescript(f"BEGIN IMMEDIATE;\n{step}\nPRAGMA user_version = {version};\nCOMMIT;")
+                except sqlite3.Error:
+                    if self.conn.in_transaction:
+                        self.conn.rollback()
+                    raise
+            report.append({"version": version, "name": name, "seconds": time.perf_counter() - t0})
+        self._fts = None
+        return report
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self.conn
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+
+    def _next_id(self, table: str) -> int:
+        row = self.conn.execute(
+            f"SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = ?), 0), "
+            f"COALESCE((SELECT MAX(id) FROM {table}), 0))",
+            (table,)
+        ).fetchone()
+        return row[0] + 1
 
     def add_client(self, name: str, email: str, phone: str, address: str):
         row = self.conn.execute(
-            "SELECT id, name, email, phone FROM clients WHERE email = ? OR phone = ?",
+            "SELECT id, name, email, phone FROM clients "
+            "WHERE (email = ? AND email <> '') OR (phone = ? AND phone <> '')",
             (email, phone)
         ).fetchone()
         if row:
@@ -73,20 +419,46 @@ class Database:
             (name, email, phone, address)
         )
         self.conn.commit()
+        self._changed("clients", cur.lastrowid)
         return cur.lastrowid
 
     def list_clients(self) -> List[sqlite3.Row]:
         return list(self.conn.execute("SELECT * FROM clients ORDER BY id"))
 
-    def find_clients(self, q: str) -> List[sqlite3.Row]:
+    @property
+    def has_fts(self) -> bool:
+        if self._fts is None:
+            self._fts = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'clients_fts'"
+            ).fetchone() is not None
+        return self._fts
+
+    def find_clients(self, q: str, limit: Optional[int] = 200) -> List[sqlite3.Row]:
+        # FTS5: каждое слово запроса ищется как префикс, результаты по релевантности (bm25)
+        limit = -1 if limit is None else int(limit)
+        if self.has_fts:
+            match = _fts_query(q)
+            if not match:
+                return []
+            return list(self.conn.execute(
+                "SELECT c.* FROM clients_fts f JOIN clients c ON c.id = f.rowid "
+                "WHERE clients_fts MATCH ? ORDER BY f.rank, c.id LIMIT ?",
+                (match, limit)
+            ))
         q = f"%{q.strip()}%"
         return list(self.conn.execute(
             "SELECT * FROM clients "
             "WHERE name LIKE ? OR email LIKE ? OR phone LIKE ? OR address LIKE ? "
-            "ORDER BY id",
-            (q, q, q, q)
+            "ORDER BY id LIMIT ?",
+            (q, q, q, q, limit)
         ))
 
+    def get_client(self, cid: int) -> Optional[sqlite3.Row]:
+        return self.conn.execute("SELECT * FROM clients WHERE id = ?", (int(cid),)).fetchone()
+
+    def get_product(self, pid: int) -> Optional[sqlite3.Row]:
+        return self.conn.execute("SELECT * FROM products WHERE id = ?", (int(pid),)).fetchone()
+
     def get_client_by_id(self, cid: int):
         return list(self.conn.execute(
             "SELECT * FROM clients WHERE id = ? ORDER BY id", (int(cid),)
@@ -97,14 +469,26 @@ class Database:
             "INSERT INTO products(name,price) VALUES(?,?)", (name, float(price))
         )
         self.conn.commit()
+        self._changed("products", cur.lastrowid)
         return cur.lastrowid
 
     def list_products(self) -> List[sqlite3.Row]:
         return list(self.conn.execute("SELECT * FROM products ORDER BY id"))
 
+    def find_products(self, q: str, limit: Optional[int] = 200) -> List[sqlite3.Row]:
+        # число — поиск по id, иначе подстрока названия; сначала названия, начинающиеся с запроса
+        limit = -1 if limit is None else int(limit)
+        q = q.strip()
+        if q.isdigit():
+            return list(self.conn.execute("SELECT * FROM products WHERE id = ?", (int(q),)))
+        return list(self.conn.execute(
+            "SELECT * FROM products WHERE name LIKE ? ORDER BY name NOT LIKE ?, name, id LIMIT ?",
+            (f"%{q}%", f"{q}%", limit)
+        ))
+
     def create_order(self, client_id: int, date: str, items: List[Tuple[int, int]]) -> int:
         cur = self.conn.execute(
-            "INSERT INTO orders(client_id,date) VALUES(?,?)", (client_id, date)
+            f"INSERT INTO orders(client_id,date,day) VALUES(?1,?2,{DAY_SQL.format('?2')})", (client_id, date)
         )
         order_id = cur.lastrowid
         self.conn.executemany(
@@ -112,15 +496,110 @@ class Database:
             [(order_id, pid, qty) for (pid, qty) in items],
         )
         self.conn.commit()
+        self._changed("orders", order_id)
         return order_id
 
+    def add_clients_bulk(self, rows: Iterable[Tuple[str, str, str, str]], batch_size: int = 10_000) -> List[int]:
+        # rows: (name, email, phone, address) без проверок (проверяющий импорт — import_clients);
+        # пачка из batch_size строк — одна транзакция, id выделяются подряд; возвращает id
+        return self._insert_bulk("clients", ("name", "email", "phone", "address"), rows, batch_size)
+
+    def add_products_bulk(self, rows: Iterable[Tuple[str, float]], batch_size: int = 10_000) -> List[int]:
+        # rows: (name, price); отрицательная цена — ValueError до записи пачки
+        def checked():
+            for name, price in rows:
+                price = float(price)
+                if price < 0:
+                    raise ValueError(f"Цена не может быть отрицательной: {name}")
+                yield name, price
+        return self._insert_bulk("products", ("name", "price"), checked(), batch_size)
+
+    def _insert_bulk(self, table: str, columns: Tuple[str, ...], rows: Iterable[tuple],
+                     batch_size: int) -> List[int]:
+        if batch_size <= 0:
+            raise ValueError("Размер пачки должен быть > 0")
+        sql = f"INSERT INTO {table}(id,{','.join(columns)}) VALUES({','.join('?' * (len(columns) + 1))})"
+        ids: List[int] = []
+        it = iter(rows)
+        while True:
+            batch = list(islice(it, batch_size))
+            if not batch:
+                break
+            with self.transaction() as conn:
+                first = self._next_id(table)
+                conn.executemany(sql, ((i, *r) for i, r in zip(range(first, first + len(batch)), batch)))
+            ids.extend(range(first, first + len(batch)))
+        if ids:
+            self._changed(table)
+        return ids
+
+    def create_orders_bulk(self, records: Iterable[Tuple[int, str, Iterable[Any]]], batch_size: int = 1000
+                           ) -> Tuple[List[int], List[Dict[str, Any]]]:
+        # records: (client_id, date, items); позиция — OrderItem, (product_id, quantity) или dict.
+        # Каждая пачка из batch_size заказов пишется одной транзакцией; при ошибке
+        # валидации уже записанные пачки остаются в БД.
+        if batch_size <= 0:
+            raise ValueError("Размер пачки должен быть > 0")
+        order_ids: List[int] = []
+        report: List[Dict[str, Any]] = []
+        it = iter(records)
+        n = 0
+        while True:
+            batch = list(islice(it, batch_size))
+            if not batch:
+                break
+            t0 = time.perf_counter()
+            prepared = OrderBatch()
+            for client_id, date, items in batch:
+                n += 1
+                try:
+                    prepared.add(client_id, date, items)
+                except (TypeError, ValueError, KeyError) as e:
+                    raise ValueError(f"Запись {n}: {e}") from e
+
+            with self.transaction() as conn:
+                ids = self._insert_order_batch(conn, prepared)
+            dt = time.perf_counter() - t0
+            order_ids.extend(ids)
+            report.append({
+                "batch": len(report) + 1,
+                "orders": len(ids),
+                "items": prepared.n_items,
+                "seconds": dt,
+                "orders_per_sec": len(ids) / dt if dt > 0 else float("inf"),
+            })
+        if order_ids:
+            self._changed("orders")
+        return order_ids, report
+
+    def write_order_batch(self, batch: OrderBatch) -> List[int]:
+        # вся пачка — одна транзакция: executemany по заказам и по позициям; возвращает id заказов
+        if not len(batch):
+            return []
+        with self.transaction() as conn:
+            ids = self._insert_order_batch(conn, batch)
+        self._changed("orders")
+        return list(ids)
+
+    def _insert_order_batch(self, conn: sqlite3.Connection, batch: OrderBatch) -> range:
+        first_id = self._next_id("orders")
+        conn.executemany(f"INSERT INTO orders(id,client_id,date,day) VALUES(?1,?2,?3,{DAY_SQL.format('?3')})",
+                         batch.order_rows(first_id))
+        # цена берётся в том же INSERT — триггер order_items_price_ai не делает UPDATE на каждую позицию
+        conn.executemany("INSERT INTO order_items(order_id,product_id,quantity,price) "
+                         "VALUES(?1,?2,?3,(SELECT price FROM products WHERE id = ?2))", batch.item_rows(first_id))
+        return range(first_id, first_id + len(batch))
+
     def delete_client(self, client_id: int):
         self.conn.execute("DELETE FROM clients WHERE id=?", (client_id,))
         self.conn.commit()
+        self._changed("clients", client_id)
+        self._changed("orders")
 
     def delete_order(self, order_id: int):
         self.conn.execute("DELETE FROM orders WHERE id=?", (order_id,))
         self.conn.commit()
+        self._changed("orders", order_id)
 
     def delete_product(self, product_id: int):
         cnt = self.conn.execute(
@@ -130,126 +609,412 @@ class Database:
             raise ValueError("Нельзя удалить товар: он используется в заказах")
         self.conn.execute("DELETE FROM products WHERE id=?", (product_id,))
         self.conn.commit()
+        self._changed("products", product_id)
 
     def list_orders(self) -> List[sqlite3.Row]:
-        sql = """
-        SELECT o.id, o.date, c.name AS client,
-               SUM(oi.quantity * p.price) AS total,
-               SUM(oi.quantity) AS total_qty
-        FROM orders o
-        JOIN clients c ON c.id = o.client_id
-        JOIN order_items oi ON oi.order_id = o.id
-        JOIN products p ON p.id = oi.product_id
-        GROUP BY o.id, o.date, c.name
-        ORDER BY o.date DESC, o.id DESC
-        """
-        return list(self.conn.execute(sql))
+        return list(self.conn.execute(ORDERS_SELECT + "ORDER BY o.date DESC, o.id DESC"))
+
+    def _keyset_page(self, sql: str, where: List[str], params: List[Any], sort: Tuple[str, str],
+                     after: Optional[Tuple[Any, Any]], limit: int, descending: bool,
+                     offset: int = 0) -> List[sqlite3.Row]:
+        # seek-пагинация: WHERE (ключ, id) > (после) ORDER BY ключ, id LIMIT n — по индексу,
+        # без OFFSET, поэтому следующая страница стоит одинаково в любом месте таблицы.
+        # offset — для переходов без известного ключа (прыжок полосой прокрутки): один запрос вместо цепочки страниц
+        sort_expr, id_expr = sort
+        op, direction = ("<", "DESC") if descending else (">", "ASC")
+        where, params = list(where), list(params)
+        if after is not None:
+            if sort_expr == id_expr:
+                where.append(f"{id_expr} {op} ?")
+                params.append(after[-1])
+            else:
+                where.append(f"({sort_expr}, {id_expr}) {op} (?, ?)")
+                params.extend(after)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        order = [f"{id_expr} {direction}"] if sort_expr == id_expr else \
+            [f"{sort_expr} {direction}", f"{id_expr} {direction}"]
+        sql += " ORDER BY " + ", ".join(order) + " LIMIT ?"
+        params.append(int(limit))
+        if offset:
+            sql += " OFFSET ?"
+            params.append(int(offset))
+        return list(self.conn.execute(sql, params))
+
+    def page_clients(self, after: Optional[Tuple[Any, Any]] = None, limit: int = 200, *, offset: int = 0,
+                     order_by: str = "id", descending: bool = False) -> List[sqlite3.Row]:
+        return self._keyset_page("SELECT * FROM clients", [], [], _sort(CLIENT_SORTS, order_by),
+                                 after, limit, descending, offset)
+
+    def page_products(self, after: Optional[Tuple[Any, Any]] = None, limit: int = 200, *, offset: int = 0,
+                      order_by: str = "id", descending: bool = False) -> List[sqlite3.Row]:
+        return self._keyset_page("SELECT * FROM products", [], [], _sort(PRODUCT_SORTS, order_by),
+                                 after, limit, descending, offset)
+
+    def page_orders(self, after: Optional[Tuple[Any, Any]] = None, limit: int = 200, *, offset: int = 0,
+                    order_by: str = "date", descending: bool = True,
+                    date_from: Optional[str] = None, date_to: Optional[str] = None,
+                    client_id: Optional[int] = None) -> List[sqlite3.Row]:
+        where, params = _order_filters(date_from, date_to, client_id)
+        return self._keyset_page(ORDERS_SELECT, where, params, _sort(ORDER_SORTS, order_by),
+                                 after, limit, descending, offset)
+
+    def count_clients(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM clients").fetchone()[0]
+
+    def count_products(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def count_orders(self, *, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                     client_id: Optional[int] = None) -> int:
+        where, params = _order_filters(date_from, date_to, client_id)
+        sql = "SELECT COUNT(*) FROM orders o JOIN order_totals t ON t.order_id = o.id"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return self.conn.execute(sql, params).fetchone()[0]
+
+    def orders_in_range(self, date_from: Optional[str] = None, date_to: Optional[str] = None, *,
+                        client_id: Optional[int] = None) -> List[sqlite3.Row]:
+        # заказы за период (границы включительно) по возрастанию даты
+        where, params = _order_filters(date_from, date_to, client_id)
+        sql = ORDERS_SELECT + (" WHERE " + " AND ".join(where) if where else "") + " ORDER BY o.day, o.id"
+        return list(self.conn.execute(sql, params))
+
+    def order_buckets(self, period: str = "week", date_from: Optional[str] = None,
+                      date_to: Optional[str] = None, *, client_id: Optional[int] = None) -> List[sqlite3.Row]:
+        # заказы, штуки и выручка по дням/неделям/месяцам/кварталам (BUCKETS) за период;
+        # period в строке — дата начала периода 'YYYY-MM-DD'
+        sql, params = order_buckets_query(period, date_from, date_to, client_id)
+        return list(self.conn.execute(sql, params))
+
+    def order_date_range(self) -> Tuple[Optional[str], Optional[str]]:
+        # первая и последняя дата заказов — по краям индекса orders(day)
+        r = self.conn.execute("SELECT date(MIN(day) * 86400, 'unixepoch'), date(MAX(day) * 86400, 'unixepoch') "
+                              "FROM orders").fetchone()
+        return r[0], r[1]
+
+    def iter_clients(self, page_size: int = 200, **kw) -> Iterator[sqlite3.Row]:
+        return _iter_pages(self.page_clients, page_size, kw.get("order_by", "id"), kw)
+
+    def iter_products(self, page_size: int = 200, **kw) -> Iterator[sqlite3.Row]:
+        return _iter_pages(self.page_products, page_size, kw.get("order_by", "id"), kw)
+
+    def iter_orders(self, page_size: int = 200, **kw) -> Iterator[sqlite3.Row]:
+        return _iter_pages(self.page_orders, page_size, kw.get("order_by", "date"), kw)
 
     def order_items(self, order_id: int) -> List[sqlite3.Row]:
         sql = """
-        SELECT oi.id, p.name, p.price, oi.quantity, (p.price*oi.quantity) AS line_total
+        SELECT oi.id, p.name, oi.price, oi.quantity, (oi.price*oi.quantity) AS line_total
         FROM order_items oi
         JOIN products p ON p.id = oi.product_id
         WHERE oi.order_id=?
         """
         return list(self.conn.execute(sql, (order_id,)))
 
+    # --- сводка по дням (daily_order_stats) ---
+
+    def check_daily_stats(self, *, fix: bool = False, tolerance: float = 0.005) -> List[Dict[str, Any]]:
+        # Сверяет сводку с пересчётом по заказам; возвращает расхождения по датам
+        # ({"date", "expected", "actual"}), при fix=True пересобирает сводку.
+        expected = {r["date"]: tuple(r)[1:] for r in self.conn.execute(DAILY_STATS_SELECT)}
+        actual = {r["date"]: tuple(r)[1:] for r in self.conn.execute(
+            "SELECT date, orders, items, revenue FROM daily_order_stats")}
+        diffs = []
+        for date in sorted(expected.keys() | actual.keys()):
+            e, a = expected.get(date), actual.get(date)
+            if e is None or a is None or e[:2] != a[:2] or abs(e[2] - a[2]) > tolerance:
+                diffs.append({"date": date, "expected": e, "actual": a})
+        if diffs and fix:
+            self.rebuild_daily_stats()
+        return diffs
+
+    def rebuild_daily_stats(self):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM daily_order_stats")
+            conn.execute("INSERT INTO daily_order_stats(date, orders, items, revenue) " + DAILY_STATS_SELECT)
+
+    @contextmanager
+    def snapshot(self) -> Iterator[sqlite3.Connection]:
+        # Одна читающая транзакция: все SELECT внутри видят одно состояние БД, даже если
+        # параллельно идёт запись (выгрузки на читателях пула). Внутри уже открытой транзакции — она сама.
+        conn = self.conn
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            conn.commit()
+
     def export_json(self, out_path: str):
-        data = {
-            "clients": [dict(row) for row in self.list_clients()],
-            "products": [dict(row) for row in self.list_products()],
-            "orders": [dict(row) for row in self.conn.execute("SELECT * FROM orders")],
-            "order_items": [dict(row) for row in self.conn.execute("SELECT * FROM order_items")],
-        }
+        with self.snapshot() as conn:
+            data = {t: [dict(row) for row in conn.execute(f"SELECT * FROM {t} ORDER BY id")] for t in TABLES}
         Path(out_path).write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
 
+    def export_ndjson(self, out_path: str, *, chunk_size: int = 1000, progress=None) -> int:
+        # Построчный дамп: {"table": ..., "row": {...}} на строку; в памяти не больше chunk_size строк.
+        # progress(table, done, total) вызывается после каждой порции. Все таблицы читаются
+        # в одном снимке БД — дамп согласован по внешним ключам при параллельной записи.
+        written = 0
+        with open(out_path, "w", encoding="utf-8", newline="\n") as f, self.snapshot() as conn:
+            for table in TABLES:
+                total = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                done = 0
+                if progress:
+                    progress(table, done, total)
+                cur = conn.execute(f"SELECT * FROM {table} ORDER BY id")
+                cols = [d[0] for d in cur.description]
+                while True:
+                    rows = cur.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    f.writelines(
+                        json.dumps({"table": table, "row": dict(zip(cols, r))}, ensure_ascii=False) + "\n"
+                        for r in rows
+                    )
+                    done += len(rows)
+                    if progress:
+                        progress(table, done, total)
+                written += done
+        return written
+
     def import_json(self, in_path: str):
-        data = json.loads(Path(in_path).read_text(encoding="utf-8"))
-        cur = self.conn
-        cur.execute("DELETE FROM order_items")
-        cur.execute("DELETE FROM orders")
-        cur.execute("DELETE FROM products")
-        cur.execute("DELETE FROM clients")
-        for t, rows in data.items():
-            if t == "clients":
-                cur.executemany("INSERT INTO clients(id,name,email,phone,address) VALUES(?,?,?,?,?)",
-                                [(r.get("id"), r["name"], r.get("email",""), r.get("phone",""), r.get("address","")) for r in rows])
-            elif t == "products":
-                cur.executemany("INSERT INTO products(id,name,price) VALUES(?,?,?)",
-                                [(r.get("id"), r["name"], float(r["price"])) for r in rows])
-            elif t == "orders":
-                cur.executemany("INSERT INTO orders(id,client_id,date) VALUES(?,?,?)",
-                                [(r.get("id"), r["client_id"], r["date"]) for r in rows])
-            elif t == "order_items":
-                cur.executemany("INSERT INTO order_items(id,order_id,product_id,quantity) VALUES(?,?,?,?)",
-                                [(r.get("id"), r["order_id"], r["product_id"], r["quantity"]) for r in rows])
-        self.conn.commit()
+        self.import_data(in_path, mode="replace")
+
+    def import_data(self, in_path: str, *, mode: str = "replace", chunk_size: int = 5000,
+                    rebuild_indexes: Optional[bool] = None, progress=None) -> Dict[str, int]:
+        # Потоковый импорт JSON-дампа (export_json) или NDJSON (export_ndjson) одной транзакцией.
+        # mode="replace" — очистить таблицы и залить заново, mode="merge" — upsert по id.
+        # rebuild_indexes=None — пересоздавать вторичные индексы только для больших файлов.
+        if mode not in ("replace", "merge"):
+            raise ValueError(f"Неизвестный режим импорта: {mode}")
+        if rebuild_indexes is None:
+            rebuild_indexes = Path(in_path).stat().st_size >= INDEX_REBUILD_BYTES
+        counts = {t: 0 for t in TABLES}
+        buffers: Dict[str, List[tuple]] = {t: [] for t in TABLES}
+        sql = {t: _import_sql(t, upsert=(mode == "merge")) for t in TABLES}
 
-    def export_csv(self, folder: str = "export_csv", *, encoding: str = "cp1251", excel_friendly: bool = True):
-        p = Path(folder);
+        def flush(table: str):
+            rows = buffers[table]
+            if rows:
+                conn.executemany(sql[table], rows)
+                counts[table] += len(rows)
+                rows.clear()
+                if progress:
+                    progress(table, counts[table], None)
+
+        with self.transaction() as conn:
+            conn.execute("PRAGMA defer_foreign_keys = ON")
+            indexes = self._secondary_indexes() if rebuild_indexes else []
+            for name, _ in indexes:
+                conn.execute(f'DROP INDEX "{name}"')
+            if mode == "replace":
+                for t in reversed(TABLES):
+                    conn.execute(f"DELETE FROM {t}")
+            for table, row in _iter_dump_records(in_path):
+                if table not in buffers:
+                    continue
+                buffers[table].append(_import_values(table, row))
+                if len(buffers[table]) >= chunk_size:
+                    # сначала родительские таблицы: позиции без цены берут её из уже вставленных товаров
+                    for t in TABLES[:TABLES.index(table) + 1]:
+                        flush(t)
+            for t in TABLES:
+                flush(t)
+            for _, index_sql in indexes:
+                conn.execute(index_sql)
+        for t in TABLES:
+            self._changed(t)
+        return counts
+
+    def import_clients(self, in_path: str, *, batch_size: int = 50_000, rejects_path: Optional[str] = None,
+                       encoding: str = "utf-8-sig", progress=None) -> Dict[str, Any]:
+        # Массовый импорт клиентов из CSV (заголовок name;email;phone;address, разделитель , или ;)
+        # или NDJSON. Email/телефоны существующих клиентов читаются один раз в словари
+        # нормализованное значение -> id; дубли внутри файла и с БД, строки без имени и с
+        # некорректными email/телефоном не вставляются, а пишутся в файл отказов
+        # (по умолчанию <файл>.rejects.csv). Вставка — executemany пачками по batch_size,
+        # каждая пачка — одна транзакция.
+        if batch_size <= 0:
+            raise ValueError("Размер пачки должен быть > 0")
+        t0 = time.perf_counter()
+        rejects_path = rejects_path or str(in_path) + ".rejects.csv"
+        # значение -> id клиента в БД (int) или «строка N» файла; при дублях в БД — меньший id
+        seen: Dict[str, Dict[str, Any]] = {}
+        for col, norm in (("email", normalize_email), ("phone", normalize_phone)):
+            found = seen[col] = {}
+            for cid, value in self.conn.execute(
+                    f"SELECT id, {col} FROM clients WHERE {col} <> '' ORDER BY id DESC"):
+                found[norm(value)] = cid
+            found.pop("", None)
+        fts_trigger = self.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'clients_fts_ai'").fetchone()
+        stats = {"read": 0, "inserted": 0, "invalid": 0, "duplicates": 0}
+        rejected = 0
+
+        with open(rejects_path, "w", newline="", encoding="utf-8-sig") as rf:
+            rw = csv.writer(rf, delimiter=";")
+            rw.writerow(REJECT_COLUMNS)
+            records = _iter_client_records(in_path, encoding)
+            while True:
+                batch = list(islice(records, batch_size))
+                if not batch:
+                    break
+                stats["read"] += len(batch)
+                rows, rejects = _prepare_clients(batch, seen)
+                for line, reason, rec in rejects:
+                    stats["duplicates" if reason.startswith("дубль") else "invalid"] += 1
+                    rw.writerow((line, reason) + rec)
+                rejected += len(rejects)
+                if rows:
+                    with self.transaction() as conn:
+                        first = self._next_id("clients")
+                        if fts_trigger:
+                            # построчный триггер FTS в разы медленнее одной вставки INSERT … SELECT
+                            # на пачку; при ошибке откат транзакции вернёт и триггер
+                            conn.execute("DROP TRIGGER clients_fts_ai")
+                        conn.executemany("INSERT INTO clients(id, name, email, phone, address) VALUES (?, ?, ?, ?, ?)",
+                                         [(i,) + r for i, r in enumerate(rows, first)])
+                        if fts_trigger:
+                            conn.execute("INSERT INTO clients_fts(rowid, name, email, phone, address) "
+                                         "SELECT id, name, email, phone, address FROM clients WHERE id >= ?", (first,))
+                            conn.execute(fts_trigger[0])
+                    stats["inserted"] += len(rows)
+                if progress:
+                    progress("clients", stats["read"], None)
+        if not rejected:
+            Path(rejects_path).unlink()
+        if stats["inserted"]:
+            self._changed("clients")
+        stats.update(rejects=rejects_path if rejected else None, seconds=time.perf_counter() - t0)
+        return stats
+
+    def _secondary_indexes(self) -> List[Tuple[str, str]]:
+        marks = ",".join("?" * len(TABLES))
+        return [(r[0], r[1]) for r in self.conn.execute(
+            f"SELECT name, sql FROM sqlite_master "
+            f"WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({marks})", TABLES
+        )]
+
+    def read_connection(self) -> Optional[sqlite3.Connection]:
+        # Отдельное read-only соединение (для параллельных выгрузок); для БД в памяти — None.
+        if self.path == ":memory:" or self.path.startswith("file:") or not Path(self.path).exists():
+            return None
+        return sqlite3.connect(Path(self.path).resolve().as_uri() + "?mode=ro", uri=True,
+                               check_same_thread=False)
+
+    def _pin_snapshot(self, readers: List[sqlite3.Connection], timeout: float = 1.0) -> bool:
+        # Открывает читающие транзакции на всех readers в одном состоянии БД: пока они
+        # начинаются, отдельное соединение держит блокировку записи (BEGIN IMMEDIATE), и коммит
+        # между ними невозможен. Не дождались блокировки за timeout — False (читать последовательно).
+        lock = sqlite3.connect(self.path, timeout=timeout)
+        try:
+            lock.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            lock.close()
+            return False
+        try:
+            for c in readers:
+                c.execute("BEGIN")
+                c.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        finally:
+            lock.rollback()
+            lock.close()
+        return True
+
+    def export_csv(self, folder: str = "export_csv", *, encoding: str = "cp1251", excel_friendly: bool = True,
+                   chunk_size: int = 5000, parallel: bool = True):
+        p = Path(folder)
         p.mkdir(exist_ok=True)
 
-        def dump(sql: str, fname: str):
-            rows = list(self.conn.execute(sql))
-            with (p / fname).open("w", newline="", encoding=encoding, errors="replace") as f:
+        def dump(conn: sqlite3.Connection, table: str):
+            cur = conn.execute(f"SELECT * FROM {table} ORDER BY id")
+            headers = [d[0] for d in cur.description]
+            text_cols = [i for i, h in enumerate(headers) if excel_friendly and h in CSV_TEXT_COLUMNS]
+            with (p / f"{table}.csv").open("w", newline="", encoding=encoding, errors="replace") as f:
                 if excel_friendly:
                     f.write("sep=;\n")
                 w = csv.writer(f, delimiter=';' if excel_friendly else ',', quoting=csv.QUOTE_MINIMAL)
-                if rows:
-                    headers = list(rows[0].keys())
-                    w.writerow(headers)
-                    for r in rows:
-                        out = []
-                        for h in headers:
-                            val = r[h]
-                            if excel_friendly and h in ("phone", "date") and val is not None:
-                                val = f"'{val}"
-                            out.append(val)
-                        w.writerow(out)
+                w.writerow(headers)
+                if text_cols:
+                    convert = _csv_text_row(text_cols)
+                    write = lambda rows: w.writerows(map(convert, rows))
                 else:
-                    w.writerow([])
+                    write = w.writerows
+                while True:
+                    rows = cur.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    write(rows)
 
-        dump("SELECT * FROM clients", "clients.csv")
-        dump("SELECT * FROM products", "products.csv")
-        dump("SELECT * FROM orders", "orders.csv")
-        dump("SELECT * FROM order_items", "order_items.csv")
+        readers = [self.read_connection() for _ in TABLES] if parallel else []
+        if not readers or None in readers or not self._pin_snapshot(readers):
+            for c in readers:
+                if c is not None:
+                    c.close()
+            with self.snapshot() as conn:
+                for t in TABLES:
+                    dump(conn, t)
+            return
 
+        try:
+            with ThreadPoolExecutor(max_workers=len(TABLES)) as pool:
+                for fut in [pool.submit(dump, c, t) for c, t in zip(readers, TABLES)]:
+                    fut.result()
+        finally:
+            for c in readers:
+                c.close()
 
+    def export_xlsx(self, out_path: str = "export.xlsx", *, chunk_size: int = 5000,
+                    max_rows: int = XLSX_MAX_ROWS):
+        # write-only книга: строки пишутся сразу в файл, форматы и ширины задаются при записи.
+        # Таблица длиннее max_rows (включая заголовок) продолжается на листах title_2, title_3, ...
+        # openpyxl нужен только для выгрузки — импорт при первом вызове, а не при запуске
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.utils import get_column_letter
 
-    def export_xlsx(self, out_path: str = "export.xlsx"):
-        wb = Workbook();
-        wb.remove(wb.active)
+        wb = Workbook(write_only=True)
 
-        def add_sheet(title: str, sql: str, formats=None, widths=None):
+        def new_sheet(title: str, headers: List[str], widths: Dict[str, float]):
             ws = wb.create_sheet(title)
-            rows = list(self.conn.execute(sql))
-            if not rows:
-                return
-            headers = list(rows[0].keys())
+            for col_name, w in widths.items():
+                if col_name in headers:
+                    ws.column_dimensions[get_column_letter(headers.index(col_name) + 1)].width = w
             ws.append(headers)
-            for r in rows:
-                ws.append([r[h] for h in headers])
+            return ws
 
+        def add_sheet(title: str, sql: str, formats=None, widths=None):
+            cur = self.conn.execute(sql)
+            headers = [d[0] for d in cur.description]
             formats = formats or {}
-            for col_name, fmt in formats.items():
-                if col_name in headers:
-                    c = headers.index(col_name) + 1
-                    for cell in ws.iter_rows(min_row=2, min_col=c, max_col=c):
-                        for x in cell: x.number_format = fmt
-
             widths = widths or {}
-            for col_name, w in widths.items():
-                if col_name in headers:
-                    c = headers.index(col_name) + 1
-                    ws.column_dimensions[get_column_letter(c)].width = w
+            fmt_cols = [(headers.index(c), f) for c, f in formats.items() if c in headers]
 
-        add_sheet("clients", "SELECT * FROM clients",
-                  widths={"name": 20, "email": 28, "phone": 16, "address": 22})
-        add_sheet("products", "SELECT * FROM products",
-                  formats={"price": "0.00"}, widths={"name": 24, "price": 12})
-        add_sheet("orders", "SELECT * FROM orders",
-                  formats={"date": "yyyy-mm-dd"}, widths={"date": 14})
-        add_sheet("order_items", "SELECT * FROM order_items")
+            part = 1
+            ws = new_sheet(title, headers, widths)
+            used = 1
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for r in rows:
+                    if used >= max_rows:
+                        part += 1
+                        ws = new_sheet(f"{title}_{part}", headers, widths)
+                        used = 1
+                    values = list(r)
+                    for i, fmt in fmt_cols:
+                        cell = WriteOnlyCell(ws, value=values[i])
+                        cell.number_format = fmt
+                        values[i] = cell
+                    ws.append(values)
+                    used += 1
+
+        with self.snapshot():
+            for title, formats, widths in XLSX_SHEETS:
+                add_sheet(title, f"SELECT * FROM {title} ORDER BY id", formats, widths)
 
         wb.save(out_path)
 
@@ -266,3 +1031,287 @@ class Database:
         self.create_order(a, "2025-08-13", [(s, 1)])
         self.create_order(b, "2025-08-13", [(m, 1), (s, 1)])
         self.create_order(c, "2025-08-14", [(w, 3)])
+
+
+# время публичных методов — в metrics.METRICS.methods, когда замеры включены
+instrument_methods(Database, skip=("connect", "close", "transaction", "snapshot", "iter_clients", "iter_products", "iter_orders"))
+
+
+def _sort(sorts: Dict[str, Tuple[str, str]], order_by: str) -> Tuple[str, str]:
+    if order_by not in sorts:
+        raise ValueError(f"Сортировка по «{order_by}» не поддерживается")
+    return sorts[order_by]
+
+
+def _order_filters(date_from: Optional[str], date_to: Optional[str],
+                   client_id: Optional[int]) -> Tuple[List[str], List[Any]]:
+    where, params = [], []
+    # границы переводятся в день один раз — сравнение идёт по индексу orders(day)
+    if date_from is not None:
+        where.append(f"o.day >= {DAY_SQL.format('?')}"); params.append(str(date_from))
+    if date_to is not None:
+        where.append(f"o.day <= {DAY_SQL.format('?')}"); params.append(str(date_to))
+    if client_id is not None:
+        where.append("o.client_id = ?"); params.append(int(client_id))
+    return where, params
+
+
+def bucket_sql(period: str, day_expr: str) -> str:
+    # SQL начала периода (дней от 1970-01-01) для целого дня day_expr
+    if period not in BUCKETS:
+        raise ValueError(f"Неизвестный период: {period}")
+    return BUCKETS[period].format(d=day_expr)
+
+
+def order_buckets_query(period: str, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                        client_id: Optional[int] = None) -> Tuple[str, List[Any]]:
+    # SQL сводки по периодам (period, orders, items, revenue); используется и в analysis
+    bucket = bucket_sql(period, "o.day")
+    where, params = _order_filters(date_from, date_to, client_id)
+    where.append("o.day IS NOT NULL")
+    sql = f"""
+    SELECT date(b * 86400, 'unixepoch') AS period, COUNT(*) AS orders,
+           COALESCE(SUM(t.total_qty), 0) AS items, COALESCE(SUM(t.total), 0) AS revenue
+    FROM (SELECT {bucket} AS b, o.id
+          FROM orders o WHERE {" AND ".join(where)}) x
+    LEFT JOIN order_totals t ON t.order_id = x.id
+    GROUP BY b
+    ORDER BY b
+    """
+    return sql, params
+
+
+def page_key(row, order_by: str) -> Tuple[Any, Any]:
+    # ключ строки для параметра after= у page_*
+    return row[order_by], row["id"]
+
+
+def _iter_pages(fetch, page_size: int, order_by: str, kw: Dict[str, Any]) -> Iterator[sqlite3.Row]:
+    after = kw.pop("after", None)
+    while True:
+        rows = fetch(after, page_size, **kw)
+        yield from rows
+        if len(rows) < page_size:
+            return
+        after = page_key(rows[-1], order_by)
+
+
+def _split_sql(script: str) -> List[str]:
+    # деление скрипта на операторы с учётом тел триггеров (BEGIN ... END;)
+    out, cur = [], ""
+    for line in script.splitlines(keepends=True):
+        cur += line
+        if sqlite3.complete_statement(cur):
+            out.append(cur.strip())
+            cur = ""
+    if cur.strip():
+        out.append(cur.strip())
+    return out
+
+
+def _fts_query(q: str) -> str:
+    words = re.findall(r"\w+", q)
+    return " AND ".join(f'"{w}"*' for w in words)
+
+
+def _csv_text_row(text_cols: List[int]):
+    def convert(r):
+        out = list(r)
+        for i in text_cols:
+            if out[i] is not None:
+                out[i] = f"'{out[i]}"
+        return out
+    return convert
+
+
+def _import_sql(table: str, upsert: bool) -> str:
+    cols = TABLE_COLUMNS[table]
+    sql = f"INSERT INTO {table}({','.join(cols)}) VALUES({','.join('?' * len(cols))})"
+    if upsert:
+        sql += " ON CONFLICT(id) DO UPDATE SET " + ", ".join(
+            _ITEM_PRICE_UPSERT if table == "order_items" and c == "price" else f"{c}=excluded.{c}"
+            for c in cols[1:]
+        )
+    return sql
+
+
+# позиция без цены в дампе: прежняя цена, если товар тот же, иначе — текущая цена нового товара
+# (справа от = в SET — значения строки до обновления)
+_ITEM_PRICE_UPSERT = (
+    "price=COALESCE(excluded.price, CASE WHEN excluded.product_id = order_items.product_id "
+    "THEN order_items.price ELSE (SELECT p.price FROM products p WHERE p.id = excluded.product_id) END)"
+)
+
+
+def _import_values(table: str, r: Dict[str, Any]) -> tuple:
+    if table == "clients":
+        return r.get("id"), r["name"], r.get("email", ""), r.get("phone", ""), r.get("address", "")
+    if table == "products":
+        return r.get("id"), r["name"], float(r["price"])
+    if table == "orders":
+        return r.get("id"), r["client_id"], r["date"]
+    # цена отсутствует в старых дампах — её подставит триггер order_items_price_ai
+    # (import_data вставляет товары раньше позиций)
+    return r.get("id"), r["order_id"], r["product_id"], r["quantity"], r.get("price")
+
+
+def _iter_client_records(path: str, encoding: str) -> Iterator[Tuple[int, Tuple[str, ...]]]:
+    # (номер строки файла, (name, email, phone, address)); формат — по первому символу
+    with open(path, encoding=encoding, newline="") as f:
+        head = f.readline()
+        if head.lstrip().startswith("{"):
+            f.seek(0)
+            for n, line in enumerate(f, 1):
+                if line.strip():
+                    r = json.loads(line)
+                    yield n, tuple(str(r.get(c) or "") for c in CLIENT_IMPORT_COLUMNS)
+            return
+        offset = 1
+        if head.startswith("sep="):  # первая строка CSV из export_csv(excel_friendly=True)
+            delimiter, head, offset = head.strip()[4:] or ";", f.readline(), 2
+        else:
+            delimiter = ";" if head.count(";") > head.count(",") else ","
+        header = [h.strip().lower() for h in next(csv.reader([head], delimiter=delimiter))]
+        if "name" not in header:
+            raise ValueError(f"В заголовке CSV нет колонки name: {header}")
+        # отсутствующие колонки читаются из пустой ячейки в конце дополненной строки
+        width = len(header)
+        pick = itemgetter(*(header.index(c) if c in header else width for c in CLIENT_IMPORT_COLUMNS))
+        pad = [""] * (width + 1)
+        reader = csv.reader(f, delimiter=delimiter)
+        for row in reader:
+            if not any(row):
+                continue
+            if len(row) <= width:
+                row += pad[len(row):]
+            yield reader.line_num + offset, pick(row)
+
+
+def _dup_source(v: Any) -> str:
+    return f"в БД, ID={v}" if isinstance(v, int) else v
+
+
+def _prepare_clients(batch: List[Tuple[int, Tuple[str, ...]]], seen: Dict[str, Dict[str, Any]]
+                     ) -> Tuple[List[Tuple[str, ...]], List[Tuple[int, str, Tuple[str, ...]]]]:
+    # проверка пачки: email/телефоны нормализуются и сверяются регулярными выражениями
+    # списком; принятые строки сразу попадают в seen — дубль ниже по файлу будет отклонён
+    emails = [normalize_email(rec[1]) for _, rec in batch]
+    phones = [normalize_phone(rec[2]) for _, rec in batch]
+    email_ok = [not e or EMAIL_RE.match(e) is not None for e in emails]
+    phone_ok = [not p or PHONE_RE.match(p) is not None for p in phones]
+    rows, rejects = [], []
+    emails_seen, phones_seen = seen["email"], seen["phone"]
+    for (line, rec), email, phone, e_ok, p_ok in zip(batch, emails, phones, email_ok, phone_ok):
+        name = rec[0].strip()
+        if not name:
+            reason = "нет имени"
+        elif not e_ok:
+            reason = "некорректный email"
+        elif not p_ok:
+            reason = "некорректный телефон"
+        elif email and email in emails_seen:
+            reason = f"дубль email ({_dup_source(emails_seen[email])})"
+        elif phone and phone in phones_seen:
+            reason = f"дубль телефона ({_dup_source(phones_seen[phone])})"
+        else:
+            where = f"строка {line}"
+            if email:
+                emails_seen[email] = where
+            if phone:
+                phones_seen[phone] = where
+            rows.append((name, email, phone, rec[3]))
+            continue
+        rejects.append((line, reason, rec))
+    return rows, rejects
+
+
+def _iter_dump_records(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    with open(path, encoding="utf-8") as f:
+        first = f.readline()
+        try:
+            head = json.loads(first)
+        except json.JSONDecodeError:
+            head = None
+        if isinstance(head, dict) and "table" in head and "row" in head:
+            yield head["table"], head["row"]
+            for line in f:
+                if line.strip():
+                    r = json.loads(line)
+                    yield r["table"], r["row"]
+        else:
+            f.seek(0)
+            yield from _iter_json_dump(f)
+
+
+def _iter_json_dump(f, bufsize: int = 1 << 16) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    # Разбор {"table": [{...}, ...], ...} без загрузки файла целиком: буфер дочитывается
+    # по мере необходимости, объекты декодируются по одному через raw_decode.
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+
+    def more() -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        chunk = f.read(bufsize)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def peek() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos].isspace():
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not more():
+                return ""
+
+    def expect(ch: str):
+        nonlocal pos
+        if peek() != ch:
+            raise ValueError(f"Некорректный JSON-дамп: ожидался '{ch}' (позиция {f.tell()})")
+        pos += 1
+
+    def value():
+        nonlocal pos
+        peek()
+        while True:
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if more():
+                    continue
+                raise
+            # число на границе буфера могло прочитаться не полностью
+            if end == len(buf) and more():
+                continue
+            pos = end
+            return obj
+
+    expect("{")
+    if peek() == "}":
+        return
+    while True:
+        table = value()
+        expect(":")
+        expect("[")
+        if peek() == "]":
+            pos += 1
+        else:
+            while True:
+                yield table, value()
+                if peek() == ",":
+                    pos += 1
+                    continue
+                expect("]")
+                break
+        if peek() == ",":
+            pos += 1
+            continue
+        expect("}")
+        return
@@ -1,23 +1,46 @@
 from __future__ import annotations
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-from typing import List, Tuple
+import time
+from datetime import date, timedelta
+from typing import Callable, List, Optional, Tuple
 
 from .db import Database
-from .utils import merge_sort, now_date_str
+from .utils import now_date_str
 from .models import Client, Product
-from . import analysis as anl
+from .widgets import VirtualTable, keyset_source, list_source
+from .worker import DbWorker, JobCancelled
+from .pool import ConnectionPool
+from .cache import CatalogCache
+from .metrics import METRICS, format_summary, metrics_paths
+
+# окно графика динамики (дней назад от сегодня, None — всё время) и шаг
+TIMELINE_WINDOWS = [("За всё время", None), ("30 дней", 30), ("90 дней", 90), ("Год", 365)]
+TIMELINE_PERIODS = [("По дням", "day"), ("По неделям", "week"), ("По месяцам", "month"),
+                    ("По кварталам", "quarter")]
+# подсказок в полях выбора клиента/товара формы заказа
+PICKER_LIMIT = 50
 
 
 
 class App(ttk.Frame):
-    def __init__(self, master, db: Database):
+    def __init__(self, master, db: Database, pool: Optional[ConnectionPool] = None):
         super().__init__(master)
         self.db = db
+        self.worker = DbWorker(self, db.path, pool=pool)
+        # справочники для формы заказа: поиск товара по id из кэша; подсказки полей выбора
+        # (не больше PICKER_LIMIT по введённому тексту) читаются в фоне и только после изменений
+        self.cache = CatalogCache(db)
+        self.worker.listeners.append(self.cache.invalidate)
+        self._combos_dirty = {"clients": True, "products": True}
+        self._picker_query: dict = {"clients": None, "products": None}
+        self._picker_after: dict = {"clients": None, "products": None}
+        self.worker.listeners.append(self._mark_combos)
         self.pack(fill="both", expand=True)
         self._build()
 
     def _build(self):
+        self._status_bar()
         nb = ttk.Notebook(self); nb.pack(fill="both", expand=True)
         self._clients_tab(nb)
         self._products_tab(nb)
@@ -25,6 +48,55 @@ class App(ttk.Frame):
         self._analysis_tab(nb)
         self._admin_tab(nb)
 
+    def _status_bar(self):
+        bar = ttk.Frame(self); bar.pack(side="bottom", fill="x", padx=6, pady=4)
+        self.status = ttk.Label(bar, text="", foreground="#666")
+        self.status.pack(side="left", fill="x", expand=True)
+        self.cancel_btn = ttk.Button(bar, text="Отмена", command=self.worker.cancel_all, state="disabled")
+        self.cancel_btn.pack(side="right")
+        self.progress = ttk.Progressbar(bar, length=200, mode="determinate")
+        self.progress.pack(side="right", padx=6)
+        self._jobs = 0
+
+    def _run(self, title: str, fn, *args, on_done=None, read_only: bool = False, atomic: bool = False, **kwargs):
+        # fn(db, job, ...) выполняется в фоновом потоке со своим соединением;
+        # on_done(result) и сообщения об ошибках — в потоке Tk; atomic — см. DbWorker.submit
+        self._jobs += 1
+        self.status.config(text=f"{title}…")
+        self.cancel_btn.config(state="normal")
+        self.progress.config(mode="indeterminate"); self.progress.start(15)
+
+        def finished():
+            self._jobs -= 1
+            if not self._jobs:
+                self.progress.stop(); self.progress.config(mode="determinate", value=0)
+                self.cancel_btn.config(state="disabled")
+
+        def done(result):
+            finished()
+            self.status.config(text=f"{title}: готово")
+            if on_done:
+                on_done(result)
+
+        def error(e):
+            finished()
+            if isinstance(e, JobCancelled):
+                self.status.config(text=f"{title}: отменено")
+            else:
+                self.status.config(text=f"{title}: ошибка")
+                messagebox.showerror("Ошибка", str(e))
+
+        return self.worker.submit(fn, *args, on_done=done, on_error=error, on_progress=self._show_progress,
+                                  title=title, read_only=read_only, atomic=atomic, **kwargs)
+
+    def _show_progress(self, table: str, done: int, total: int):
+        if total:
+            self.progress.stop()
+            self.progress.config(mode="determinate", maximum=total, value=done)
+            self.status.config(text=f"{table}: {done} из {total}")
+        else:
+            self.status.config(text=f"{table}: {done}")
+
     def _clients_tab(self, nb):
         f = ttk.Frame(nb); nb.add(f, text="Клиенты")
 
@@ -52,13 +124,11 @@ class App(ttk.Frame):
         self.c_search_info = ttk.Label(f, text="", foreground="#666")
         self.c_search_info.pack(fill="x", padx=6, pady=(0, 6))
 
-        self.clients_tv = ttk.Treeview(f, columns=("id","name","email","phone","address"), show="headings", height=8)
-        for c in ("id","name","email","phone","address"):
-            self.clients_tv.heading(c, text=c.upper())
+        self.clients_tv = VirtualTable(f, ("id","name","email","phone","address"),
+                                       keyset_source(self.db.page_clients), count=self.db.count_clients,
+                                       height=8, sortable=("id", "name"))
         self.clients_tv.pack(fill="both", expand=True, padx=6, pady=6)
 
-        self._reload_clients()
-
         btns = ttk.Frame(f); btns.pack(fill="x", padx=6, pady=4)
         ttk.Button(btns, text="Удалить выбранного клиента", command=self._delete_client).pack(side="left")
 
@@ -73,62 +143,64 @@ class App(ttk.Frame):
                 raise ValueError("Имя обязательно")
 
             c = Client(name, email, phone, addr)
+        except Exception as e:
+            messagebox.showerror("Ошибка", str(e))
+            return
 
-            self.db.add_client(c.name, c.email, c.phone, c.address)
+        def saved(_):
             self._reload_clients()
+            self._refresh_order_combos()
             messagebox.showinfo("OK", "Клиент сохранён")
-        except Exception as e:
-            messagebox.showerror("Ошибка", str(e))
+        self._run("Сохранение клиента", lambda db, job: db.add_client(c.name, c.email, c.phone, c.address),
+                  on_done=saved, atomic=True)
 
     def _delete_client(self):
-        try:
-            sel = self.clients_tv.selection()
-            if not sel:
-                raise ValueError("Не выбран клиент")
-            values = self.clients_tv.item(sel[0])["values"]
-            cid = int(values[0])
-            if not messagebox.askyesno("Подтвердите", f"Удалить клиента ID={cid}? Его заказы удалятся."):
-                return
-            self.db.delete_client(cid)
+        row = self.clients_tv.selected_row()
+        if row is None:
+            messagebox.showerror("Ошибка", "Не выбран клиент")
+            return
+        cid = int(row["id"])
+        if not messagebox.askyesno("Подтвердите", f"Удалить клиента ID={cid}? Его заказы удалятся."):
+            return
+
+        def deleted(_):
             self._reload_clients()
             self._reload_orders()
             self._refresh_order_combos()
             messagebox.showinfo("OK", "Клиент удалён")
-        except Exception as e:
-            messagebox.showerror("Ошибка", str(e))
-
+        self._run("Удаление клиента", lambda db, job: db.delete_client(cid), on_done=deleted, atomic=True)
 
     def _reload_clients(self, rows=None):
-        for i in self.clients_tv.get_children():
-            self.clients_tv.delete(i)
-        rows = rows or self.db.list_clients()
-        for r in rows:
-            self.clients_tv.insert("", "end", values=(r["id"], r["name"], r["email"], r["phone"], r["address"]))
+        if rows:
+            self.clients_tv.set_source(list_source(rows))
+        else:
+            self.clients_tv.set_source(keyset_source(self.db.page_clients), count=self.db.count_clients)
 
     def _find_clients(self, q=None, event=None):
         query = q.strip() if isinstance(q, str) else self.c_search.get().strip()
 
         if not query:
-            rows = self.db.list_clients()
-            self._reload_clients(rows)
+            self._reload_clients()
             if hasattr(self, "c_search_info"):
                 self.c_search_info.config(text="")
             return
 
-        if query.isdigit():
-            rows = self.db.get_client_by_id(int(query))
-        else:
-            rows = self.db.find_clients(query)
-
-        if not rows:
-            self._reload_clients(self.db.list_clients())
+        def found(rows):
+            if not rows:
+                self._reload_clients()
+                if hasattr(self, "c_search_info"):
+                    self.c_search_info.config(text=f"Ничего не найдено по «{query}». Показаны все клиенты.")
+                return
+            self._reload_clients(rows)
             if hasattr(self, "c_search_info"):
-                self.c_search_info.config(text=f"Ничего не найдено по «{query}». Показаны все клиенты.")
-            return
+                self.c_search_info.config(text=f"Найдено: {len(rows)}")
 
-        self._reload_clients(rows)
-        if hasattr(self, "c_search_info"):
-            self.c_search_info.config(text=f"Найдено: {len(rows)}")
+        # поиск (FTS) — в фоне, таблица заполняется в потоке Tk
+        if query.isdigit():
+            search = lambda db, job: db.get_client_by_id(int(query))
+        else:
+            search = lambda db, job: db.find_clients(query)
+        self._run("Поиск клиентов", search, on_done=found, read_only=True)
 
     def _products_tab(self, nb):
         f = ttk.Frame(nb); nb.add(f, text="Товары")
@@ -141,30 +213,28 @@ class App(ttk.Frame):
         frm.columnconfigure(1, weight=1)
         ttk.Button(frm, text="Сохранить", command=self._save_product).grid(row=2, column=0, columnspan=2, pady=6)
 
-        self.products_tv = ttk.Treeview(f, columns=("id","name","price"), show="headings", height=10)
-        for c in ("id","name","price"):
-            self.products_tv.heading(c, text=c.upper())
+        self.products_tv = VirtualTable(f, ("id","name","price"),
+                                        keyset_source(self.db.page_products), count=self.db.count_products,
+                                        height=10, sortable=("id", "name", "price"))
         self.products_tv.pack(fill="both", expand=True, padx=6, pady=6)
-        self._reload_products()
 
         btns = ttk.Frame(f); btns.pack(fill="x", padx=6, pady=4)
         ttk.Button(btns, text="Удалить выбранный товар", command=self._delete_product).pack(side="left")
 
     def _delete_product(self):
-        try:
-            sel = self.products_tv.selection()
-            if not sel:
-                raise ValueError("Не выбран товар")
-            values = self.products_tv.item(sel[0])["values"]
-            pid = int(values[0])
-            if not messagebox.askyesno("Подтвердите", f"Удалить товар ID={pid}?"):
-                return
-            self.db.delete_product(pid)
+        row = self.products_tv.selected_row()
+        if row is None:
+            messagebox.showerror("Ошибка", "Не выбран товар")
+            return
+        pid = int(row["id"])
+        if not messagebox.askyesno("Подтвердите", f"Удалить товар ID={pid}?"):
+            return
+
+        def deleted(_):
             self._reload_products()
             self._refresh_order_combos()
             messagebox.showinfo("OK", "Товар удалён")
-        except Exception as e:
-            messagebox.showerror("Ошибка", str(e))
+        self._run("Удаление товара", lambda db, job: db.delete_product(pid), on_done=deleted, atomic=True)
 
 
     def _save_product(self):
@@ -180,37 +250,72 @@ class App(ttk.Frame):
                 raise ValueError("Цена должна быть числом")
 
             prod = Product(name, price)
+        except Exception as e:
+            messagebox.showerror("Ошибка", str(e))
+            return
 
-            self.db.add_product(prod.name, prod.price)
+        def saved(_):
             self._reload_products()
             self._refresh_order_combos()
             messagebox.showinfo("OK", "Товар сохранён")
-        except Exception as e:
-            messagebox.showerror("Ошибка", str(e))
+        self._run("Сохранение товара", lambda db, job: db.add_product(prod.name, prod.price), on_done=saved,
+                  atomic=True)
+
+    def _mark_combos(self, table=None, ident=None):
+        # вызывается из рабочего потока: только помечаем, перечитает postcommand
+        for name in self._combos_dirty:
+            if table is None or table == name:
+                self._combos_dirty[name] = True
 
     def _refresh_order_combos(self):
-        if hasattr(self, "o_client"):
-            self.o_client["values"] = [f'{r["id"]}: {r["name"]}' for r in self.db.list_clients()]
-        if hasattr(self, "o_product"):
-            self.o_product["values"] = [f'{r["id"]}: {r["name"]} — {r["price"]} руб.' for r in self.db.list_products()]
+        self._mark_combos()
+
+    def _picker(self, kind: str) -> ttk.Combobox:
+        return self.o_client if kind == "clients" else self.o_product
+
+    def _suggest_later(self, kind: str, event=None):
+        # подсказки по вводу запрашиваются после паузы, а не на каждую клавишу
+        if self._picker_after[kind]:
+            self.after_cancel(self._picker_after[kind])
+        self._picker_after[kind] = self.after(250, lambda: self._suggest(kind))
+
+    def _suggest(self, kind: str):
+        self._picker_after[kind] = None
+        text = self._picker(kind).get().strip()
+        if ":" in text:
+            # в поле выбранное значение «id: ...» — показываем начало списка
+            text = ""
+        if not self._combos_dirty[kind] and self._picker_query[kind] == text:
+            return
+        self._combos_dirty[kind] = False
+        self._picker_query[kind] = text
+
+        def fill(values):
+            if self._picker_query[kind] == text:
+                self._picker(kind)["values"] = values
+        self.worker.submit(_picker_values, kind, text, PICKER_LIMIT, on_done=fill, read_only=True)
+
+    def _picked_id(self, kind: str) -> Optional[int]:
+        # id из значения «id: ...»; произвольный текст в поле — None
+        head = self._picker(kind).get().split(":", 1)[0].strip()
+        return int(head) if head.isdigit() else None
 
 
     def _reload_products(self):
-        for i in self.products_tv.get_children():
-            self.products_tv.delete(i)
-        for r in self.db.list_products():
-            self.products_tv.insert("", "end", values=(r["id"], r["name"], r["price"]))
+        self.products_tv.reload(keep_position=True)
 
     def _orders_tab(self, nb):
         f = ttk.Frame(nb); nb.add(f, text="Заказы")
 
         frm = ttk.LabelFrame(f, text="Создать заказ"); frm.pack(fill="x", padx=6, pady=6)
         ttk.Label(frm, text="Клиент:").grid(row=0, column=0, sticky="e", padx=4, pady=4)
-        self.o_client = ttk.Combobox(frm, values=[f'{r["id"]}: {r["name"]}' for r in self.db.list_clients()], state="readonly")
+        self.o_client = ttk.Combobox(frm, postcommand=lambda: self._suggest("clients"))
+        self.o_client.bind("<KeyRelease>", lambda e: self._suggest_later("clients"))
         self.o_client.grid(row=0, column=1, sticky="we", padx=4, pady=4)
 
         ttk.Label(frm, text="Товар:").grid(row=1, column=0, sticky="e", padx=4, pady=4)
-        self.o_product = ttk.Combobox(frm, values=[f'{r["id"]}: {r["name"]} — {r["price"]} руб.' for r in self.db.list_products()], state="readonly")
+        self.o_product = ttk.Combobox(frm, postcommand=lambda: self._suggest("products"))
+        self.o_product.bind("<KeyRelease>", lambda e: self._suggest_later("products"))
         self.o_product.grid(row=1, column=1, sticky="we", padx=4, pady=4)
         ttk.Label(frm, text="Кол-во:").grid(row=1, column=2, sticky="e")
         self.o_qty = ttk.Spinbox(frm, from_=1, to=100, width=5); self.o_qty.grid(row=1, column=3, padx=4, pady=4)
@@ -231,98 +336,114 @@ class App(ttk.Frame):
         self.sort_key.pack(side="left", padx=4)
         ttk.Button(sort_fr, text="Применить", command=self._sort_orders).pack(side="left")
 
-        self.orders_tv = ttk.Treeview(f, columns=("id","client","date","total","total_qty"), show="headings", height=10)
-        for c in ("id","client","date","total","total_qty"):
-            self.orders_tv.heading(c, text=c.upper())
+        self.orders_tv = VirtualTable(f, ("id","client","date","total","total_qty"),
+                                      keyset_source(self.db.page_orders), count=self.db.count_orders,
+                                      height=10, sortable=("id", "date", "total"),
+                                      order_by="date", descending=True, formatter=_order_values)
         self.orders_tv.pack(fill="both", expand=True, padx=6, pady=6)
-        self._reload_orders()
 
         btns = ttk.Frame(f); btns.pack(fill="x", padx=6, pady=4)
         ttk.Button(btns, text="Удалить выбранный заказ", command=self._delete_order).pack(side="left")
+        self._suggest("clients")
+        self._suggest("products")
 
     def _delete_order(self):
-        try:
-            sel = self.orders_tv.selection()
-            if not sel:
-                raise ValueError("Не выбран заказ")
-            values = self.orders_tv.item(sel[0])["values"]
-            oid = int(values[0])
-            if not messagebox.askyesno("Подтвердите", f"Удалить заказ ID={oid}?"):
-                return
-            self.db.delete_order(oid)
+        row = self.orders_tv.selected_row()
+        if row is None:
+            messagebox.showerror("Ошибка", "Не выбран заказ")
+            return
+        oid = int(row["id"])
+        if not messagebox.askyesno("Подтвердите", f"Удалить заказ ID={oid}?"):
+            return
+
+        def deleted(_):
             self._reload_orders()
             messagebox.showinfo("OK", "Заказ удалён")
-        except Exception as e:
-            messagebox.showerror("Ошибка", str(e))
+        self._run("Удаление заказа", lambda db, job: db.delete_order(oid), on_done=deleted, atomic=True)
 
 
     def _add_to_order(self):
         if not self.o_product.get():
             return
-        pid = int(self.o_product.get().split(":")[0])
+        pid = self._picked_id("products")
+        if pid is None:
+            messagebox.showerror("Ошибка", "Выберите товар из списка")
+            return
         qty = int(self.o_qty.get())
-        prod = [r for r in self.db.list_products() if r["id"] == pid][0]
+        prod = self.cache.get_product(pid)
+        if prod is None:
+            messagebox.showerror("Ошибка", "Товар не найден")
+            self._mark_combos("products")
+            return
         self.order_items.append((pid, qty))
         self.items_tv.insert("", "end", values=(pid, prod["name"], prod["price"], qty))
 
     def _create_order(self):
-        try:
-            if not self.o_client.get():
-                raise ValueError("Выберите клиента")
-            if not self.order_items:
-                raise ValueError("Добавьте позиции")
-            client_id = int(self.o_client.get().split(":")[0])
-            self.db.create_order(client_id, now_date_str(), self.order_items)
+        client_id = self._picked_id("clients")
+        if client_id is None:
+            messagebox.showerror("Ошибка", "Выберите клиента")
+            return
+        if not self.order_items:
+            messagebox.showerror("Ошибка", "Добавьте позиции")
+            return
+        items = list(self.order_items)
+
+        def created(_):
             self.order_items.clear()
             for i in self.items_tv.get_children():
                 self.items_tv.delete(i)
             self._reload_orders()
             messagebox.showinfo("OK", "Заказ создан")
-        except Exception as e:
-            messagebox.showerror("Ошибка", str(e))
+        self._run("Создание заказа", lambda db, job: db.create_order(client_id, now_date_str(), items),
+                  on_done=created, atomic=True)
 
-    def _reload_orders(self, rows=None):
-        for i in self.orders_tv.get_children():
-            self.orders_tv.delete(i)
-
-        if rows is None:
-            rows = [dict(r) for r in self.db.list_orders()]
-
-        for r in rows:
-            try:
-                total = round(float(r["total"]), 2)
-            except (TypeError, ValueError):
-                total = r["total"]
-            self.orders_tv.insert(
-                "", "end",
-                values=(r["id"], r["client"], r["date"], total, r["total_qty"])
-            )
+    def _reload_orders(self):
+        self.orders_tv.reload(keep_position=True)
 
     def _sort_orders(self):
-        rows = []
-        for iid in self.orders_tv.get_children():
-            v = self.orders_tv.item(iid)["values"]
-            rows.append({
-                "id": int(v[0]),
-                "client": str(v[1]),
-                "date": str(v[2]),
-                "total": float(v[3]),
-                "total_qty": int(v[4]),
-            })
-
         key = self.sort_key.get()
-        if key == "total":
-            rows_sorted = merge_sort(rows, key=lambda r: r["total"], reverse=True)
-        else:
-            rows_sorted = merge_sort(rows, key=lambda r: r["date"])
-
-        self._reload_orders(rows_sorted)
+        self.orders_tv.sort_by(key, descending=(key == "total"))
 
     def _analysis_tab(self, nb):
         f = ttk.Frame(nb); nb.add(f, text="Анализ и Визуализация")
-        ttk.Button(f, text="Топ-5 клиентов по кол-ву заказов", command=lambda: anl.plot_top5_clients(self.db.conn)).pack(padx=6, pady=6)
-        ttk.Button(f, text="Динамика заказов по датам", command=lambda: anl.plot_orders_timeline(self.db.conn)).pack(padx=6, pady=6)
-        ttk.Button(f, text="Граф связей клиентов (города)", command=lambda: anl.client_graph_by_city(self.db.conn)).pack(padx=6, pady=6)
+        # выборка и расчёты — в фоне, отрисовка matplotlib — в потоке Tk
+        ttk.Button(f, text="Топ-5 клиентов по кол-ву заказов",
+                   command=lambda: self._chart("Топ-5 клиентов", "top5_clients_by_orders",
+                                               lambda anl, df: anl.plot_top5_clients(None, df=df))
+                   ).pack(padx=6, pady=6)
+        # окно и шаг графика динамики: за последние N дней читается только диапазон индекса orders(day)
+        tl = ttk.Frame(f); tl.pack(padx=6, pady=6)
+        self.timeline_window = tk.StringVar(value=TIMELINE_WINDOWS[0][0])
+        self.timeline_period = tk.StringVar(value=TIMELINE_PERIODS[0][0])
+        ttk.Combobox(tl, textvariable=self.timeline_window, values=[w for w, _ in TIMELINE_WINDOWS],
+                     state="readonly", width=14).pack(side="left", padx=3)
+        ttk.Combobox(tl, textvariable=self.timeline_period, values=[p for p, _ in TIMELINE_PERIODS],
+                     state="readonly", width=12).pack(side="left", padx=3)
+        ttk.Button(tl, text="Динамика заказов по датам", command=self._timeline_chart).pack(side="left", padx=3)
+        ttk.Button(f, text="Граф связей клиентов (города)",
+                   command=lambda: self._chart("Граф клиентов", "city_graph",
+                                               lambda anl, g: anl.draw_city_graph(*g))
+                   ).pack(padx=6, pady=6)
+
+    def _chart(self, title: str, compute: str, draw, *args):
+        # analysis (pandas, matplotlib, networkx) импортируется при первом построении графика
+        # и в фоновом потоке — окно открывается без научного стека и не замирает на импорте
+        def job(db, job):
+            from . import analysis as anl
+            return anl, getattr(anl, compute)(db.conn, *args)
+        self._run(title, job, on_done=lambda r: draw(*r), read_only=True)
+
+    def _timeline_chart(self):
+        days = dict(TIMELINE_WINDOWS)[self.timeline_window.get()]
+        period = dict(TIMELINE_PERIODS)[self.timeline_period.get()]
+        if days is None and period == "day":
+            self._chart("Динамика заказов", "orders_per_day",
+                        lambda anl, df: anl.plot_orders_timeline(None, df=df))
+            return
+        date_from = None if days is None else (date.today() - timedelta(days=days)).isoformat()
+        self._chart("Динамика заказов", "orders_timeline",
+                    lambda anl, df: anl.plot_orders_timeline(None, df=df, date_from=date_from, period=period),
+                    period, date_from)
 
     def _admin_tab(self, nb):
         f = ttk.Frame(nb);
@@ -333,56 +454,172 @@ class App(ttk.Frame):
         ttk.Button(f, text="Импорт из JSON", command=self._import_json) \
             .grid(row=0, column=1, padx=6, pady=6, sticky="w")
 
-        ttk.Button(f, text="Экспорт CSV (CP1251 для Excel)", command=lambda: self.db.export_csv(encoding="cp1251")) \
+        ttk.Button(f, text="Экспорт в NDJSON (потоково)", command=self._export_ndjson) \
+            .grid(row=0, column=2, padx=6, pady=6, sticky="w")
+        ttk.Button(f, text="Импорт с объединением (по ID)", command=lambda: self._import_json(mode="merge")) \
+            .grid(row=1, column=1, padx=6, pady=6, sticky="w")
+
+        ttk.Button(f, text="Экспорт CSV (CP1251 для Excel)", command=self._export_csv) \
             .grid(row=1, column=0, padx=6, pady=6, sticky="w")
 
         ttk.Button(f, text="Экспорт в Excel (XLSX)", command=self._export_xlsx) \
             .grid(row=2, column=0, padx=6, pady=6, sticky="w")
 
+        ttk.Button(f, text="Импорт клиентов (CSV/NDJSON)", command=self._import_clients) \
+            .grid(row=2, column=1, padx=6, pady=6, sticky="w")
+
         ttk.Button(f, text="Заполнить демо-данными", command=self._seed) \
             .grid(row=3, column=0, padx=6, pady=6, sticky="w")
 
+        # сводка замеров SQL и методов Database (metrics.METRICS), обновляется раз в 2 с
+        perf = ttk.LabelFrame(f, text="Производительность запросов")
+        perf.grid(row=4, column=0, columnspan=3, sticky="nsew", padx=6, pady=6)
+        f.rowconfigure(4, weight=1); f.columnconfigure(2, weight=1)
+        self.metrics_text = tk.Text(perf, height=14, wrap="none", font=("Courier", 9))
+        self.metrics_text.pack(fill="both", expand=True, padx=4, pady=4)
+        ttk.Button(perf, text="Сбросить замеры", command=lambda: (METRICS.reset(), self._refresh_metrics(False))) \
+            .pack(anchor="w", padx=4, pady=4)
+        self._refresh_metrics()
+
+    def _refresh_metrics(self, schedule: bool = True):
+        if not METRICS.enabled:
+            text = "Замеры выключены (запуск окна с флагом --instrument)."
+        else:
+            text = (format_summary(METRICS.summary(8)) + "\n\nМетоды Database:\n" +
+                    format_summary(METRICS.summary(6, "methods")) +
+                    f"\n\nМедленных запросов (≥ {METRICS.slow_ms:.0f} мс): {len(METRICS.slow)}")
+        self.metrics_text.configure(state="normal")
+        self.metrics_text.delete("1.0", "end")
+        self.metrics_text.insert("1.0", text)
+        self.metrics_text.configure(state="disabled")
+        if schedule:
+            self.after(2000, self._refresh_metrics)
+
     def _export_json(self):
         path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON","*.json")])
         if not path: return
-        try:
-            self.db.export_json(path)
-            messagebox.showinfo("OK", f"Экспортировано: {path}")
-        except Exception as e:
-            messagebox.showerror("Ошибка", str(e))
+        self._run("Экспорт JSON", lambda db, job: db.export_json(path),
+                  on_done=lambda _: messagebox.showinfo("OK", f"Экспортировано: {path}"), read_only=True)
 
-    def _import_json(self):
-        path = filedialog.askopenfilename(filetypes=[("JSON","*.json")])
+    def _export_ndjson(self):
+        path = filedialog.asksaveasfilename(defaultextension=".ndjson",
+                                            filetypes=[("NDJSON", "*.ndjson"), ("JSON Lines", "*.jsonl")])
         if not path: return
-        try:
-            self.db.import_json(path)
+        self._run("Экспорт NDJSON", lambda db, job: db.export_ndjson(path, progress=job.progress),
+                  on_done=lambda n: messagebox.showinfo("OK", f"Экспортировано записей: {n}\n{path}"), read_only=True)
+
+    def _import_json(self, mode: str = "replace"):
+        path = filedialog.askopenfilename(filetypes=[("JSON","*.json"), ("NDJSON", "*.ndjson *.jsonl")])
+        if not path: return
+
+        def imported(_):
             self._reload_clients(); self._reload_products(); self._reload_orders()
+            self._refresh_order_combos()
             messagebox.showinfo("OK", "Импорт завершён")
-        except Exception as e:
-            messagebox.showerror("Ошибка", str(e))
+        self._run("Импорт", lambda db, job: db.import_data(path, mode=mode, progress=job.progress),
+                  on_done=imported, atomic=True)
+
+    def _import_clients(self):
+        path = filedialog.askopenfilename(filetypes=[("CSV", "*.csv"), ("NDJSON", "*.ndjson *.jsonl")])
+        if not path: return
+
+        def imported(r):
+            self._reload_clients(); self._refresh_order_combos()
+            text = (f'Добавлено клиентов: {r["inserted"]} из {r["read"]}\n'
+                    f'Дублей: {r["duplicates"]}, некорректных: {r["invalid"]}')
+            if r["rejects"]:
+                text += f'\nОтклонённые строки: {r["rejects"]}'
+            messagebox.showinfo("Импорт клиентов", text)
+        self._run("Импорт клиентов", lambda db, job: db.import_clients(path, progress=job.progress),
+                  on_done=imported)
+
+    def _export_csv(self):
+        self._run("Экспорт CSV", lambda db, job: db.export_csv(encoding="cp1251"),
+                  on_done=lambda _: messagebox.showinfo("OK", "CSV сохранены в папку export_csv"), read_only=True)
 
     def _export_xlsx(self):
         path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel", "*.xlsx")])
         if not path:
             return
-        try:
-            self.db.export_xlsx(path)
-            messagebox.showinfo("OK", f"Сохранено: {path}")
-        except Exception as e:
-            messagebox.showerror("Ошибка", str(e))
+        self._run("Экспорт XLSX", lambda db, job: db.export_xlsx(path),
+                  on_done=lambda _: messagebox.showinfo("OK", f"Сохранено: {path}"), read_only=True)
 
     def _seed(self):
-        self.db.seed_demo()
-        self._reload_clients(); self._reload_products(); self._reload_orders()
+        def seeded(_):
+            self._reload_clients(); self._reload_products(); self._reload_orders()
+            self._refresh_order_combos()
+        self._run("Демо-данные", lambda db, job: db.seed_demo(), on_done=seeded)
+
+
+
+
+def _picker_values(db: Database, job, kind: str, text: str, limit: int) -> List[str]:
+    # подсказки поля выбора: клиенты — FTS-поиск по префиксам слов, товары — по названию;
+    # пустой текст — первые limit строк по id
+    if kind == "clients":
+        if text.isdigit():
+            rows = db.get_client_by_id(int(text))
+        else:
+            rows = db.find_clients(text, limit) if text else db.page_clients(limit=limit)
+        return [f'{r["id"]}: {r["name"]}' for r in rows]
+    rows = db.find_products(text, limit) if text else db.page_products(limit=limit)
+    return [f'{r["id"]}: {r["name"]} — {r["price"]} руб.' for r in rows]
 
 
+def _order_values(r):
+    try:
+        total = round(float(r["total"]), 2)
+    except (TypeError, ValueError):
+        total = r["total"]
+    return r["id"], r["client"], r["date"], total, r["total_qty"]
 
 
-def run_gui(db_path: str = "orders.sqlite"):
+def _create_app(db_path: str, profile: Optional[str] = None, step: Callable[[str], None] = lambda name: None):
     root = tk.Tk()
     root.title("Система учёта заказов")
     root.geometry("900x600")
-    db = Database(db_path)
+    step("окно Tk")
+    db = Database(db_path, profile=profile)
     db.init_schema()
-    App(root, db)
+    step("открытие БД и миграции")
+    pool = ConnectionPool(db_path, profile=profile)
+    step("пул соединений")
+    app = App(root, db, pool)
+    step("вкладки и таблицы")
+    return root, app
+
+
+def measure_startup(db_path: str = "orders.sqlite", profile: Optional[str] = None) -> List[Tuple[str, float]]:
+    # время шагов запуска до первой отрисовки окна; окно сразу закрывается
+    steps: List[Tuple[str, float]] = []
+    last = [time.perf_counter()]
+
+    def step(name: str):
+        now = time.perf_counter()
+        steps.append((name, now - last[0]))
+        last[0] = now
+
+    root, app = _create_app(db_path, profile, step)
+    root.update()
+    step("первая отрисовка")
+    app.worker.shutdown(wait=False)
+    root.destroy()
+    return steps
+
+
+def run_gui(db_path: str = "orders.sqlite", profile: Optional[str] = None, *, instrument: bool = False,
+            slow_ms: Optional[float] = None):
+    # instrument — замерять запросы (как --instrument у команд); включается до открытия соединений,
+    # без него соединения обычные sqlite3.Connection без накладных расходов на замеры
+    snapshot, slow_log = metrics_paths(db_path)
+    if instrument:
+        METRICS.enable(slow_ms=slow_ms, slow_log=slow_log)
+    root, app = _create_app(db_path, profile)
+
+    def on_close():
+        app.worker.shutdown(wait=False)
+        if METRICS.enabled:
+            METRICS.save(snapshot)
+        root.destroy()
+    root.protocol("WM_DELETE_WINDOW", on_close)
     root.mainloop()
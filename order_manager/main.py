@@ -1,30 +1,244 @@
 """
 Точка входа. Запуск GUI:  python -m order_manager.main
+Пакетная загрузка заказов:  python -m order_manager.main import-orders orders.ndjson
+Массовый импорт клиентов:  python -m order_manager.main import-clients crm.csv
+Сравнение профилей SQLite:  python -m order_manager.main bench-profiles
+Проверка сводки по дням:  python -m order_manager.main check-stats --fix
+Отчёты в файлы без GUI:  python -m order_manager.main report --out reports/
+Синтетические данные и замеры:  python -m order_manager.main --db big.sqlite generate --scale 1
+                                python -m order_manager.main bench --scale 0.1 --json bench.json
+Время запуска по шагам:  python -m order_manager.main --startup-time
 """
 from __future__ import annotations
 import argparse
-from .gui import run_gui
-from .db import Database
+import json
+import time
+from .db import Database, PROFILES
+from .utils import now_date_str
 
 from pathlib import Path
 import sys
 
+# модули, которые не должны загружаться до первого окна (нужны только аналитике, отчётам, XLSX)
+HEAVY_MODULES = ("pandas", "numpy", "matplotlib", "seaborn", "networkx", "openpyxl")
+
 def _default_db_path() -> str:
     base_dir = Path(sys.executable).parent if getattr(sys, "frozen", False) else Path(__file__).resolve().parent
     return str(base_dir / "orders.sqlite")
 
+def _read_order_records(path: str):
+    # NDJSON: по одному заказу в строке в формате Order.to_dict()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            r = json.loads(line)
+            yield r["client_id"], r.get("date") or now_date_str(), r["items"]
+
+def _import_orders(args):
+    db = Database(args.db, profile=args.profile); db.init_schema()
+    ids, report = db.create_orders_bulk(_read_order_records(args.file), batch_size=args.batch_size)
+    for b in report:
+        print(f'Пачка {b["batch"]}: заказов {b["orders"]}, позиций {b["items"]}, '
+              f'{b["seconds"]:.3f} с, {b["orders_per_sec"]:.0f} заказов/с')
+    print(f"Загружено заказов: {len(ids)}")
+
+def _import_clients(args):
+    db = Database(args.db, profile=args.profile); db.init_schema()
+    r = db.import_clients(args.file, batch_size=args.batch_size, rejects_path=args.rejects, encoding=args.encoding)
+    print(f'Прочитано строк: {r["read"]}, добавлено клиентов: {r["inserted"]}, '
+          f'дублей: {r["duplicates"]}, некорректных: {r["invalid"]} ({r["seconds"]:.2f} с)')
+    if r["rejects"]:
+        print(f'Отклонённые строки: {r["rejects"]}')
+
+def _migrate(args):
+    db = Database(args.db, profile=args.profile)
+    report = db.init_schema()
+    for m in report:
+        print(f'Миграция {m["version"]} ({m["name"]}): {m["seconds"]:.3f} с')
+    print(f"Версия схемы: {db.schema_version}" + ("" if report else " (обновление не требуется)"))
+
+def _check_stats(args):
+    db = Database(args.db, profile=args.profile); db.init_schema()
+    diffs = db.check_daily_stats(fix=args.fix)
+    for d in diffs:
+        print(f'{d["date"]}: ожидалось {d["expected"]}, в сводке {d["actual"]}')
+    if not diffs:
+        print("Сводка по дням совпадает с заказами.")
+    elif args.fix:
+        print(f"Расхождений: {len(diffs)}, сводка пересобрана.")
+    else:
+        print(f"Расхождений: {len(diffs)} (исправить: --fix)")
+
+def _report(args):
+    from .report import run_reports
+    manifest = run_reports(args.db, args.out, names=args.only, formats=args.format, jobs=args.jobs)
+    for r in manifest["reports"]:
+        state = ", ".join(r["files"]) if r["status"] == "ok" else r["error"]
+        print(f'{r["name"]:<16} {r["seconds"]:7.3f} с  {state}')
+    print(f'Готово за {manifest["seconds"]:.3f} с, процессов: {manifest["jobs"]}. Манифест: {args.out}/manifest.json')
+    if any(r["status"] != "ok" for r in manifest["reports"]):
+        raise SystemExit(1)
+
+def _generate(args):
+    from .datagen import generate
+    db = Database(args.db, profile=args.profile); db.init_schema()
+    t0 = time.perf_counter()
+    counts = generate(db, args.scale, seed=args.rng_seed,
+                      progress=lambda table, done, total: print(f"\r{table}: {done}/{total}", end="", flush=True))
+    print(f"\nДобавлено: {counts}, {time.perf_counter() - t0:.1f} с")
+
+def _bench(args):
+    from .bench import bench_suite, format_suite_report, save_suite
+    result = bench_suite(args.scale, seed=args.rng_seed, repeat=args.repeat, profile=args.profile, only=args.only)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print(format_suite_report(result, baseline))
+    if args.json:
+        save_suite(result, args.json)
+        print(f"Результаты: {args.json}")
+
+def _stats(args):
+    from .metrics import Metrics, format_summary, load_snapshot, metrics_paths
+    snapshot, slow_log = metrics_paths(args.db)
+    if args.reset:
+        for p in (snapshot, slow_log):
+            Path(p).unlink(missing_ok=True)
+        print("Замеры сброшены.")
+        return
+    if not Path(snapshot).exists():
+        print(f"Замеров пока нет ({snapshot}). Они копятся при работе окна и командах, запущенных с --instrument.")
+        return
+    m = Metrics()
+    m.merge(load_snapshot(snapshot))
+    print("Запросы SQL (по суммарному времени):")
+    print(format_summary(m.summary(args.top), width=args.width))
+    print("\nМетоды Database:")
+    print(format_summary(m.summary(args.top, "methods"), width=args.width))
+    slow = m.slow[-args.slow:] if args.slow else []
+    if slow:
+        print(f"\nПоследние медленные запросы (полностью — {slow_log}):")
+    for r in slow:
+        print(f'{r["time"]}  {r["ms"]:.1f} мс, строк {r["rows"]}: {r["sql"]}')
+        for line in r.get("plan") or []:
+            print(f"    {line}")
+
+def _bench_profiles(args):
+    from .bench import bench_profiles, format_profile_report
+    profiles = [args.profile] if args.profile else None
+    results = bench_profiles(args.db, profiles, orders=args.orders)
+    print(format_profile_report(results))
+
+def startup_timings(db_path: str, profile=None):
+    # импорт GUI (tkinter) и шаги до первой отрисовки окна, в секундах
+    t0 = time.perf_counter()
+    from .gui import measure_startup
+    return [("импорт модулей GUI", time.perf_counter() - t0)] + measure_startup(db_path, profile=profile)
+
+def _startup_time(args):
+    steps = startup_timings(args.db, args.profile)
+    for name, s in steps:
+        print(f"{name:<26} {s * 1000:8.1f} мс")
+    print(f'{"итого до первого окна":<26} {sum(s for _, s in steps) * 1000:8.1f} мс')
+    heavy = [m for m in HEAVY_MODULES if m in sys.modules]
+    print("Загружены тяжёлые модули: " + (", ".join(heavy) if heavy else "нет"))
+    print("Подробно по модулям: python -X importtime -m order_manager.main --startup-time")
+
 def main():
     parser = argparse.ArgumentParser(description="Order Manager")
     parser.add_argument("--db", default="orders.sqlite", help="Путь к SQLite БД")
     parser.add_argument("--seed", action="store_true", help="Заполнить демо-данными и выйти")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default=None,
+                        help="Профиль SQLite: durable, balanced, bulk-load (по умолчанию — настройки SQLite)")
+    parser.add_argument("--instrument", action="store_true",
+                        help="Замерять запросы SQL в окне и командах (сводка — команда stats)")
+    parser.add_argument("--slow-ms", type=float, default=None,
+                        help="Порог журнала медленных запросов, мс (по умолчанию 100)")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="Открыть и закрыть окно, вывести время запуска по шагам")
+    sub = parser.add_subparsers(dest="command")
+
+    p_imp = sub.add_parser("import-orders", help="Пакетная загрузка заказов из NDJSON")
+    p_imp.add_argument("file", help="Файл NDJSON: {\"client_id\", \"date\", \"items\": [{\"product_id\", \"quantity\"}]}")
+    p_imp.add_argument("--batch-size", type=int, default=1000, help="Заказов в одной транзакции")
+    p_imp.set_defaults(func=_import_orders)
+
+    p_cli = sub.add_parser("import-clients", help="Массовый импорт клиентов из CSV/NDJSON с проверкой дублей")
+    p_cli.add_argument("file", help="CSV с заголовком name,email,phone,address (разделитель , или ;) или NDJSON")
+    p_cli.add_argument("--batch-size", type=int, default=50_000, help="Клиентов в одной транзакции")
+    p_cli.add_argument("--rejects", default=None, help="Файл отказов (по умолчанию <файл>.rejects.csv)")
+    p_cli.add_argument("--encoding", default="utf-8-sig", help="Кодировка файла (cp1251 — для CSV из Excel)")
+    p_cli.set_defaults(func=_import_clients)
+
+    p_mig = sub.add_parser("migrate", help="Обновить схему БД до актуальной версии")
+    p_mig.set_defaults(func=_migrate)
+
+    p_stats = sub.add_parser("check-stats", help="Сверить сводку заказов по дням с таблицей заказов")
+    p_stats.add_argument("--fix", action="store_true", help="Пересобрать сводку при расхождениях")
+    p_stats.set_defaults(func=_check_stats)
+
+    p_rep = sub.add_parser("report", help="Сохранить все графики в файлы (без GUI)")
+    p_rep.add_argument("--out", default="reports", help="Папка для графиков и manifest.json")
+    p_rep.add_argument("--format", nargs="+", choices=("png", "svg"), default=["png", "svg"], help="Форматы файлов")
+    p_rep.add_argument("--jobs", type=int, default=None, help="Число процессов (по умолчанию — по числу ядер)")
+    p_rep.add_argument("--only", nargs="+", default=None, help="Только указанные отчёты")
+    p_rep.set_defaults(func=_report)
+
+    p_gen = sub.add_parser("generate", help="Добавить в БД синтетические данные (datagen)")
+    p_gen.add_argument("--scale", type=float, default=1.0, help="Масштаб: 1 = 10 тыс. клиентов, 100 тыс. заказов")
+    p_gen.add_argument("--rng-seed", type=int, default=42,
+                       help="Зерно генератора (одинаковое — одинаковые данные)")
+    p_gen.set_defaults(func=_generate)
+
+    p_suite = sub.add_parser("bench", help="Набор замеров на синтетической БД во временной папке")
+    p_suite.add_argument("--scale", type=float, default=0.1, help="Масштаб данных (см. generate)")
+    p_suite.add_argument("--rng-seed", type=int, default=42, help="Зерно генератора данных")
+    p_suite.add_argument("--repeat", type=int, default=5, help="Повторов каждого замера")
+    p_suite.add_argument("--only", nargs="+", default=None, help="Только указанные замеры")
+    p_suite.add_argument("--json", default=None, help="Сохранить результаты в JSON")
+    p_suite.add_argument("--baseline", default=None, help="JSON прошлого запуска для сравнения")
+    p_suite.set_defaults(func=_bench)
+
+    p_st = sub.add_parser("stats", help="Сводка замеров запросов и журнал медленных запросов")
+    p_st.add_argument("--top", type=int, default=15, help="Сколько строк сводки показать")
+    p_st.add_argument("--slow", type=int, default=5, help="Сколько последних медленных запросов показать")
+    p_st.add_argument("--width", type=int, default=90, help="Ширина текста запроса")
+    p_st.add_argument("--reset", action="store_true", help="Удалить накопленные замеры и журнал")
+    p_st.set_defaults(func=_stats)
+
+    p_bench = sub.add_parser("bench-profiles", help="Сравнить профили SQLite на копии текущей БД")
+    p_bench.add_argument("--orders", type=int, default=500, help="Заказов для замера вставки")
+    p_bench.set_defaults(func=_bench_profiles)
+
     args = parser.parse_args()
 
     if args.seed:
-        db = Database(args.db); db.init_schema(); db.seed_demo()
+        db = Database(args.db, profile=args.profile); db.init_schema(); db.seed_demo()
         print("Демо-данные добавлены.")
         return
 
-    run_gui(args.db)
+    if args.startup_time:
+        _startup_time(args)
+        return
+
+    if args.command:
+        if args.instrument and args.command != "stats":
+            from .metrics import METRICS, metrics_paths
+            snapshot, slow_log = metrics_paths(args.db)
+            METRICS.enable(slow_ms=args.slow_ms, slow_log=slow_log)
+            try:
+                args.func(args)
+            finally:
+                METRICS.save(snapshot)
+            return
+        args.func(args)
+        return
+
+    from .gui import run_gui
+    run_gui(args.db, profile=args.profile, instrument=args.instrument, slow_ms=args.slow_ms)
 
 if __name__ == "__main__":
     main()
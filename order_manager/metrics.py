@@ -0,0 +1,320 @@
+"""
+Замеры времени SQL-запросов и методов Database.
+
+Пока METRICS.enabled, соединения Database/ConnectionPool открываются с фабрикой
+InstrumentedConnection: каждый запрос (выполнение + чтение строк) попадает в
+гистограмму задержек по тексту запроса вместе с числом строк, а запросы дольше
+порога пишутся в журнал медленных запросов (JSON Lines) с EXPLAIN QUERY PLAN.
+Публичные методы Database учитываются отдельно (instrument_methods).
+Сводка: METRICS.summary(), вкладка «Администрирование», команда stats.
+"""
+from __future__ import annotations
+import functools
+import json
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# верхние границы корзин гистограммы, мс (последняя — всё, что дольше)
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf"))
+SLOW_MS = 100.0
+MAX_SQL_LEN = 300
+
+
+def normalize_sql(sql: str) -> str:
+    sql = re.sub(r"\s+", " ", sql).strip()
+    return sql if len(sql) <= MAX_SQL_LEN else sql[:MAX_SQL_LEN] + "…"
+
+
+def _new_entry() -> Dict[str, Any]:
+    return {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "buckets": [0] * len(BUCKETS_MS)}
+
+
+def _percentile(entry: Dict[str, Any], q: float) -> float:
+    # оценка по гистограмме: верхняя граница корзины, в которую попал q-й замер
+    need = q * entry["count"]
+    acc = 0
+    for bound, n in zip(BUCKETS_MS, entry["buckets"]):
+        acc += n
+        if acc >= need and n:
+            return min(bound, entry["max_ms"])
+    return entry["max_ms"]
+
+
+class Metrics:
+    def __init__(self, *, slow_ms: float = SLOW_MS, slow_log: Optional[str] = None):
+        self.enabled = False
+        self.slow_ms = slow_ms
+        self.slow_log = slow_log
+        # RLock: запись из __del__ курсора может случиться, пока поток уже держит блокировку
+        self._lock = threading.RLock()
+        self.statements: Dict[str, Dict[str, Any]] = {}
+        self.methods: Dict[str, Dict[str, Any]] = {}
+        self.slow: List[Dict[str, Any]] = []
+
+    def enable(self, *, slow_ms: Optional[float] = None, slow_log: Optional[str] = None):
+        self.enabled = True
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        if slow_log is not None:
+            self.slow_log = slow_log
+
+    def _add(self, table: Dict[str, Dict[str, Any]], key: str, ms: float, rows: int):
+        with self._lock:
+            e = table.get(key)
+            if e is None:
+                e = table[key] = _new_entry()
+            e["count"] += 1
+            e["total_ms"] += ms
+            e["max_ms"] = max(e["max_ms"], ms)
+            e["rows"] += rows
+            for i, bound in enumerate(BUCKETS_MS):
+                if ms <= bound:
+                    e["buckets"][i] += 1
+                    break
+
+    def record_method(self, name: str, seconds: float):
+        self._add(self.methods, name, seconds * 1000, 0)
+
+    def record_sql(self, conn: Optional[sqlite3.Connection], sql: str, params: Any, seconds: float, rows: int):
+        ms = seconds * 1000
+        key = normalize_sql(sql)
+        self._add(self.statements, key, ms, rows)
+        if ms >= self.slow_ms:
+            self._log_slow(conn, sql, params, key, ms, rows)
+
+    def _log_slow(self, conn, sql: str, params: Any, key: str, ms: float, rows: int):
+        rec = {"time": datetime.now().isoformat(timespec="seconds"), "ms": round(ms, 3), "rows": rows,
+               "sql": key, "plan": _query_plan(conn, sql, params)}
+        with self._lock:
+            self.slow.append(rec)
+            del self.slow[:-100]
+            if self.slow_log:
+                with open(self.slow_log, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+    def summary(self, top: int = 15, kind: str = "statements") -> List[Dict[str, Any]]:
+        # самые затратные по суммарному времени: count, total/avg/p50/p95/max (мс), rows
+        with self._lock:
+            items = [(k, dict(e, buckets=list(e["buckets"]))) for k, e in getattr(self, kind).items()]
+        items.sort(key=lambda kv: kv[1]["total_ms"], reverse=True)
+        return [{"name": k, "count": e["count"], "total_ms": e["total_ms"], "avg_ms": e["total_ms"] / e["count"],
+                 "p50_ms": _percentile(e, 0.5), "p95_ms": _percentile(e, 0.95), "max_ms": e["max_ms"],
+                 "rows": e["rows"]} for k, e in items[:top]]
+
+    def reset(self):
+        with self._lock:
+            self.statements.clear()
+            self.methods.clear()
+            self.slow.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"buckets_ms": [b if b != float("inf") else None for b in BUCKETS_MS],
+                    "statements": json.loads(json.dumps(self.statements)),
+                    "methods": json.loads(json.dumps(self.methods)),
+                    "slow": list(self.slow)}
+
+    def merge(self, snap: Dict[str, Any]):
+        with self._lock:
+            for kind in ("statements", "methods"):
+                table = getattr(self, kind)
+                for key, src in snap.get(kind, {}).items():
+                    e = table.setdefault(key, _new_entry())
+                    e["count"] += src["count"]
+                    e["total_ms"] += src["total_ms"]
+                    e["max_ms"] = max(e["max_ms"], src["max_ms"])
+                    e["rows"] += src["rows"]
+                    e["buckets"] = [a + b for a, b in zip(e["buckets"], src["buckets"])]
+            self.slow = (snap.get("slow", []) + self.slow)[-100:]
+
+    def save(self, path: str):
+        # накапливает замеры в файле: к сохранённым ранее добавляются текущие
+        total = Metrics()
+        if Path(path).exists():
+            total.merge(load_snapshot(path))
+        total.merge(self.snapshot())
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(total.snapshot(), f, ensure_ascii=False, indent=1)
+
+
+def metrics_paths(db_path: str):
+    # файлы рядом с БД: накопленные замеры и журнал медленных запросов
+    return db_path + ".metrics.json", db_path + ".slow.log"
+
+
+def load_snapshot(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def format_summary(rows: List[Dict[str, Any]], width: int = 70) -> str:
+    lines = [f'{"кол-во":>7}{"всего, мс":>11}{"p50":>8}{"p95":>8}{"макс":>9}{"строк":>9}  запрос']
+    for r in rows:
+        name = r["name"] if len(r["name"]) <= width else r["name"][:width - 1] + "…"
+        lines.append(f'{r["count"]:>7}{r["total_ms"]:>11.1f}{r["p50_ms"]:>8.2f}{r["p95_ms"]:>8.2f}'
+                     f'{r["max_ms"]:>9.2f}{r["rows"]:>9}  {name}')
+    return "\n".join(lines)
+
+
+def _query_plan(conn: Optional[sqlite3.Connection], sql: str, params: Any) -> Optional[List[str]]:
+    if conn is None or not re.match(r"\s*(SELECT|WITH|UPDATE|DELETE|INSERT)\b", sql, re.I):
+        return None
+    try:
+        # обычный курсор — сам EXPLAIN в замеры не попадает
+        cur = sqlite3.Cursor(conn)
+        return [r[3] for r in cur.execute("EXPLAIN QUERY PLAN " + sql, params or ())]
+    except sqlite3.Error:
+        return None
+
+
+METRICS = Metrics()
+
+
+class TimedCursor(sqlite3.Cursor):
+    # время выполнения и чтения строк копится до исчерпания/закрытия курсора
+    _sql: Optional[str] = None
+
+    def _start(self, sql: str, params: Any):
+        self._finish()
+        self._sql, self._params, self._rows, self._elapsed = sql, params, 0, 0.0
+
+    def _finish(self, rows: Optional[int] = None):
+        if self._sql is None:
+            return
+        sql, self._sql = self._sql, None
+        METRICS.record_sql(self.connection, sql, self._params, self._elapsed,
+                           self._rows if rows is None else rows)
+
+    def execute(self, sql, parameters=()):
+        self._start(sql, parameters)
+        t0 = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        finally:
+            self._elapsed += time.perf_counter() - t0
+        if self.description is None:
+            self._finish(max(self.rowcount, 0))
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._start(sql, None)
+        t0 = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            self._elapsed += time.perf_counter() - t0
+        self._finish(max(self.rowcount, 0))
+        return self
+
+    def executescript(self, sql_script):
+        self._start(sql_script, None)
+        t0 = time.perf_counter()
+        try:
+            super().executescript(sql_script)
+        finally:
+            self._elapsed += time.perf_counter() - t0
+        self._finish(0)
+        return self
+
+    def _timed_fetch(self, fetch, *args):
+        t0 = time.perf_counter()
+        rows = fetch(*args)
+        if self._sql is not None:
+            self._elapsed += time.perf_counter() - t0
+        return rows
+
+    def fetchone(self):
+        row = self._timed_fetch(super().fetchone)
+        if row is None:
+            self._finish()
+        elif self._sql is not None:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._timed_fetch(super().fetchmany, size)
+        if self._sql is not None:
+            self._rows += len(rows)
+            if len(rows) < size:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed_fetch(super().fetchall)
+        if self._sql is not None:
+            self._rows += len(rows)
+            self._finish()
+        return rows
+
+    def __next__(self):
+        t0 = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._finish()
+            raise
+        if self._sql is not None:
+            self._elapsed += time.perf_counter() - t0
+            self._rows += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    # Connection.execute в C не вызывает Cursor.execute, поэтому запросы идут через cursor()
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+def connection_factory():
+    return InstrumentedConnection if METRICS.enabled else sqlite3.Connection
+
+
+def instrument_methods(cls, prefix: Optional[str] = None, skip: Iterable[str] = ()):
+    # оборачивает публичные методы класса: при METRICS.enabled время вызова идёт в METRICS.methods;
+    # skip — методы, возвращающие генераторы/контекстные менеджеры (их время не показательно)
+    prefix = prefix or cls.__name__
+    skip = set(skip)
+    for name, fn in list(vars(cls).items()):
+        if name.startswith("_") or name in skip or not callable(fn) \
+                or isinstance(fn, (staticmethod, classmethod, type)):
+            continue
+        setattr(cls, name, _timed_method(fn, f"{prefix}.{name}"))
+    return cls
+
+
+def _timed_method(fn: Callable[..., Any], label: str) -> Callable[..., Any]:
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not METRICS.enabled:
+            return fn(*args, **kwargs)
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            METRICS.record_method(label, time.perf_counter() - t0)
+    return wrapper
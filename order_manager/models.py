@@ -1,24 +1,51 @@
 from __future__ import annotations
-from dataclasses import dataclass, asdict
-from typing import List, Dict, Any, Optional
+from array import array
+from dataclasses import dataclass
+from itertools import repeat
+from typing import Any, ClassVar, Dict, Iterable, Iterator, List, Optional, Tuple
 from .utils import validate_email, validate_phone, safe_float, now_date_str
 
 
 class BaseModel:
+    # записи на __slots__ (без __dict__ у экземпляра); FIELDS — порядок полей для to_tuple/from_row,
+    # ROW_SLOTS — атрибуты, в которые from_row пишет значения напрямую (в обход проверок)
+    __slots__ = ()
+    FIELDS: ClassVar[Tuple[str, ...]] = ()
+    ROW_SLOTS: ClassVar[Optional[Tuple[str, ...]]] = None
+
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        return dict(zip(self.FIELDS, self.to_tuple()))
+
+    def to_tuple(self) -> tuple:
+        return tuple(getattr(self, f) for f in self.FIELDS)
 
     @classmethod
     def from_dict(cls, d: Dict[str, Any]):
         return cls(**d)
 
+    @classmethod
+    def from_row(cls, row):
+        # строка БД: sqlite3.Row (по именам колонок, лишние вроде id пропускаются) или кортеж
+        # в порядке FIELDS. Данные из БД уже проверены — валидация не повторяется.
+        obj = object.__new__(cls)
+        values = (row[f] for f in cls.FIELDS) if hasattr(row, "keys") else row
+        for slot, value in zip(cls.ROW_SLOTS or cls.FIELDS, values):
+            object.__setattr__(obj, slot, value)
+        return obj
+
 
 @dataclass
 class Person(BaseModel):
+    __slots__ = ("name",)
+    FIELDS = ("name",)
     name: str
 
 
 class Client(Person):
+    __slots__ = ("_email", "_phone", "address")
+    FIELDS = ("name", "email", "phone", "address")
+    ROW_SLOTS = ("name", "_email", "_phone", "address")
+
     def __init__(self, name: str, email: str, phone: str, address: str = ""):
         super().__init__(name=name)
         self._email = ""
@@ -60,6 +87,8 @@ class Client(Person):
 
 @dataclass
 class Product(BaseModel):
+    __slots__ = ("name", "price")
+    FIELDS = ("name", "price")
     name: str
     price: float
 
@@ -71,17 +100,27 @@ class Product(BaseModel):
 
 @dataclass
 class OrderItem(BaseModel):
+    __slots__ = ("product_id", "quantity")
+    FIELDS = ("product_id", "quantity")
     product_id: int
     quantity: int
 
     def __post_init__(self):
-        self.quantity = int(self.quantity)
-        if self.quantity <= 0:
+        self.product_id, self.quantity = self.check(self.product_id, self.quantity)
+
+    @staticmethod
+    def check(product_id: Any, quantity: Any) -> Tuple[int, int]:
+        # единая проверка позиции: OrderItem и OrderBatch.add
+        quantity = int(quantity)
+        if quantity <= 0:
             raise ValueError("Количество должно быть > 0")
+        return int(product_id), quantity
 
 
 @dataclass
 class Order(BaseModel):
+    __slots__ = ("client_id", "date", "items")
+    FIELDS = ("client_id", "date")
     client_id: int
     date: str
     items: List[OrderItem]
@@ -94,6 +133,84 @@ class Order(BaseModel):
         return {"client_id": self.client_id, "date": self.date,
                 "items": [it.to_dict() for it in self.items]}
 
+    @classmethod
+    def from_row(cls, row, items: Optional[List[OrderItem]] = None) -> "Order":
+        obj = super().from_row(row)
+        obj.items = items if items is not None else []
+        return obj
+
     @classmethod
     def simple(cls, client_id: int, items: List[OrderItem], date: Optional[str] = None):
         return cls(client_id=client_id, date=date or now_date_str(), items=items)
+
+
+def _item_pair(x: Any) -> Tuple[int, int]:
+    # позиция заказа: OrderItem, dict или (product_id, quantity), проверенная OrderItem.check
+    if isinstance(x, OrderItem):
+        return OrderItem.check(x.product_id, x.quantity)
+    if isinstance(x, dict):
+        return OrderItem.check(x["product_id"], x["quantity"])
+    return OrderItem.check(*x)
+
+
+class OrderBatch:
+    # пачка заказов в параллельных массивах (array, по 8 байт на число):
+    # заказ i — client_ids[i], dates[i]; позиция j — item_orders[j] (номер заказа в пачке),
+    # product_ids[j], quantities[j]. Database.write_order_batch пишет её двумя executemany.
+    __slots__ = ("client_ids", "dates", "item_orders", "product_ids", "quantities")
+
+    def __init__(self):
+        self.client_ids = array("q")
+        self.dates: List[str] = []
+        self.item_orders = array("q")
+        self.product_ids = array("q")
+        self.quantities = array("q")
+
+    def add(self, client_id: int, date: str, items: Iterable[Any]) -> int:
+        # возвращает номер заказа в пачке; при ошибке пачка не меняется
+        pos = len(self.dates)
+        start = len(self.product_ids)
+        try:
+            for x in items:
+                pid, qty = _item_pair(x)
+                self.product_ids.append(pid)
+                self.quantities.append(qty)
+            if len(self.product_ids) == start:
+                raise ValueError("Заказ без позиций")
+            self.client_ids.append(int(client_id))
+        except BaseException:
+            del self.product_ids[start:]
+            del self.quantities[start:]
+            raise
+        self.dates.append(str(date))
+        self.item_orders.extend(repeat(pos, len(self.product_ids) - start))
+        return pos
+
+    @classmethod
+    def from_orders(cls, orders: Iterable[Order]) -> "OrderBatch":
+        batch = cls()
+        for o in orders:
+            batch.add(o.client_id, o.date, o.items)
+        return batch
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @property
+    def n_items(self) -> int:
+        return len(self.product_ids)
+
+    def order_rows(self, first_id: int) -> Iterator[Tuple[int, int, str]]:
+        # (id, client_id, date) — id заказов подряд с first_id
+        return zip(range(first_id, first_id + len(self)), self.client_ids, self.dates)
+
+    def item_rows(self, first_id: int) -> Iterator[Tuple[int, int, int]]:
+        # (order_id, product_id, quantity)
+        return zip((first_id + i for i in self.item_orders), self.product_ids, self.quantities)
+
+    def orders(self) -> Iterator[Order]:
+        items: List[List[OrderItem]] = [[] for _ in self.dates]
+        for i, pid, qty in zip(self.item_orders, self.product_ids, self.quantities):
+            items[i].append(OrderItem.from_row((pid, qty)))
+        for cid, date, its in zip(self.client_ids, self.dates, items):
+            yield Order.from_row((cid, date), its)
@@ -0,0 +1,160 @@
+"""
+Пул соединений SQLite для многопоточной работы.
+
+Файл открывается в режиме WAL: одно соединение-писатель (запись строго по очереди)
+и несколько read-only соединений (mode=ro) для параллельных чтений — аналитики,
+выгрузок, отчётов. Читатели в WAL не блокируют писателя и друг друга.
+Профиль с другим режимом журнала (durable — DELETE, bulk-load — MEMORY) соблюдается,
+но тогда чтение и запись чередуются: коммит ждёт, пока читатели закончат.
+"""
+from __future__ import annotations
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .db import PROFILES, Database, apply_profile
+from .metrics import connection_factory
+
+
+def _is_busy(e: sqlite3.OperationalError) -> bool:
+    msg = str(e).lower()
+    return "locked" in msg or "busy" in msg
+
+
+class ConnectionPool:
+    def __init__(self, path: str, *, readers: int = 4, busy_timeout: float = 5.0,
+                 retries: int = 5, backoff: float = 0.05, profile: Optional[str] = None):
+        if path == ":memory:" or path.startswith("file:"):
+            raise ValueError("Пул соединений работает только с файлом БД")
+        if profile is not None and profile not in PROFILES:
+            raise ValueError(f"Неизвестный профиль: {profile}")
+        self.path = path
+        self.max_readers = max(1, readers)
+        self.busy_timeout = busy_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.profile = profile
+
+        self._writer = self._open(path, uri=False)
+        # режим журнала — из профиля (без профиля — WAL); не-WAL режим не подменяется молча
+        journal = PROFILES[profile]["journal_mode"] if profile else "WAL"
+        self.journal_mode = self._writer.execute(f"PRAGMA journal_mode = {journal}").fetchone()[0]
+        self._writer.execute("PRAGMA foreign_keys = ON")
+        self._write_lock = threading.Lock()
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, float] = {
+            "writes": 0, "write_wait_s": 0.0, "reads": 0, "read_wait_s": 0.0,
+            "busy_retries": 0, "busy_failures": 0,
+        }
+        self._closed = False
+        # слушатели изменений для всех Database, выдаваемых writer() (см. Database.listeners)
+        self.listeners: List[Callable[[str, Optional[int]], None]] = []
+
+    def _open(self, target: str, uri: bool) -> sqlite3.Connection:
+        conn = sqlite3.connect(target, uri=uri, timeout=self.busy_timeout, check_same_thread=False,
+                               factory=connection_factory())
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}")
+        if self.profile:
+            apply_profile(conn, self.profile, journal=False)
+        return conn
+
+    def _count(self, key: str, value: float = 1):
+        with self._stats_lock:
+            self._stats[key] += value
+
+    # --- выдача соединений ---
+
+    @contextmanager
+    def writer(self) -> Iterator[Database]:
+        if self._closed:
+            raise RuntimeError("Пул соединений закрыт")
+        t0 = time.perf_counter()
+        with self._write_lock:
+            self._count("write_wait_s", time.perf_counter() - t0)
+            self._count("writes")
+            db = Database(self.path, conn=self._writer)
+            db.listeners = self.listeners
+            try:
+                yield db
+            except BaseException:
+                if self._writer.in_transaction:
+                    self._writer.rollback()
+                raise
+            else:
+                if self._writer.in_transaction:
+                    self._writer.commit()
+
+    @contextmanager
+    def reader(self) -> Iterator[Database]:
+        if self._closed:
+            raise RuntimeError("Пул соединений закрыт")
+        t0 = time.perf_counter()
+        conn = self._acquire_reader()
+        self._count("read_wait_s", time.perf_counter() - t0)
+        self._count("reads")
+        try:
+            yield Database(self.path, conn=conn)
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def _acquire_reader(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._readers_lock:
+            if len(self._readers) < self.max_readers:
+                conn = self._open(Path(self.path).resolve().as_uri() + "?mode=ro", uri=True)
+                self._readers.append(conn)
+                return conn
+        return self._idle.get()
+
+    # --- выполнение с повтором при блокировке ---
+
+    def _retry(self, ctx: Callable[[], Any], fn: Callable[[Database], Any]) -> Any:
+        for attempt in range(self.retries + 1):
+            try:
+                with ctx() as db:
+                    return fn(db)
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e) or attempt == self.retries:
+                    if _is_busy(e):
+                        self._count("busy_failures")
+                    raise
+                self._count("busy_retries")
+                time.sleep(self.backoff * (2 ** attempt))
+
+    def run_write(self, fn: Callable[[Database], Any]) -> Any:
+        # fn должна быть одной транзакцией: при "database is locked" она выполняется заново
+        return self._retry(self.writer, fn)
+
+    def run_read(self, fn: Callable[[Database], Any]) -> Any:
+        return self._retry(self.reader, fn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            out: Dict[str, Any] = dict(self._stats)
+        out["readers_open"] = len(self._readers)
+        out["readers_idle"] = self._idle.qsize()
+        out["max_readers"] = self.max_readers
+        out["journal_mode"] = self.journal_mode
+        return out
+
+    def close(self):
+        self._closed = True
+        with self._write_lock:
+            self._writer.close()
+        with self._readers_lock:
+            for c in self._readers:
+                c.close()
+            self._readers.clear()
@@ -0,0 +1,100 @@
+"""
+Пакетная выгрузка отчётов без GUI.
+
+Каждый график строится на бэкенде Agg и сохраняется в файлы (PNG/SVG); независимые
+отчёты считаются параллельно в отдельных процессах, у каждого своё read-only
+соединение с БД. Итог — manifest.json с файлами и временем по каждому отчёту:
+    python -m order_manager.main --db orders.sqlite report --out reports/
+"""
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from . import analysis as anl
+
+FORMATS = ("png", "svg")
+
+# имя отчёта -> функция(conn), рисующая график в текущую фигуру; возвращает число строк данных
+REPORTS: Dict[str, Callable[[sqlite3.Connection], int]] = {
+    "top5_clients": lambda conn: len(anl.plot_top5_clients(conn, show=False)),
+    "orders_timeline": lambda conn: len(anl.plot_orders_timeline(conn, show=False)),
+    "orders_by_week": lambda conn: len(anl.plot_order_stats(conn, "week", show=False)),
+    "orders_by_month": lambda conn: len(anl.plot_order_stats(conn, "month", show=False)),
+    "orders_by_quarter": lambda conn: len(anl.plot_order_stats(conn, "quarter", show=False)),
+    "products_abc": lambda conn: len(anl.plot_abc_products(conn, show=False)),
+    "client_graph": lambda conn: anl.draw_city_graph(*anl.city_graph(conn), show=False).number_of_nodes(),
+}
+
+
+def _connect_ro(db_path: str) -> sqlite3.Connection:
+    return sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True)
+
+
+def render_report(db_path: str, name: str, out_dir: str, formats: Iterable[str] = FORMATS) -> Dict[str, Any]:
+    # выполняется в процессе-исполнителе; ошибка отчёта попадает в манифест, а не прерывает остальные
+    t0 = time.perf_counter()
+    entry: Dict[str, Any] = {"name": name, "files": [], "pid": os.getpid()}
+    conn = _connect_ro(db_path)
+    try:
+        rows = REPORTS[name](conn)
+        t1 = time.perf_counter()
+        fig = plt.gcf()
+        for fmt in formats:
+            path = Path(out_dir) / f"{name}.{fmt}"
+            fig.savefig(path, format=fmt, dpi=120)
+            entry["files"].append(path.name)
+        entry.update(status="ok", rows=rows, query_render_s=t1 - t0, save_s=time.perf_counter() - t1)
+    except Exception as e:
+        entry.update(status="error", error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc())
+    finally:
+        plt.close("all")
+        conn.close()
+    entry["seconds"] = time.perf_counter() - t0
+    return entry
+
+
+def run_reports(db_path: str, out_dir: str, *, names: Optional[Iterable[str]] = None,
+                formats: Iterable[str] = FORMATS, jobs: Optional[int] = None) -> Dict[str, Any]:
+    if not Path(db_path).exists():
+        raise FileNotFoundError(f"Файл БД не найден: {db_path}")
+    names = list(names or REPORTS)
+    unknown = [n for n in names if n not in REPORTS]
+    if unknown:
+        raise ValueError(f"Неизвестные отчёты: {', '.join(unknown)}")
+    formats = list(formats)
+    bad = [f for f in formats if f not in FORMATS]
+    if bad:
+        raise ValueError(f"Неподдерживаемые форматы: {', '.join(bad)}")
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(names)))
+
+    started = datetime.now().isoformat(timespec="seconds")
+    t0 = time.perf_counter()
+    if jobs == 1:
+        entries: List[Dict[str, Any]] = [render_report(db_path, n, out_dir, formats) for n in names]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(render_report, db_path, n, out_dir, formats) for n in names]
+            entries = [f.result() for f in futures]
+    manifest = {
+        "db": str(Path(db_path).resolve()),
+        "started": started,
+        "seconds": time.perf_counter() - t0,
+        "jobs": jobs,
+        "formats": formats,
+        "reports": entries,
+    }
+    with open(Path(out_dir) / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
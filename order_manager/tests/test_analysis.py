@@ -1,5 +1,7 @@
 import sqlite3
+import tempfile
 import unittest
+from pathlib import Path
 from order_manager.db import Database
 from order_manager import analysis as anl
 
@@ -21,5 +23,71 @@ class TestAnalysis(unittest.TestCase):
         self.assertTrue(len(df) >= 1)
         self.assertTrue("cnt" in df.columns)
 
+    def test_order_stats_rollups(self):
+        self.db.create_order(1, "2025-09-01", [(1, 1)])
+        week = anl.order_stats(self.conn, "week")
+        self.assertEqual(list(week["period"]), ["2025-08-11", "2025-09-01"])
+        self.assertEqual(list(week["orders"]), [4, 1])
+        month = anl.order_stats(self.conn, "month")
+        self.assertEqual(list(month["period"]), ["2025-08-01", "2025-09-01"])
+        self.assertAlmostEqual(float(month["revenue"].iloc[0]), 765.0)
+        with self.assertRaises(ValueError):
+            anl.order_stats(self.conn, "year")
+
+    def test_orders_timeline_window(self):
+        self.db.create_order(1, "2025-09-01", [(1, 1)])
+        df = anl.orders_timeline(self.conn, "week", "2025-08-14")
+        self.assertEqual(list(df["date"]), ["2025-08-11", "2025-09-01"])
+        self.assertEqual(list(df["cnt"]), [1, 1])
+        anl.plot_orders_timeline(self.conn, show=False, date_from="2025-08-14", period="month")
+        anl.plt.close("all")
+        quarter = anl.order_stats(self.conn, "quarter")
+        self.assertEqual(list(quarter["period"]), ["2025-07-01"])
+        # сводка по дням и заказы группируются по одним и тем же периодам
+        for period in ("day", "week", "month", "quarter"):
+            stats = anl.order_stats(self.conn, period)
+            timeline = anl.orders_timeline(self.conn, period)
+            self.assertEqual(list(stats["period"]), list(timeline["date"]))
+            self.assertEqual(list(stats["orders"]), list(timeline["cnt"]))
+
+    def test_city_graph_hubs(self):
+        self.db.add_client("Олег", "", "", "Казань")
+        G, labels, pos = anl.city_graph(self.conn, max_per_city=1, max_cities=1)
+        moscow = ("city", "Москва")
+        self.assertEqual(labels[moscow], "Москва (2)")
+        self.assertEqual(labels[("city", anl.OTHER_CITIES)], f"{anl.OTHER_CITIES} (2)")
+        self.assertEqual(list(G.neighbors(moscow)), [1])
+        self.assertEqual(G.number_of_edges(), 1)
+        self.assertEqual(set(pos), set(G.nodes))
+        self.assertIs(anl.city_graph.uncached(self.conn, max_per_city=1, max_cities=1)[2], pos)
+
+        G, labels, _ = anl.city_graph(self.conn, hubs=False)
+        self.assertEqual(sorted(G.edges), [(1, 3)])
+        self.assertEqual(labels[1], "Иван (Москва)")
+
+    def test_result_cache(self):
+        before = anl.results.stats()
+        df = anl.orders_per_day(self.conn)
+        self.assertIs(anl.orders_per_day(self.conn), df)
+        self.db.create_order(1, "2030-01-01", [(1, 1)])
+        self.assertIn("2030-01-01", list(anl.orders_per_day(self.conn)["date"]))
+        after = anl.results.stats()
+        self.assertEqual(after["hits"] - before["hits"], 1)
+        self.assertEqual(after["misses"] - before["misses"], 2)
+
+    def test_result_cache_sees_other_connections(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "orders.sqlite")
+            writer = Database(path); writer.init_schema(); writer.seed_demo()
+            reader = sqlite3.connect(path)
+            try:
+                n = int(anl.orders_per_day(reader)["cnt"].sum())
+                self.assertIs(anl.top5_clients_by_orders(reader), anl.top5_clients_by_orders(reader))
+                writer.create_order(2, "2030-01-01", [(1, 1)])
+                self.assertEqual(int(anl.orders_per_day(reader)["cnt"].sum()), n + 1)
+            finally:
+                reader.close()
+                writer.close()
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,37 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from order_manager.db import Database
+from order_manager.datagen import generate, scaled_counts
+from order_manager.bench import bench_suite, format_suite_report, save_suite
+
+
+class TestBench(unittest.TestCase):
+    def test_generate_is_deterministic(self):
+        dumps = []
+        for _ in range(2):
+            db = Database(":memory:")
+            db.init_schema()
+            counts = generate(db, 0.01, seed=7)
+            self.assertEqual({k: counts[k] for k in ("clients", "products", "orders")}, scaled_counts(0.01))
+            self.assertEqual(db.count_orders(), counts["orders"])
+            self.assertEqual(db.check_daily_stats(), [])
+            dumps.append([tuple(r) for r in db.conn.execute(
+                "SELECT o.id, o.client_id, o.date, i.product_id, i.quantity, i.price "
+                "FROM orders o JOIN order_items i ON i.order_id = o.id ORDER BY i.id")])
+            db.close()
+        self.assertEqual(dumps[0], dumps[1])
+
+    def test_suite_json(self):
+        result = bench_suite(0.002, repeat=2, only=["create_order", "list_orders", "analysis.city_graph"])
+        self.assertEqual(sorted(result["results"]), ["analysis.city_graph", "create_order", "list_orders"])
+        self.assertEqual(result["results"]["create_order"]["repeat"], 40)
+        with tempfile.TemporaryDirectory() as d:
+            path = Path(d) / "bench.json"
+            save_suite(result, str(path))
+            saved = json.loads(path.read_text(encoding="utf-8"))
+        self.assertIn("x1.00", format_suite_report(result, saved))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+from order_manager.db import Database
+from order_manager.cache import CatalogCache
+
+
+class TestCatalogCache(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(":memory:")
+        self.db.init_schema()
+        self.db.seed_demo()
+        self.cache = CatalogCache(self.db, maxsize=2)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_hits_and_invalidation(self):
+        self.assertEqual(self.cache.get_product(1)["name"], self.db.get_product(1)["name"])
+        self.cache.get_product(1)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+        pid = self.db.add_product("Чайник", 1500)
+        self.assertEqual(self.cache.get_product(pid)["price"], 1500)
+        self.db.delete_product(pid)
+        self.assertIsNone(self.cache.get_product(pid))
+
+        self.assertEqual(self.cache.get_client(1)["id"], 1)
+        self.db.delete_client(1)
+        self.assertIsNone(self.cache.get_client(1))
+
+    def test_lru_eviction(self):
+        for pid in (1, 2, 1, 3):
+            self.cache.get_product(pid)
+        st = self.cache.stats()
+        self.assertEqual(st["products"], 2)
+        self.assertEqual(st["evictions"], 1)
+        self.cache.get_product(1)
+        self.assertEqual(self.cache.stats()["hits"], 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import numpy as np
+from order_manager.db import Database
+from order_manager import analysis as anl
+from order_manager import columnar
+
+
+class TestColumnar(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(":memory:")
+        self.db.init_schema()
+        self.db.seed_demo()
+        self.conn = self.db.conn
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_load(self):
+        cols = columnar.OrderColumns.load(self.conn, chunk_size=2)
+        self.assertEqual(cols.n_orders, 4)
+        self.assertEqual(cols.orders["client"].dtype, np.int32)
+        self.assertEqual(cols.items["amount"].dtype, np.float64)
+        self.assertEqual(list(columnar.days_to_dates(cols.orders["day"][:1])), ["2025-08-13"])
+        self.assertAlmostEqual(cols.order_revenue().sum(), 765.0)
+        with self.assertRaises(ValueError):
+            cols.orders["client"][0] = 5
+
+        part = columnar.OrderColumns.load(self.conn, ["client"])
+        self.assertEqual(set(part.orders), {"id", "client"})
+        self.assertEqual(part.items, {})
+        with self.assertRaises(ValueError):
+            columnar.OrderColumns.load(self.conn, ["nope"])
+
+    def test_reports_match_sql(self):
+        rep = columnar.reports(columnar.OrderColumns.load(self.conn))
+        by_client = dict(zip(rep["clients"]["id"].tolist(), rep["clients"]["revenue"].tolist()))
+        sql = dict(self.conn.execute("SELECT o.client_id, SUM(t.total) FROM orders o "
+                                     "JOIN order_totals t ON t.order_id=o.id GROUP BY 1").fetchall())
+        self.assertEqual(by_client, sql)
+        self.assertEqual(rep["products"]["qty"].tolist(), [2, 2, 3])
+        self.assertEqual(rep["days"]["orders"].tolist(), [3, 1])
+        self.assertEqual(rep["basket"]["avg_lines"], 1.25)
+        self.assertEqual(rep["basket"]["revenue"], 765.0)
+        self.assertEqual(rep["rfm"]["recency"].tolist(), [1, 1, 0])
+
+    def test_unknown_day(self):
+        # заказ с нераспознанной датой (day IS NULL) не попадает на 1970-01-01 и в RFM
+        self.conn.execute("UPDATE orders SET day = NULL WHERE id = 4")
+        cols = columnar.OrderColumns.load(self.conn)
+        self.assertEqual(cols.orders["day"][-1], columnar.NO_DAY)
+        rep = columnar.reports(cols)
+        self.assertEqual(list(columnar.days_to_dates(rep["days"]["id"])), ["2025-08-13"])
+        self.assertEqual(rep["rfm"]["id"].tolist(), [1, 2])
+        self.assertEqual(rep["rfm"]["recency"].tolist(), [0, 0])
+        self.assertEqual(rep["basket"]["revenue"], 765.0)
+
+    def test_abc_and_scores(self):
+        abc = columnar.abc_classes(np.array([5.0, 70.0, 10.0, 15.0]))
+        self.assertEqual(abc["order"].tolist(), [1, 3, 2, 0])
+        self.assertEqual(abc["abc"].tolist(), ["A", "A", "B", "C"])
+        # 8 клиентов с одним заказом из 10 — средняя оценка, не верхняя
+        self.assertEqual(columnar._score(np.array([1] * 8 + [5, 9])).tolist(), [2] * 8 + [5, 5])
+
+    def test_analysis_frames(self):
+        df = anl.revenue_by_product(self.conn, top=1)
+        self.assertEqual(df.iloc[0]["name"], "Сосиски")
+        self.assertEqual(df.iloc[0]["revenue"], 400.0)
+        abc = anl.abc_products(self.conn)
+        self.assertAlmostEqual(abc["cum_share"].iloc[-1], 1.0)
+        rfm = anl.rfm_segments(self.conn, asof="2025-09-13")
+        self.assertEqual(rfm["recency"].tolist(), [31, 31, 30])
+        self.assertTrue(set(rfm["segment"]) <= set(columnar.RFM_SEGMENTS))
+
+        cols = anl.order_columns(self.conn)
+        self.assertIs(anl.order_columns(self.conn), cols)
+        self.db.create_order(3, "2025-09-01", [(1, 4)])
+        self.assertIsNot(anl.order_columns(self.conn), cols)
+        self.assertEqual(anl.revenue_by_client(self.conn, top=1).iloc[0]["name"], "Артем")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,332 @@
+import io
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from order_manager.db import Database, MIGRATIONS, page_key, _iter_json_dump
+from order_manager.models import OrderBatch, OrderItem
+
+
+class TestDatabase(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(":memory:")
+        self.db.init_schema()
+        self.db.seed_demo()
+
+    def test_migrations(self):
+        self.assertEqual(self.db.schema_version, MIGRATIONS[-1][0])
+        self.assertEqual(self.db.migrate(), [])
+        plan = " ".join(r[3] for r in self.db.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM orders WHERE client_id = 1"))
+        self.assertIn("idx_orders_client_id", plan)
+
+    def test_migrate_legacy_db_with_duplicates(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = str(Path(d) / "old.sqlite")
+            db = Database(path)
+            db.conn.executescript(
+                "CREATE TABLE clients(id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, "
+                "email TEXT, phone TEXT, address TEXT);"
+                "INSERT INTO clients(name,email,phone) VALUES('a','x@y.ru',''),('b','x@y.ru','');")
+            report = db.init_schema()
+            self.assertEqual([m["version"] for m in report], [v for v, _, _ in MIGRATIONS])
+            db.add_client("c", "", "", "")  # пустой email не считается дублем
+            with self.assertRaises(ValueError):
+                db.add_client("d", "x@y.ru", "", "")
+            db.conn.close()
+
+    def test_find_clients_fts(self):
+        self.assertTrue(self.db.has_fts)
+        self.assertEqual([r["name"] for r in self.db.find_clients("ива")], ["Иван"])
+        self.assertEqual(len(self.db.find_clients("москва")), 2)
+        self.assertEqual(len(self.db.find_clients("москва", limit=1)), 1)
+        self.assertEqual([r["name"] for r in self.db.find_clients("petr@example")], ["Пётр"])
+        self.db.conn.execute("UPDATE clients SET address = 'Казань' WHERE name = 'Артем'")
+        self.assertEqual(len(self.db.find_clients("Москва")), 1)
+        self.db.delete_client(1)
+        self.assertEqual(self.db.find_clients("Москва"), [])
+        self.assertEqual(self.db.find_clients("!!"), [])
+
+    def test_find_clients_like_fallback(self):
+        self.db._fts = False
+        self.assertEqual([r["name"] for r in self.db.find_clients("ётр")], ["Пётр"])
+
+    def test_frozen_prices_and_totals(self):
+        totals = {r["id"]: (r["total"], r["total_qty"]) for r in self.db.list_orders()}
+        self.assertEqual(totals[3], (300.0, 2))
+        self.db.conn.execute("UPDATE products SET price = 1000 WHERE id = 1")
+        self.assertEqual({r["id"]: r["total"] for r in self.db.list_orders()}[3], 300.0)
+        self.assertEqual(sorted(r["price"] for r in self.db.order_items(3)), [100.0, 200.0])
+        oid = self.db.create_order(2, "2025-09-01", [(1, 2)])
+        self.assertEqual({r["id"]: r["total"] for r in self.db.list_orders()}[oid], 2000.0)
+        self.db.conn.execute("DELETE FROM order_items WHERE order_id = 3 AND product_id = 1")
+        self.db.conn.execute("UPDATE order_items SET quantity = 3 WHERE order_id = 3")
+        self.assertEqual({r["id"]: (r["total"], r["total_qty"]) for r in self.db.list_orders()}[3], (600.0, 3))
+        self.db.delete_order(3)
+        self.assertEqual(self.db.conn.execute("SELECT COUNT(*) FROM order_totals WHERE order_id = 3").fetchone()[0], 0)
+
+    def test_daily_stats(self):
+        stats = lambda: {r[0]: tuple(r)[1:] for r in self.db.conn.execute("SELECT * FROM daily_order_stats")}
+        self.assertEqual(stats(), {"2025-08-13": (3, 4, 600.0), "2025-08-14": (1, 3, 165.0)})
+        oid = self.db.create_order(2, "2025-09-01", [(1, 2), (3, 1)])
+        self.assertEqual(stats()["2025-09-01"], (1, 3, 255.0))
+        self.db.conn.execute("UPDATE orders SET date = '2025-08-14' WHERE id = ?", (oid,))
+        self.db.conn.execute("UPDATE order_items SET quantity = 2 WHERE order_id = 4")
+        self.db.delete_order(1)
+        self.db.delete_client(2)
+        self.assertEqual(stats(), {"2025-08-13": (1, 1, 200.0), "2025-08-14": (1, 2, 110.0)})
+        self.assertEqual(self.db.check_daily_stats(), [])
+
+        self.db.conn.execute("UPDATE daily_order_stats SET orders = 5 WHERE date = '2025-08-13'")
+        self.db.conn.execute("DELETE FROM daily_order_stats WHERE date = '2025-08-14'")
+        diffs = self.db.check_daily_stats(fix=True)
+        self.assertEqual([d["date"] for d in diffs], ["2025-08-13", "2025-08-14"])
+        self.assertEqual(self.db.check_daily_stats(), [])
+
+    def test_day_column_and_buckets(self):
+        day = lambda oid: self.db.conn.execute("SELECT day FROM orders WHERE id = ?", (oid,)).fetchone()[0]
+        self.assertEqual(day(1), 20313)  # 2025-08-13
+        self.db.conn.execute("INSERT INTO orders(client_id, date) VALUES(1, '1970-01-02')")
+        self.assertEqual(day(5), 1)
+        self.db.conn.execute("INSERT INTO order_items(order_id, product_id, quantity) VALUES(5, 3, 2)")
+        self.db.conn.execute("UPDATE orders SET date = '2025-09-30' WHERE id = 5")
+        self.db.create_orders_bulk([(2, "2025-10-01", [(1, 1)])])
+        self.assertEqual(self.db.order_date_range(), ("2025-08-13", "2025-10-01"))
+
+        self.assertEqual([r["id"] for r in self.db.orders_in_range("2025-08-14", "2025-09-30")], [4, 5])
+        self.assertEqual(self.db.count_orders(date_from="2025-09-01"), 2)
+        weeks = [tuple(r) for r in self.db.order_buckets("week")]
+        self.assertEqual(weeks, [("2025-08-11", 4, 7, 765.0), ("2025-09-29", 2, 3, 210.0)])
+        quarters = [tuple(r)[:2] for r in self.db.order_buckets("quarter", "2025-08-14")]
+        self.assertEqual(quarters, [("2025-07-01", 2), ("2025-10-01", 1)])
+        self.assertEqual([tuple(r)[:2] for r in self.db.order_buckets("month", client_id=2)],
+                         [("2025-08-01", 1), ("2025-10-01", 1)])
+        plan = " ".join(r[3] for r in self.db.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM orders o WHERE o.day >= 20300"))
+        self.assertIn("idx_orders_day", plan)
+        with self.assertRaises(ValueError):
+            self.db.order_buckets("year")
+
+    def test_keyset_iterators(self):
+        self.db.create_orders_bulk([(i % 3 + 1, f"2025-09-{i % 5 + 1:02d}", [(i % 3 + 1, i % 4 + 1)])
+                                    for i in range(30)])
+        expected = [tuple(r) for r in self.db.list_orders()]
+        self.assertEqual([tuple(r) for r in self.db.iter_orders(page_size=7)], expected)
+        by_total = [r["total"] for r in self.db.iter_orders(page_size=4, order_by="total")]
+        self.assertEqual(by_total, sorted(by_total, reverse=True))
+        self.assertEqual(len(by_total), len(expected))
+        window = list(self.db.iter_orders(page_size=3, date_from="2025-09-02", date_to="2025-09-03", client_id=1))
+        self.assertTrue(window)
+        self.assertTrue(all("2025-09-02" <= r["date"] <= "2025-09-03" and r["client"] == "Иван" for r in window))
+        first = self.db.page_products(limit=2, order_by="price")
+        nxt = self.db.page_products(page_key(first[-1], "price"), 2, order_by="price")
+        self.assertEqual([r["price"] for r in first + nxt], [55.0, 100.0, 200.0])
+        # переход без ключа — OFFSET в том же порядке, что и цепочка страниц
+        self.assertEqual([tuple(r) for r in self.db.page_orders(limit=5, offset=10)], expected[10:15])
+        self.assertEqual([r["name"] for r in self.db.iter_clients(page_size=1, order_by="name")],
+                         ["Артем", "Иван", "Пётр"])
+        with self.assertRaises(ValueError):
+            self.db.page_orders(order_by="client")
+
+    def test_add_bulk(self):
+        ids = self.db.add_clients_bulk([("Олег", "oleg@example.com", "", "Казань"), ("Ян", "", "", "")], batch_size=1)
+        self.assertEqual(ids, [4, 5])
+        self.assertEqual(self.db.get_client(5)["name"], "Ян")
+        self.assertEqual([r["id"] for r in self.db.find_clients("Олег")], [4])
+        self.assertEqual(self.db.add_products_bulk([("Хлеб", "40.5")]), [4])
+        self.assertEqual(self.db.get_product(4)["price"], 40.5)
+        with self.assertRaises(ValueError):
+            self.db.add_products_bulk([("Сыр", -1)])
+        self.assertEqual(self.db.count_products(), 4)
+
+    def test_find_products(self):
+        self.db.add_product("Вода газированная", 60)
+        self.assertEqual([r["name"] for r in self.db.find_products("Вод")], ["Вода", "Вода газированная"])
+        self.assertEqual([r["name"] for r in self.db.find_products("газ")], ["Вода газированная"])
+        self.assertEqual([r["name"] for r in self.db.find_products("2")], ["Сосиски"])
+        self.assertEqual(len(self.db.find_products("", limit=2)), 2)
+
+    def test_import_clients(self):
+        existing = self.db.get_client(1)
+        with tempfile.TemporaryDirectory() as d:
+            path = Path(d) / "crm.csv"
+            path.write_text(
+                "sep=;\nName;Phone;Email\n"
+                "Анна;+7 (900) 111-22-33;Anna@Mail.ru\n"
+                f"Борис;;{existing['email'].upper()}\n"
+                "Вера;89001112233;anna@mail.ru\n"
+                ";;\n"
+                "Глеб;12;\n"
+                "Дина;;dina@mail.ru\n"
+                "Еремей;+79001112233;\n"
+                "Олег\n", encoding="utf-8")
+            stats = self.db.import_clients(str(path), batch_size=2)
+            self.assertEqual((stats["read"], stats["inserted"], stats["invalid"], stats["duplicates"]), (7, 3, 1, 3))
+            rows = {r["name"]: (r["email"], r["phone"]) for r in self.db.list_clients()[3:]}
+            self.assertEqual(rows, {"Анна": ("anna@mail.ru", "+79001112233"), "Дина": ("dina@mail.ru", ""),
+                                    "Олег": ("", "")})
+            self.assertEqual([r["name"] for r in self.db.find_clients("dina")], ["Дина"])
+            with open(stats["rejects"], encoding="utf-8-sig") as f:
+                rejects = [line.split(";")[:2] for line in f.read().splitlines()[1:]]
+            self.assertEqual(rejects, [["4", "дубль email (в БД, ID=1)"], ["5", "дубль email (строка 3)"],
+                                       ["7", "некорректный телефон"], ["9", "дубль телефона (строка 3)"]])
+
+            ndjson = Path(d) / "crm.ndjson"
+            ndjson.write_text(json.dumps({"name": "Жанна", "phone": "+79005556677"}, ensure_ascii=False) + "\n"
+                              + json.dumps({"name": "Анна", "email": " ANNA@mail.ru "}, ensure_ascii=False) + "\n",
+                              encoding="utf-8")
+            stats = self.db.import_clients(str(ndjson), rejects_path=str(Path(d) / "rej.csv"))
+            self.assertEqual((stats["inserted"], stats["duplicates"]), (1, 1))
+            clean = Path(d) / "new.csv"
+            clean.write_text("name,email\nЗоя,zoya@mail.ru\n", encoding="utf-8")
+            stats = self.db.import_clients(str(clean))
+            self.assertEqual(stats["inserted"], 1)
+            self.assertIsNone(stats["rejects"])
+            self.assertFalse(Path(str(clean) + ".rejects.csv").exists())
+
+    def test_create_orders_bulk(self):
+        records = [(1, "2025-09-01", [(1, 2)]),
+                   (2, "2025-09-02", [OrderItem(2, 1), {"product_id": 3, "quantity": 4}]),
+                   (3, "2025-09-03", [(3, 1)])]
+        ids, report = self.db.create_orders_bulk(records, batch_size=2)
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(len(set(ids)), 3)
+        self.assertEqual([b["orders"] for b in report], [2, 1])
+        self.assertEqual(sum(b["items"] for b in report), 4)
+        items = self.db.order_items(ids[1])
+        self.assertEqual(sorted(r["quantity"] for r in items), [1, 4])
+
+    def test_write_order_batch(self):
+        batch = OrderBatch()
+        batch.add(1, "2025-09-01", [(2, 2), (3, 1)])
+        batch.add(3, "2025-09-02", [(1, 4)])
+        ids = self.db.write_order_batch(batch)
+        self.assertEqual(ids, [5, 6])
+        self.assertEqual([tuple(r)[1:] for r in self.db.order_items(5)], [("Сосиски", 200.0, 2, 400.0),
+                                                                        ("Вода", 55.0, 1, 55.0)])
+        self.assertEqual(self.db.check_daily_stats(), [])
+        self.assertEqual(self.db.write_order_batch(OrderBatch()), [])
+
+    def test_create_orders_bulk_validation(self):
+        with self.assertRaises(ValueError):
+            self.db.create_orders_bulk([(1, "2025-09-01", [(1, 0)])])
+        with self.assertRaises(ValueError):
+            self.db.create_orders_bulk([(1, "2025-09-01", [])])
+        self.assertEqual(len(self.db.list_orders()), 4)
+
+    def test_export_ndjson(self):
+        calls = []
+        with tempfile.TemporaryDirectory() as d:
+            out = Path(d) / "dump.ndjson"
+            n = self.db.export_ndjson(str(out), chunk_size=2, progress=lambda *a: calls.append(a))
+            lines = [json.loads(x) for x in out.read_text(encoding="utf-8").splitlines()]
+        self.assertEqual(n, len(lines))
+        self.assertEqual(sum(1 for r in lines if r["table"] == "clients"), 3)
+        self.assertEqual(lines[0]["row"]["name"], "Иван")
+        self.assertIn(("order_items", 5, 5), calls)
+
+    def test_import_roundtrip(self):
+        with tempfile.TemporaryDirectory() as d:
+            js, nd = Path(d) / "dump.json", Path(d) / "dump.ndjson"
+            self.db.export_json(str(js))
+            self.db.export_ndjson(str(nd))
+            for path in (js, nd):
+                other = Database(":memory:")
+                other.init_schema()
+                counts = other.import_data(str(path), chunk_size=2, rebuild_indexes=True)
+                self.assertEqual(counts, {"clients": 3, "products": 3, "orders": 4, "order_items": 5})
+                self.assertEqual([tuple(r) for r in other.list_orders()],
+                                 [tuple(r) for r in self.db.list_orders()])
+                self.assertEqual(other.check_daily_stats(), [])
+
+    def test_import_dump_without_prices(self):
+        # дамп старой версии: у позиций нет price, позиций больше chunk_size, товаров меньше
+        with tempfile.TemporaryDirectory() as d:
+            js = Path(d) / "dump.json"
+            self.db.export_json(str(js))
+            data = json.loads(js.read_text(encoding="utf-8"))
+            for it in data["order_items"]:
+                del it["price"]
+            js.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            other = Database(":memory:")
+            other.init_schema()
+            counts = other.import_data(str(js), chunk_size=4)
+        self.assertEqual(counts["order_items"], 5)
+        self.assertEqual([tuple(r) for r in other.list_orders()],
+                         [tuple(r) for r in self.db.list_orders()])
+        self.assertEqual(other.check_daily_stats(), [])
+
+    def test_import_merge(self):
+        with tempfile.TemporaryDirectory() as d:
+            nd = Path(d) / "dump.ndjson"
+            nd.write_text(
+                json.dumps({"table": "products", "row": {"id": 1, "name": "Мыло", "price": 120}}) + "\n" +
+                json.dumps({"table": "products", "row": {"id": 10, "name": "Хлеб", "price": 40}}) + "\n",
+                encoding="utf-8")
+            counts = self.db.import_data(str(nd), mode="merge")
+        self.assertEqual(counts["products"], 2)
+        prices = {r["name"]: r["price"] for r in self.db.list_products()}
+        self.assertEqual(prices, {"Мыло": 120, "Сосиски": 200, "Вода": 55, "Хлеб": 40})
+        self.assertEqual(len(self.db.list_orders()), 4)
+        self.assertEqual(self.db.check_daily_stats(), [])
+
+        # позиция сменила товар и пришла без цены — цена нового товара, а не прежняя
+        with tempfile.TemporaryDirectory() as d:
+            nd = Path(d) / "items.ndjson"
+            nd.write_text(
+                json.dumps({"table": "order_items", "row": {"id": 1, "order_id": 1, "product_id": 2, "quantity": 1}}) +
+                "\n" +
+                json.dumps({"table": "order_items", "row": {"id": 2, "order_id": 2, "product_id": 2, "quantity": 2}}) +
+                "\n", encoding="utf-8")
+            self.db.import_data(str(nd), mode="merge")
+        items = self.db.conn.execute("SELECT id, price FROM order_items WHERE id IN (1, 2) ORDER BY id").fetchall()
+        self.assertEqual([tuple(r) for r in items], [(1, 200.0), (2, 200.0)])
+        self.assertEqual(self.db.conn.execute("SELECT total FROM order_totals WHERE order_id = 1").fetchone()[0], 200)
+        self.assertEqual(self.db.check_daily_stats(), [])
+
+    def test_iter_json_dump_small_buffer(self):
+        data = {"clients": [{"id": 1, "name": "А, [б]"}], "products": [], "orders": [{"id": 12345, "date": "x"}]}
+        recs = list(_iter_json_dump(io.StringIO(json.dumps(data, indent=2)), bufsize=3))
+        self.assertEqual(recs, [("clients", data["clients"][0]), ("orders", data["orders"][0])])
+
+    def test_export_csv_parallel(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = str(Path(d) / "orders.sqlite")
+            db = Database(path)
+            db.init_schema()
+            db.seed_demo()
+            for parallel in (True, False):
+                out = Path(d) / f"csv_{parallel}"
+                db.export_csv(str(out), chunk_size=2, parallel=parallel)
+                lines = (out / "clients.csv").read_text(encoding="cp1251").splitlines()
+                self.assertEqual(lines[0], "sep=;")
+                self.assertEqual(lines[1], "id;name;email;phone;address")
+                self.assertEqual(lines[2], "1;Иван;ivan@example.com;'+79991112233;Москва")
+                self.assertEqual(len((out / "order_items.csv").read_text(encoding="cp1251").splitlines()), 7)
+            db.conn.close()
+
+    def test_export_xlsx_split(self):
+        from openpyxl import load_workbook
+        with tempfile.TemporaryDirectory() as d:
+            out = Path(d) / "export.xlsx"
+            self.db.export_xlsx(str(out), chunk_size=2, max_rows=3)
+            wb = load_workbook(out)
+            self.assertEqual(wb.sheetnames[:3], ["clients", "clients_2", "products"])
+            ws = wb["products"]
+            self.assertEqual(ws["C1"].value, "price")
+            self.assertEqual(ws["C2"].number_format, "0.00")
+            self.assertEqual(ws.column_dimensions["B"].width, 24)
+            self.assertEqual(sum(wb[n].max_row - 1 for n in wb.sheetnames if n.startswith("order_items")), 5)
+
+    def test_profiles(self):
+        with tempfile.TemporaryDirectory() as d:
+            db = Database(str(Path(d) / "p.sqlite"), profile="balanced")
+            self.assertEqual(db.conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(db.conn.execute("PRAGMA synchronous").fetchone()[0], 1)
+            self.assertEqual(db.conn.execute("PRAGMA temp_store").fetchone()[0], 2)
+            db.close()
+        with self.assertRaises(ValueError):
+            Database(":memory:", profile="turbo")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from order_manager.db import Database
+from order_manager.metrics import METRICS, InstrumentedConnection, load_snapshot
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.slow_log = str(Path(self.tmp.name) / "slow.log")
+        METRICS.reset()
+        METRICS.enable(slow_ms=0, slow_log=self.slow_log)
+        self.db = Database(":memory:")
+        self.db.init_schema()
+        self.db.seed_demo()
+
+    def tearDown(self):
+        self.db.close()
+        METRICS.enabled = False
+        METRICS.slow_ms, METRICS.slow_log = 100.0, None
+        METRICS.reset()
+        self.tmp.cleanup()
+
+    def test_statements_and_methods(self):
+        self.assertIsInstance(self.db.conn, InstrumentedConnection)
+        METRICS.reset()
+        for _ in range(3):
+            self.db.list_orders()
+        self.db.get_product(1)
+        stmts = {r["name"]: r for r in METRICS.summary(50)}
+        listing = next(r for name, r in stmts.items() if "FROM orders o JOIN order_totals" in name)
+        self.assertEqual((listing["count"], listing["rows"]), (3, 12))
+        self.assertLessEqual(listing["p50_ms"], listing["max_ms"])
+        self.assertEqual(stmts["SELECT * FROM products WHERE id = ?"]["rows"], 1)
+        methods = {r["name"]: r["count"] for r in METRICS.summary(50, "methods")}
+        self.assertEqual(methods["Database.list_orders"], 3)
+
+    def test_slow_log_with_plan(self):
+        self.db.conn.execute("SELECT * FROM orders WHERE client_id = ?", (1,)).fetchall()
+        records = [json.loads(line) for line in Path(self.slow_log).read_text(encoding="utf-8").splitlines()]
+        rec = next(r for r in records if r["sql"] == "SELECT * FROM orders WHERE client_id = ?")
+        self.assertEqual(rec["rows"], 2)
+        self.assertTrue(any("idx_orders_client_id" in line for line in rec["plan"]))
+
+    def test_save_accumulates(self):
+        path = str(Path(self.tmp.name) / "metrics.json")
+        self.db.list_orders()
+        METRICS.save(path)
+        METRICS.save(path)
+        saved = load_snapshot(path)
+        self.assertEqual(saved["methods"]["Database.list_orders"]["count"], 2)
+
+if __name__ == "__main__":
+    unittest.main()
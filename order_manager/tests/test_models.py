@@ -1,5 +1,6 @@
+import sqlite3
 import unittest
-from order_manager.models import Client, Product, OrderItem, Order
+from order_manager.models import Person, Client, Product, OrderItem, Order, OrderBatch
 
 class TestModels(unittest.TestCase):
     def test_client_validation(self):
@@ -19,5 +20,37 @@ class TestModels(unittest.TestCase):
         o = Order.simple(1, [OrderItem(2, 3), OrderItem(3, 1)])
         self.assertEqual(o.total_positions, 4)
 
+    def test_slots_and_rows(self):
+        c = Client("Иван", "ivan@example.com", "+79991112233", "Москва")
+        self.assertFalse(hasattr(c, "__dict__"))
+        self.assertEqual(c.to_tuple(), ("Иван", "ivan@example.com", "+79991112233", "Москва"))
+        conn = sqlite3.connect(":memory:")
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("SELECT 7 AS id, 'Пётр' AS name, '' AS email, '' AS phone, '' AS address").fetchone()
+        self.assertEqual(Client.from_row(row).to_dict(), {"name": "Пётр", "email": "", "phone": "", "address": ""})
+        self.assertEqual(Person("x").to_dict(), {"name": "x"})
+        self.assertEqual(Product.from_row(("X", 10.5)).to_dict(), {"name": "X", "price": 10.5})
+        o = Order.from_row((1, "2025-09-01"), [OrderItem.from_row((2, 3))])
+        self.assertEqual(o.to_tuple(), (1, "2025-09-01"))
+        self.assertEqual(o.total_positions, 3)
+
+    def test_order_batch(self):
+        b = OrderBatch.from_orders([Order.simple(1, [OrderItem(2, 3)], "2025-09-01")])
+        self.assertEqual(b.add(2, "2025-09-02", [(1, 1), {"product_id": 3, "quantity": 2}]), 1)
+        with self.assertRaises(ValueError):
+            b.add(3, "2025-09-03", [(1, 1), (2, 0)])
+        with self.assertRaises(ValueError):
+            b.add(3, "2025-09-03", [])
+        # пачка и OrderItem проверяют позицию одинаково
+        for bad in [(1, 0), (1, "x"), ("x", 1)]:
+            with self.assertRaises(ValueError):
+                OrderItem(*bad)
+            with self.assertRaises(ValueError):
+                b.add(3, "2025-09-03", [bad])
+        self.assertEqual((len(b), b.n_items), (2, 3))
+        self.assertEqual(list(b.order_rows(10)), [(10, 1, "2025-09-01"), (11, 2, "2025-09-02")])
+        self.assertEqual(list(b.item_rows(10)), [(10, 2, 3), (11, 1, 1), (11, 3, 2)])
+        self.assertEqual([o.total_positions for o in b.orders()], [3, 3])
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,94 @@
+import sqlite3
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from order_manager.db import Database
+from order_manager.pool import ConnectionPool
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = str(Path(self.tmp.name) / "orders.sqlite")
+        db = Database(self.path); db.init_schema(); db.seed_demo(); db.close()
+        self.pool = ConnectionPool(self.path, readers=3, busy_timeout=1.0)
+
+    def tearDown(self):
+        self.pool.close()
+        self.tmp.cleanup()
+
+    def test_parallel_reads_and_writes(self):
+        errors = []
+
+        def write(i):
+            try:
+                self.pool.run_write(lambda db: db.create_order(1 + i % 3, "2025-09-01", [(1, 1)]))
+            except Exception as e:
+                errors.append(e)
+
+        def read():
+            try:
+                for _ in range(5):
+                    self.pool.run_read(lambda db: db.list_orders())
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(i,)) for i in range(20)] + \
+                  [threading.Thread(target=read) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.pool.run_read(lambda db: len(db.list_orders())), 24)
+        st = self.pool.stats()
+        self.assertEqual(st["journal_mode"], "wal")
+        self.assertEqual(st["writes"], 20)
+        self.assertLessEqual(st["readers_open"], 3)
+
+    def test_readers_are_read_only(self):
+        with self.pool.reader() as db:
+            with self.assertRaises(sqlite3.OperationalError):
+                db.conn.execute("DELETE FROM clients")
+
+    def test_exports_read_one_snapshot(self):
+        # заказ, записанный посреди выгрузки на читателе, не попадает в дамп — дамп восстанавливается
+        def write(table, done, total):
+            if table == "orders" and done == 0:
+                self.pool.run_write(lambda db: db.create_order(1, "2025-09-01", [(1, 1)]))
+
+        nd = str(Path(self.tmp.name) / "dump.ndjson")
+        with self.pool.reader() as db:
+            self.assertEqual(db.export_ndjson(nd, chunk_size=2, progress=write), 15)
+        other = Database(":memory:")
+        other.init_schema()
+        self.assertEqual(other.import_data(nd)["orders"], 4)
+
+        with self.pool.reader() as db:
+            readers = [db.read_connection() for _ in range(2)]
+            self.assertTrue(db._pin_snapshot(readers))
+            self.pool.run_write(lambda w: w.create_order(1, "2025-09-02", [(1, 1)]))
+            self.assertEqual([c.execute("SELECT COUNT(*) FROM orders").fetchone()[0] for c in readers], [5, 5])
+            for c in readers:
+                c.close()
+            db.export_csv(str(Path(self.tmp.name) / "csv"))
+        lines = (Path(self.tmp.name) / "csv" / "orders.csv").read_text(encoding="cp1251").splitlines()
+        self.assertEqual(len(lines), 2 + 6)
+
+    def test_profile_journal_mode(self):
+        # профиль без WAL не подменяется: пул работает в режиме журнала профиля
+        self.pool.close()
+        self.pool = ConnectionPool(self.path, readers=2, busy_timeout=1.0, profile="durable")
+        self.assertEqual(self.pool.stats()["journal_mode"], "delete")
+        self.pool.run_write(lambda db: db.create_order(1, "2025-09-01", [(1, 1)]))
+        self.assertEqual(self.pool.run_read(lambda db: len(db.list_orders())), 5)
+        with self.assertRaises(ValueError):
+            ConnectionPool(self.path, profile="fast")
+
+    def test_writer_cascades(self):
+        self.pool.run_write(lambda db: db.delete_client(1))
+        self.assertEqual(self.pool.run_read(lambda db: len(db.list_orders())), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from order_manager.db import Database
+from order_manager.report import run_reports
+
+
+class TestReport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = str(Path(self.tmp.name) / "orders.sqlite")
+        db = Database(self.path); db.init_schema(); db.seed_demo(); db.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_reports_in_processes(self):
+        out = Path(self.tmp.name) / "reports"
+        manifest = run_reports(self.path, str(out), names=["top5_clients", "orders_by_week", "client_graph"],
+                               formats=["png"], jobs=2)
+        self.assertEqual([r["status"] for r in manifest["reports"]], ["ok"] * 3)
+        self.assertEqual(sorted(p.name for p in out.iterdir()),
+                         ["client_graph.png", "manifest.json", "orders_by_week.png", "top5_clients.png"])
+        saved = json.loads((out / "manifest.json").read_text(encoding="utf-8"))
+        self.assertEqual(saved["jobs"], 2)
+        self.assertTrue(all(r["seconds"] > 0 for r in saved["reports"]))
+
+    def test_bad_arguments(self):
+        with self.assertRaises(ValueError):
+            run_reports(self.path, self.tmp.name, names=["nope"])
+        with self.assertRaises(FileNotFoundError):
+            run_reports(str(Path(self.tmp.name) / "missing.sqlite"), self.tmp.name)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# бюджет холодного запуска main() до первого окна, с; можно переопределить для медленных машин
+STARTUP_BUDGET_S = float(os.environ.get("ORDER_MANAGER_STARTUP_BUDGET", "2.0"))
+
+PROBE = """
+import json, sys, time, tkinter
+t0 = time.perf_counter()
+from order_manager.main import HEAVY_MODULES, startup_timings
+res = {"import_s": time.perf_counter() - t0}
+try:
+    res["steps"] = startup_timings(sys.argv[1])
+except tkinter.TclError as e:
+    res["no_display"] = str(e)
+res["heavy"] = [m for m in HEAVY_MODULES if m in sys.modules]
+print(json.dumps(res))
+"""
+
+
+class TestStartup(unittest.TestCase):
+    def test_cold_start(self):
+        # отдельный процесс — модули ещё не загружены, как при реальном запуске
+        with tempfile.TemporaryDirectory() as d:
+            out = subprocess.run([sys.executable, "-c", PROBE, str(Path(d) / "orders.sqlite")],
+                                 capture_output=True, text=True, timeout=60,
+                                 cwd=Path(__file__).resolve().parents[2])
+        self.assertEqual(out.returncode, 0, out.stderr)
+        res = json.loads(out.stdout.strip().splitlines()[-1])
+        self.assertEqual(res["heavy"], [])
+        total = res["import_s"] + sum(s for _, s in res.get("steps", []))
+        self.assertLess(total, STARTUP_BUDGET_S, res)
+        if "no_display" in res:
+            self.skipTest(f"нет дисплея, проверен только импорт: {res['no_display']}")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from order_manager.db import Database
+from order_manager.pool import ConnectionPool
+from order_manager.worker import DbWorker, JobCancelled
+
+
+class FakeWidget:
+    # заменяет Tk: after() только запоминает колбэк, pump() вызывает его вручную
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, fn):
+        self.pending.append(fn)
+
+    def pump(self, until, timeout=5.0):
+        end = time.time() + timeout
+        while not until() and time.time() < end:
+            fns, self.pending = self.pending, []
+            for fn in fns:
+                fn()
+            time.sleep(0.01)
+
+
+class TestWorker(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = str(Path(self.tmp.name) / "orders.sqlite")
+        db = Database(self.path); db.init_schema(); db.seed_demo(); db.close()
+        self.widget = FakeWidget()
+        self.worker = DbWorker(self.widget, self.path)
+
+    def tearDown(self):
+        self.worker.shutdown()
+        self.tmp.cleanup()
+
+    def test_results_delivered_on_ui_thread(self):
+        results, threads, progress = [], [], []
+
+        def job(db, job):
+            threads.append(threading.current_thread())
+            job.progress("clients", 1, 1)
+            return len(db.list_clients())
+
+        self.worker.submit(job, on_done=lambda r: (results.append(r), threads.append(threading.current_thread())),
+                           on_progress=lambda *a: progress.append(a))
+        self.widget.pump(lambda: results)
+        self.assertEqual(results, [3])
+        self.assertEqual(progress, [("clients", 1, 1)])
+        self.assertIsNot(threads[0], threading.main_thread())
+        self.assertIs(threads[1], threading.main_thread())
+
+    def test_errors_and_cancel(self):
+        errors = []
+        started = threading.Event()
+
+        def slow(db, job):
+            started.set()
+            while True:
+                job.progress("x", 0, None)
+                time.sleep(0.01)
+
+        self.worker.submit(lambda db, job: db.add_client("Иван", "ivan@example.com", "", ""),
+                           on_error=errors.append)
+        j = self.worker.submit(slow, on_error=errors.append)
+        self.worker.submit(lambda db, job: None, on_error=errors.append)
+        started.wait(5)
+        self.worker.cancel_all()
+        self.widget.pump(lambda: len(errors) == 3)
+        self.assertIsInstance(errors[0], ValueError)
+        self.assertTrue(all(isinstance(e, JobCancelled) for e in errors[1:]))
+        self.assertTrue(j.cancelled)
+
+    def test_pool_reads_run_alongside_writes(self):
+        pool = ConnectionPool(self.path, readers=2)
+        worker = DbWorker(self.widget, self.path, pool=pool)
+        gate, results = threading.Event(), []
+
+        def long_write(db, job):
+            gate.wait(5)
+            return db.create_order(1, "2025-09-01", [(1, 1)])
+
+        worker.submit(long_write, on_done=lambda r: results.append(("write", r)))
+        worker.submit(lambda db, job: len(db.list_orders()), read_only=True,
+                      on_done=lambda r: (results.append(("read", r)), gate.set()))
+        self.widget.pump(lambda: len(results) == 2)
+        worker.shutdown()
+        pool.close()
+        self.assertEqual(results, [("read", 4), ("write", 5)])
+
+    def test_pool_retries_only_atomic_writes(self):
+        # «database is locked» после первого коммита: задача из нескольких транзакций не повторяется
+        pool = ConnectionPool(self.path, readers=1, backoff=0)
+        worker = DbWorker(self.widget, self.path, pool=pool)
+        calls, results, errors = {True: 0, False: 0}, [], []
+
+        def write(atomic):
+            def fn(db, job):
+                calls[atomic] += 1
+                db.add_product(f"Товар {calls[atomic]}", 10)
+                if calls[atomic] == 1:
+                    raise sqlite3.OperationalError("database is locked")
+                return calls[atomic]
+            return fn
+
+        worker.submit(write(True), atomic=True, on_done=results.append, on_error=errors.append)
+        worker.submit(write(False), on_done=results.append, on_error=errors.append)
+        self.widget.pump(lambda: len(results) + len(errors) == 2)
+        worker.shutdown()
+        n = pool.run_read(lambda db: len(db.list_products()))
+        pool.close()
+        self.assertEqual(calls, {True: 2, False: 1})
+        self.assertEqual(results, [2])
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(n, 3 + 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -15,6 +15,20 @@ def validate_phone(phone: str) -> bool:
     return bool(PHONE_RE.match(phone or ""))
 
 
+# символы, которые не учитываются при сравнении телефонов
+PHONE_SEPARATORS = str.maketrans("", "", " \t()-.")
+
+
+def normalize_email(email: str) -> str:
+    # для сравнения дублей: без пробелов по краям, без учёта регистра
+    return (email or "").strip().lower()
+
+
+def normalize_phone(phone: str) -> str:
+    # для сравнения дублей: без пробелов, скобок, дефисов и точек
+    return (phone or "").translate(PHONE_SEPARATORS)
+
+
 def safe_float(x: Any, default: float = 0.0) -> float:
     try:
         return float(x)
@@ -0,0 +1,242 @@
+"""
+Виртуальная таблица для Tkinter: в Treeview живут только видимые строки,
+данные подгружаются страницами по мере прокрутки; в памяти — несколько страниц
+вокруг видимого окна.
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from tkinter import ttk
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .db import page_key
+
+# fetch(last_row, offset, limit, order_by, descending) -> list[row];
+# last_row — последняя строка предыдущей страницы или None (тогда страница ищется по offset)
+Fetch = Callable[[Any, int, int, str, bool], List[Any]]
+
+
+def keyset_source(page: Callable[..., List[Any]], **filters) -> Fetch:
+    # источник поверх Database.page_*: следующая страница ищется по ключу последней строки,
+    # переход в произвольное место (полосой прокрутки) — одним запросом с OFFSET
+    def fetch(last, offset, limit, order_by, descending):
+        if last is not None:
+            return page(page_key(last, order_by), limit, order_by=order_by, descending=descending, **filters)
+        return page(None, limit, offset=offset, order_by=order_by, descending=descending, **filters)
+    return fetch
+
+
+def list_source(rows: Sequence[Any]) -> Fetch:
+    # источник поверх готового списка (например, результатов поиска)
+    cache: Dict[Any, List[Any]] = {}
+
+    def fetch(last, offset, limit, order_by, descending):
+        key = (order_by, descending)
+        if key not in cache:
+            cache[key] = sorted(rows, key=lambda r: (r[order_by] is None, r[order_by]), reverse=descending) \
+                if order_by else list(rows)
+        return cache[key][offset:offset + limit]
+    return fetch
+
+
+class VirtualTable(ttk.Frame):
+    def __init__(self, master, columns: Sequence[str], fetch: Fetch, *,
+                 count: Optional[Callable[[], int]] = None, height: int = 10, page_size: int = 200,
+                 sortable: Sequence[str] = (), order_by: str = "id", descending: bool = False,
+                 formatter: Optional[Callable[[Any], Sequence[Any]]] = None, max_pages: int = 5):
+        super().__init__(master)
+        self.columns = tuple(columns)
+        self.page_size = page_size
+        # страниц в памяти: ближайшие к видимому окну, остальные выбрасываются
+        self.max_pages = max(max_pages, 3)
+        self.order_by = order_by
+        self.descending = descending
+        self._fetch = fetch
+        self._count = count
+        self._formatter = formatter or (lambda r: tuple(r[c] for c in self.columns))
+        self._pages: "OrderedDict[int, List[Any]]" = OrderedDict()
+        # _known — строк точно есть (по загруженным страницам), _end — точное число строк
+        # (дошли до короткой страницы), _counted — результат count(), считается один раз на источник
+        self._known = 0
+        self._end: Optional[int] = None
+        self._counted: Optional[int] = None
+        self._window: List[Any] = []
+        self._top = 0
+        self._visible = height
+        self._selected: Optional[int] = None
+        self._selected_row: Any = None
+
+        self.tree = ttk.Treeview(self, columns=self.columns, show="headings", height=height,
+                                 selectmode="browse")
+        self.vsb = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        for c in self.columns:
+            if c in sortable:
+                self.tree.heading(c, text=c.upper(), command=lambda c=c: self.sort_by(c))
+            else:
+                self.tree.heading(c, text=c.upper())
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.vsb.pack(side="right", fill="y")
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-self._visible))
+        self.tree.bind("<Next>", lambda e: self.scroll(self._visible))
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.reload()
+
+    # --- данные ---
+
+    def set_source(self, fetch: Fetch, count: Optional[Callable[[], int]] = None):
+        self._fetch = fetch
+        self._count = count
+        self._counted = None
+        self.reload()
+
+    def reload(self, keep_position: bool = False):
+        # число строк от count() не пересчитывается: после добавления/удаления оно уточняется,
+        # когда прокрутка дойдёт до конца данных (короткая или пустая страница)
+        top = self._top if keep_position else 0
+        self._pages.clear()
+        self._known = 0
+        self._end = None
+        self._selected = None
+        self._selected_row = None
+        self._top = 0
+        self.scroll_to(top)
+
+    def sort_by(self, column: str, descending: Optional[bool] = None):
+        if descending is None:
+            descending = not self.descending if column == self.order_by else False
+        self.order_by, self.descending = column, descending
+        for c in self.columns:
+            text = c.upper()
+            if c == column:
+                text += " ▼" if descending else " ▲"
+            self.tree.heading(c, text=text)
+        self.reload()
+
+    def _page(self, n: int) -> List[Any]:
+        rows = self._pages.get(n)
+        if rows is not None:
+            self._pages.move_to_end(n)
+            return rows
+        size = self.page_size
+        prev = self._pages.get(n - 1)
+        # соседняя страница в памяти — продолжаем по ключу её последней строки, иначе — по смещению
+        last = prev[-1] if prev is not None and len(prev) == size else None
+        rows = self._fetch(last, n * size, size, self.order_by, self.descending)
+        self._pages[n] = rows
+        if rows:
+            self._known = max(self._known, n * size + len(rows))
+            if len(rows) < size:
+                self._end = n * size + len(rows)
+        elif self._known >= n * size or self._count is None:
+            self._end = min(self._known, n * size)
+        else:
+            # страница далеко за концом данных: count() устарел (строки удалены) — пересчитать
+            self._known = min(self._known, n * size)
+            self._counted = None
+        return rows
+
+    def _evict(self):
+        centre = self._top // self.page_size
+        while len(self._pages) > self.max_pages:
+            del self._pages[max(self._pages, key=lambda n: abs(n - centre))]
+
+    def _rows_at(self, top: int, n: int) -> List[Any]:
+        size = self.page_size
+        out: List[Any] = []
+        page = top // size
+        while len(out) < n:
+            rows = self._page(page)
+            out.extend(rows[top - page * size if not out else 0:])
+            if len(rows) < size:
+                break
+            page += 1
+        return out[:n]
+
+    def total(self) -> int:
+        if self._end is not None:
+            return self._end
+        if self._count is not None:
+            if self._counted is None:
+                self._counted = int(self._count())
+            return max(self._counted, self._known)
+        # точный размер неизвестен — оцениваем по загруженному с запасом на следующую страницу
+        return self._known + self.page_size
+
+    def selected_row(self) -> Optional[Any]:
+        return self._selected_row
+
+    # --- прокрутка и отрисовка ---
+
+    def scroll(self, delta: int):
+        self.scroll_to(self._top + delta)
+
+    def scroll_to(self, top: int):
+        # читаются только страницы видимого окна (и строка после него — чтобы заметить строки
+        # сверх устаревшего count()); если число строк уточнилось, окно пересчитывается
+        while True:
+            total = self.total()
+            start = min(max(top, 0), max(total - self._visible, 0))
+            rows = self._rows_at(start, self._visible + 1)
+            if self.total() == total:
+                break
+        self._top, self._window = start, rows[:self._visible]
+        self._evict()
+        self._render()
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * self.total()))
+        elif args[0] == "scroll":
+            step = self._visible if args[2] == "pages" else 1
+            self.scroll(int(args[1]) * step)
+
+    def _on_wheel(self, event):
+        # Windows присылает кратные 120, macOS — единицы
+        steps = event.delta // 120 if abs(event.delta) >= 120 else (1 if event.delta > 0 else -1)
+        self.scroll(-3 * steps)
+
+    def _on_resize(self, event):
+        style = ttk.Style(self)
+        row_h = int(style.lookup("Treeview", "rowheight") or 20)
+        visible = max((event.height - row_h) // row_h, 1)
+        if visible != self._visible:
+            self._visible = visible
+            self.scroll_to(self._top)
+
+    def _render(self):
+        window = self._window
+        items = self.tree.get_children()
+        # переиспользуем существующие элементы Treeview, лишние удаляем
+        for i, row in enumerate(window):
+            values = self._formatter(row)
+            if i < len(items):
+                self.tree.item(items[i], values=values)
+            else:
+                self.tree.insert("", "end", iid=f"row{i}", values=values)
+        if len(items) > len(window):
+            self.tree.delete(*items[len(window):])
+
+        sel = self._selected
+        iid = f"row{sel - self._top}" if sel is not None and self._top <= sel < self._top + len(window) else None
+        current = self.tree.selection()
+        if iid is None and current:
+            self.tree.selection_remove(*current)
+        elif iid is not None and current != (iid,):
+            self.tree.selection_set(iid)
+
+        total = self.total()
+        if total:
+            self.vsb.set(self._top / total, min((self._top + len(window)) / total, 1.0))
+        else:
+            self.vsb.set(0.0, 1.0)
+
+    def _on_select(self, event=None):
+        sel = self.tree.selection()
+        if sel:
+            i = self.tree.index(sel[0])
+            self._selected = self._top + i
+            self._selected_row = self._window[i]
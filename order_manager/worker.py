@@ -0,0 +1,176 @@
+"""
+Фоновый исполнитель операций с БД для GUI.
+
+Задачи выполняются по очереди в отдельном потоке со своим соединением к БД,
+а результаты, ошибки и прогресс передаются обратно в поток Tk через after().
+С пулом соединений (ConnectionPool) задачи только на чтение выполняются
+параллельно в отдельных потоках на read-only соединениях.
+"""
+from __future__ import annotations
+import queue
+import threading
+import traceback
+from typing import Any, Callable, Optional, Set
+
+from .db import Database
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, worker: "DbWorker", fn: Callable[..., Any], args, kwargs,
+                 on_done=None, on_error=None, on_progress=None, title: str = "", atomic: bool = False):
+        self.worker = worker
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.title = title
+        # atomic — fn одна транзакция, её можно повторить при "database is locked"
+        self.atomic = atomic
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise JobCancelled(self.title or "Операция отменена")
+
+    def progress(self, *args):
+        # вызывается из рабочего потока; заодно точка отмены для длинных операций
+        self.check()
+        if self.on_progress:
+            self.worker._post(self.on_progress, *args)
+
+
+class DbWorker:
+    def __init__(self, widget, db_path: str, *, pool=None, readers: int = 2, poll_ms: int = 50,
+                 db_factory=Database):
+        self.widget = widget
+        self.db_path = db_path
+        self.pool = pool
+        self.poll_ms = poll_ms
+        self._db_factory = db_factory
+        # слушатели изменений (см. Database.listeners); при пуле — общий список пула
+        self.listeners = pool.listeners if pool is not None else []
+        self._jobs: "queue.Queue[Optional[Job]]" = queue.Queue()
+        self._read_jobs: "queue.Queue[Optional[Job]]" = queue.Queue() if pool is not None else self._jobs
+        self._results: "queue.Queue[tuple]" = queue.Queue()
+        self._current: Set[Job] = set()
+        self._threads = [threading.Thread(target=self._run, args=(self._jobs, False),
+                                          name="db-writer", daemon=True)]
+        if pool is not None:
+            self._threads += [threading.Thread(target=self._run, args=(self._read_jobs, True),
+                                               name=f"db-reader-{i}", daemon=True) for i in range(readers)]
+        for t in self._threads:
+            t.start()
+        self._poll()
+
+    def submit(self, fn: Callable[..., Any], *args, on_done=None, on_error=None, on_progress=None,
+               title: str = "", read_only: bool = False, atomic: bool = False, **kwargs) -> Job:
+        # fn(db, job, *args, **kwargs) выполняется в рабочем потоке;
+        # on_done(result) / on_error(exc) / on_progress(*args) — в потоке Tk.
+        # read_only=True — задача только читает и при наличии пула идёт параллельно записи;
+        # atomic=True — запись одной транзакцией, при блокировке БД пул повторяет её целиком
+        # (задачи с несколькими коммитами не повторяются: уже записанные пачки записались бы дважды)
+        job = Job(self, fn, args, kwargs, on_done, on_error, on_progress, title, atomic)
+        (self._read_jobs if read_only else self._jobs).put(job)
+        return job
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._current) or not self._jobs.empty() or not self._read_jobs.empty()
+
+    def cancel_all(self):
+        for q in {id(self._jobs): self._jobs, id(self._read_jobs): self._read_jobs}.values():
+            while True:
+                try:
+                    job = q.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None:
+                    job.cancel()
+                    self._post_error(job, JobCancelled(job.title or "Операция отменена"))
+        for job in list(self._current):
+            job.cancel()
+
+    def shutdown(self, wait: bool = True):
+        self.cancel_all()
+        for t in self._threads:
+            (self._read_jobs if t.name.startswith("db-reader") else self._jobs).put(None)
+        if wait:
+            for t in self._threads:
+                t.join()
+
+    def _execute(self, job: Job, db: Optional[Database], read_only: bool):
+        call = lambda d: job.fn(d, job, *job.args, **job.kwargs)
+        if db is not None:
+            return call(db)
+        if read_only:
+            with self.pool.reader() as d:
+                return call(d)
+        if job.atomic:
+            return self.pool.run_write(call)
+        with self.pool.writer() as d:
+            return call(d)
+
+    def _run(self, jobs: "queue.Queue[Optional[Job]]", read_only: bool):
+        # без пула у потока своё соединение, с пулом соединение берётся на время задачи
+        db = self._db_factory(self.db_path) if self.pool is None else None
+        if db is not None:
+            db.listeners = self.listeners
+        try:
+            while True:
+                job = jobs.get()
+                if job is None:
+                    break
+                if job.cancelled:
+                    self._post_error(job, JobCancelled(job.title or "Операция отменена"))
+                    continue
+                self._current.add(job)
+                try:
+                    result = self._execute(job, db, read_only)
+                except Exception as e:
+                    if not isinstance(e, (JobCancelled, ValueError)):
+                        traceback.print_exc()
+                    self._post_error(job, e)
+                else:
+                    if job.on_done:
+                        self._post(job.on_done, result)
+                finally:
+                    self._current.discard(job)
+        finally:
+            if db is not None:
+                db.close()
+
+    def _post(self, callback, *args):
+        self._results.put((callback, args))
+
+    def _post_error(self, job: Job, exc: BaseException):
+        if job.on_error:
+            self._post(job.on_error, exc)
+
+    def _poll(self):
+        while True:
+            try:
+                callback, args = self._results.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception:
+                traceback.print_exc()
+        try:
+            self.widget.after(self.poll_ms, self._poll)
+        except Exception:
+            # окно уже закрыто
+            pass